@@ -0,0 +1,38 @@
+from Benchmarks.data_paths import SUBQUERY_USERS, scalar_subquery_address_insert, seed_users
+from Benchmarks.harness import main_cli
+from DataOperations.AddressIngest import UserIdResolver, ingest_addresses
+
+# Загрузка адресов: скалярный подзапрос из Insert.py против пакетного разрешения имен в id.
+# Запуск из корня проекта:
+#   python -m Benchmarks.address_ingest --rows 1000 100000 --output address_ingest.json
+
+BATCH_SIZE = 10000
+
+
+def make_addresses(rows, users):
+    return (
+        {"username": f"user{i % users}", "email_address": f"user{i}@sqlalchemy.org"}
+        for i in range(rows)
+    )
+
+
+def batched_resolver(engine, rows, timer):
+    users = min(rows, SUBQUERY_USERS)
+    seed_users(engine, users)
+    resolver = UserIdResolver().listen(engine)
+    addresses = list(make_addresses(rows, users))
+    for start in range(0, rows, BATCH_SIZE):
+        with timer.measure():
+            ingest_addresses(engine, addresses[start:start + BATCH_SIZE], resolver, BATCH_SIZE)
+    timer.extra["cache_hits"] = resolver.hits
+    timer.extra["cache_misses"] = resolver.misses
+
+
+CASES = {
+    "scalar_subquery": scalar_subquery_address_insert,
+    "batched_resolver": batched_resolver,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Address ingest", CASES)
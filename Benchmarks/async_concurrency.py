@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import bindparam, select
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import percentile, print_result, write_json
+from engine_factory import create_async_sqlite_engine, create_sqlite_engine
+from SQL_Alchemy_metadata import user_table
+from str_patterns import underline_for_header
+
+# Сравнение asyncio (AsyncEngine + aiosqlite) с синхронным engine в пуле потоков
+# при 10-1000 одновременных задачах. Каждая задача выполняет выборку пользователя по id;
+# задержка задачи включает ожидание соединения из пула.
+# Запуск из корня проекта:
+#   python -m Benchmarks.async_concurrency --concurrency 10 100 1000 --queries 10000 --output async.json
+
+USERS = 1000
+POOL_SIZE = 32
+
+stmt = select(user_table).where(user_table.c.id == bindparam("user_id"))
+
+
+async def run_async(path, concurrency, queries):
+    engine = create_async_sqlite_engine(path, pool_size=POOL_SIZE, max_overflow=0, pool_timeout=300)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def task(i):
+        async with semaphore:
+            start = time.perf_counter()
+            async with engine.connect() as conn:
+                result = await conn.execute(stmt, {"user_id": i % USERS + 1})
+                result.first()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(task(i) for i in range(queries)))
+    total = time.perf_counter() - start
+    await engine.dispose()
+    return total, latencies
+
+
+def run_threads(path, concurrency, queries):
+    engine = create_sqlite_engine(path, pool_size=POOL_SIZE, max_overflow=0, pool_timeout=300)
+    latencies = []
+
+    def task(i):
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            conn.execute(stmt, {"user_id": i % USERS + 1}).first()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(task, range(queries)))
+    total = time.perf_counter() - start
+    engine.dispose()
+    return total, latencies
+
+
+def summarize(mode, concurrency, queries, total, latencies):
+    return {
+        "case": mode,
+        "target": "file",
+        "rows": queries,
+        "concurrency": concurrency,
+        "operations": len(latencies),
+        "total_seconds": total,
+        "rows_per_second": queries / total,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Async vs thread pool concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format("Async vs thread pool concurrency"))
+    tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+    path = os.path.join(tmpdir, "bench.sqlite3")
+    try:
+        engine = create_sqlite_engine(path)
+        seed_users(engine, USERS)
+        engine.dispose()
+
+        results = []
+        for concurrency in args.concurrency:
+            total, latencies = asyncio.run(run_async(path, concurrency, args.queries))
+            results.append(summarize("async_engine", concurrency, args.queries, total, latencies))
+            print_result(results[-1])
+            total, latencies = run_threads(path, concurrency, args.queries)
+            results.append(summarize("thread_pool", concurrency, args.queries, total, latencies))
+            print_result(results[-1])
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.output:
+        write_json(results, args.output, "Async vs thread pool concurrency")
+    return results
+
+
+if __name__ == "__main__":
+    main()
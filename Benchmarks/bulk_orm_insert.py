@@ -0,0 +1,58 @@
+from sqlalchemy.orm import Session
+
+from Benchmarks.harness import chunks, main_cli
+from DataOperations.BulkInsert import bulk_save
+from SQL_Alchemy_metadata import User, create_schema
+
+# Сравнение массовой вставки User с обычным session.add() + session.flush().
+# Запуск из корня проекта:
+#   python -m Benchmarks.bulk_orm_insert --rows 1000 100000 --output bulk_orm_insert.json
+
+BATCH_SIZE = 10000
+
+
+def make_users(rows):
+    return [User(name=f"user{i}", fullname=f"User Number {i}") for i in range(rows)]
+
+
+def session_add_flush(engine, rows, timer):
+    create_schema(engine)
+    with Session(engine) as session:
+        for batch in chunks(make_users(rows), BATCH_SIZE):
+            with timer.measure():
+                for user in batch:
+                    session.add(user)
+                session.flush()
+                session.commit()
+            session.expunge_all()
+
+
+def bulk_save_attached(engine, rows, timer):
+    create_schema(engine)
+    with Session(engine) as session:
+        for batch in chunks(make_users(rows), BATCH_SIZE):
+            with timer.measure():
+                bulk_save(session, batch, attach=True)
+                session.commit()
+            session.expunge_all()
+
+
+def bulk_save_detached(engine, rows, timer):
+    create_schema(engine)
+    with Session(engine) as session:
+        for batch in chunks(make_users(rows), BATCH_SIZE):
+            with timer.measure():
+                bulk_save(session, batch)
+                session.commit()
+            assert batch[-1].id is not None
+
+
+CASES = {
+    "session_add_flush": session_add_flush,
+    "bulk_save_attached": bulk_save_attached,
+    "bulk_save_detached": bulk_save_detached,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Bulk ORM insert", CASES)
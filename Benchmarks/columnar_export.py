@@ -0,0 +1,76 @@
+import tracemalloc
+
+from sqlalchemy import select, text
+
+from Benchmarks.harness import chunks, main_cli
+from DataOperations.Columnar import fetch_columns, group_by
+from SQL_Alchemy_metadata import reflect_some_table
+
+# Выгрузка some_table (x, y) в колонки NumPy против list(conn.execute(stmt)).
+# В замер входит и агрегат sum(y) GROUP BY x поверх полученных данных.
+# Пик памяти (tracemalloc учитывает и буферы NumPy) снимается отдельным прогоном вне замера
+# времени, т.к. tracemalloc сильно замедляет выделение памяти.
+# Запуск из корня проекта:
+#   python -m Benchmarks.columnar_export --rows 100000 1000000 --output columnar.json
+
+GROUPS = 1000
+
+
+def measured(timer, consume):
+    with timer.measure():
+        timer.extra["rows_read"] = consume()
+    tracemalloc.start()
+    try:
+        consume()
+        timer.extra["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def seed_some_table(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE some_table (x int, y int)"))
+        data = [{"x": i % GROUPS, "y": i} for i in range(rows)]
+        for batch in chunks(data, 10000):
+            conn.execute(text("INSERT INTO some_table (x, y) VALUES (:x, :y)"), batch)
+    # Каждый прогон идет на новой базе, поэтому таблица отражается заново.
+    from SQL_Alchemy_metadata import metadata_obj
+    if "some_table" in metadata_obj.tables:
+        metadata_obj.remove(metadata_obj.tables["some_table"])
+    return select(reflect_some_table(engine))
+
+
+def row_list(engine, rows, timer):
+    stmt = seed_some_table(engine, rows)
+
+    def consume():
+        with engine.connect() as conn:
+            result = list(conn.execute(stmt))
+        totals = {}
+        for x, y in result:
+            totals[x] = totals.get(x, 0) + y
+        return len(result)
+
+    measured(timer, consume)
+
+
+def columnar(engine, rows, timer):
+    stmt = seed_some_table(engine, rows)
+
+    def consume():
+        with engine.connect() as conn:
+            columns = fetch_columns(conn, stmt)
+        group_by(columns["x"], columns["y"], "sum")
+        return len(columns["x"])
+
+    measured(timer, consume)
+
+
+CASES = {
+    "row_list": row_list,
+    "columnar": columnar,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Columnar export", CASES, default_rows=(100000, 1000000))
@@ -0,0 +1,125 @@
+from sqlalchemy import bindparam, insert, select, text
+from sqlalchemy.orm import Session
+
+from Benchmarks.harness import chunks, main_cli
+from SQL_Alchemy_metadata import User, address_table, create_schema, user_table
+
+# Бенчмарк всех путей работы с данными из учебных примеров.
+# Запуск из корня проекта:
+#   python -m Benchmarks.data_paths --rows 1000 100000 --targets memory file --output data_paths.json
+#
+# Вставки идут пачками по BATCH_SIZE строк, задержка считается на пачку.
+# Для выборок задержка считается на весь запрос, запрос повторяется SELECT_REPEATS раз.
+
+BATCH_SIZE = 10000
+SELECT_REPEATS = 5
+
+# Скалярный подзапрос вставки адресов находит пользователя по индексу ix_user_account_name.
+# Адреса раскладываются по SUBQUERY_USERS пользователям, как и в Benchmarks/address_ingest.py,
+# чтобы результаты двух бенчмарков можно было сравнивать.
+SUBQUERY_USERS = 1000
+
+
+def make_users(rows):
+    return [{"name": f"user{i}", "fullname": f"User Number {i}"} for i in range(rows)]
+
+
+def seed_users(engine, rows):
+    create_schema(engine)
+    with engine.begin() as conn:
+        for batch in chunks(make_users(rows), BATCH_SIZE):
+            conn.execute(insert(user_table), batch)
+
+
+def text_executemany(engine, rows, timer):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE some_table (x int, y int)"))
+    data = [{"x": i, "y": i * 2} for i in range(rows)]
+    stmt = text("INSERT INTO some_table (x, y) VALUES (:x, :y)")
+    for batch in chunks(data, BATCH_SIZE):
+        with timer.measure():
+            with engine.begin() as conn:
+                conn.execute(stmt, batch)
+
+
+def core_insert_executemany(engine, rows, timer):
+    create_schema(engine)
+    for batch in chunks(make_users(rows), BATCH_SIZE):
+        with timer.measure():
+            with engine.begin() as conn:
+                conn.execute(insert(user_table), batch)
+
+
+def scalar_subquery_address_insert(engine, rows, timer):
+    users = min(rows, SUBQUERY_USERS)
+    seed_users(engine, users)
+    scalar_subq = (
+        select(user_table.c.id).
+            where(user_table.c.name == bindparam("username")).
+            scalar_subquery()
+    )
+    stmt = insert(address_table).values(user_id=scalar_subq)
+    data = [
+        {"username": f"user{i % users}", "email_address": f"user{i}@sqlalchemy.org"}
+        for i in range(rows)
+    ]
+    for batch in chunks(data, BATCH_SIZE):
+        with timer.measure():
+            with engine.begin() as conn:
+                conn.execute(stmt, batch)
+
+
+def insert_from_select(engine, rows, timer):
+    seed_users(engine, rows)
+    select_stmt = select(user_table.c.id, user_table.c.name + "@aol.com")
+    stmt = insert(address_table).from_select(["user_id", "email_address"], select_stmt)
+    with timer.measure():
+        with engine.begin() as conn:
+            conn.execute(stmt)
+
+
+def orm_add_flush(engine, rows, timer):
+    create_schema(engine)
+    with Session(engine) as session:
+        for batch in chunks(make_users(rows), BATCH_SIZE):
+            with timer.measure():
+                for params in batch:
+                    session.add(User(**params))
+                session.flush()
+                session.commit()
+            session.expunge_all()
+
+
+def core_select(engine, rows, timer):
+    seed_users(engine, rows)
+    stmt = select(user_table)
+    for _ in range(SELECT_REPEATS):
+        with timer.measure():
+            with engine.connect() as conn:
+                conn.execute(stmt).all()
+    timer.rows_processed = rows * SELECT_REPEATS
+
+
+def orm_select(engine, rows, timer):
+    seed_users(engine, rows)
+    stmt = select(User)
+    for _ in range(SELECT_REPEATS):
+        with timer.measure():
+            with Session(engine) as session:
+                session.execute(stmt).scalars().all()
+    timer.rows_processed = rows * SELECT_REPEATS
+
+
+CASES = {
+    "text_executemany": text_executemany,
+    "core_insert_executemany": core_insert_executemany,
+    "scalar_subquery_address_insert": scalar_subquery_address_insert,
+    "insert_from_select": insert_from_select,
+    "orm_add_flush": orm_add_flush,
+    "core_select": core_select,
+    "orm_select": orm_select,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Tutorial data paths", CASES)
@@ -0,0 +1,79 @@
+import tracemalloc
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, lazyload
+
+from Benchmarks.data_paths import BATCH_SIZE, seed_users
+from Benchmarks.harness import chunks, main_cli
+from DataOperations.ReadOnly import fetch_dtos
+from SQL_Alchemy_metadata import Address, User, address_table
+
+# Загрузка всех пользователей или адресов: ORM экземпляры через Session против DTO из
+# DataOperations.ReadOnly. Результат - объекты в секунду (rows_per_second) и байты на объект:
+# прирост памяти tracemalloc на удерживаемый список объектов, снятый отдельным прогоном вне
+# замера времени.
+# Запуск из корня проекта:
+#   python -m Benchmarks.dto_loading --rows 100000 1000000 --output dto_loading.json
+
+REPEATS = 3
+
+
+def seed_addresses(engine, rows):
+    seed_users(engine, 1000)
+    data = [{"user_id": i % 1000 + 1, "email_address": f"user{i}@sqlalchemy.org"} for i in range(rows)]
+    with engine.begin() as conn:
+        for batch in chunks(data, BATCH_SIZE):
+            conn.execute(insert(address_table), batch)
+
+
+def load_orm(engine, stmt):
+    # Связи не загружаются: в модели они ленивые, а lazyload("*") не дает включить жадную
+    # загрузку опциями запроса. Сравнивается только построение самих объектов.
+    stmt = stmt.options(lazyload("*"))
+    session = Session(engine)
+    # Session остается открытой: объекты держатся вместе с ее identity map, как в обработчике запроса.
+    return session, session.execute(stmt).scalars().all()
+
+
+def load_dto(engine, stmt):
+    return None, fetch_dtos(engine, stmt)
+
+
+def measured(timer, rows, load):
+    for _ in range(REPEATS):
+        with timer.measure():
+            session, objects = load()
+        if session is not None:
+            session.close()
+    timer.rows_processed = rows * REPEATS
+
+    del objects
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        session, objects = load()
+        timer.extra["bytes_per_object"] = (tracemalloc.get_traced_memory()[0] - before) // max(len(objects), 1)
+    finally:
+        tracemalloc.stop()
+    if session is not None:
+        session.close()
+
+
+def case(seed, model, load):
+    def run(engine, rows, timer):
+        seed(engine, rows)
+        measured(timer, rows, lambda: load(engine, select(model)))
+
+    return run
+
+
+CASES = {
+    "user_orm": case(seed_users, User, load_orm),
+    "user_dto": case(seed_users, User, load_dto),
+    "address_orm": case(seed_addresses, Address, load_orm),
+    "address_dto": case(seed_addresses, Address, load_dto),
+}
+
+
+if __name__ == "__main__":
+    main_cli("Read-only DTO loading", CASES, default_rows=(100000, 1000000))
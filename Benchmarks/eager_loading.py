@@ -0,0 +1,119 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import chunks, percentile, print_result, write_json
+from DataOperations.EagerLoading import load_users_with_addresses, stream_users_with_addresses
+from engine_factory import create_sqlite_engine
+from instrumentation import StatementStats
+from SQL_Alchemy_metadata import User, address_table
+from str_patterns import underline_for_header
+
+# Загрузка страниц по PAGE_SIZE пользователей вместе с адресами при разном числе адресов
+# на пользователя (fan-out): lazy (N+1), selectin, joined и пакетная догрузка по порциям.
+# Для каждой страницы считается время и число выполненных запросов.
+# Запуск из корня проекта:
+#   python -m Benchmarks.eager_loading --users 10000 --fanout 1 10 50 --output eager_loading.json
+
+PAGE_SIZE = 500
+BATCH_SIZE = 10000
+
+
+def seed(engine, users, fanout):
+    seed_users(engine, users)
+    addresses = (
+        {"user_id": user_id, "email_address": f"user{user_id}.{i}@sqlalchemy.org"}
+        for user_id in range(1, users + 1)
+        for i in range(fanout)
+    )
+    with engine.begin() as conn:
+        for batch in chunks(list(addresses), BATCH_SIZE):
+            conn.execute(insert(address_table), batch)
+
+
+def page_stmt(page):
+    return select(User).where(User.id > page * PAGE_SIZE).order_by(User.id).limit(PAGE_SIZE)
+
+
+def strategy_case(strategy):
+    def load_page(session, page):
+        return load_users_with_addresses(session, page_stmt(page), strategy)
+
+    return load_page
+
+
+def batched_page(session, page):
+    return list(stream_users_with_addresses(session, page_stmt(page), batch_size=PAGE_SIZE))
+
+
+CASES = {
+    "lazy": strategy_case("select"),
+    "selectin": strategy_case("selectin"),
+    "joined": strategy_case("joined"),
+    "batched": batched_page,
+}
+
+
+def run(engine, stats, load_page, users):
+    latencies = []
+    stats.reset()
+    for page in range(users // PAGE_SIZE):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            loaded = load_page(session, page)
+            addresses = sum(len(user.addresses) for user in loaded)
+            latencies.append(time.perf_counter() - start)
+    statements = sum(item["count"] for item in stats.snapshot()["statements"])
+    return latencies, statements, addresses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lazy vs eager relationship loading")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--fanout", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format("Lazy vs eager relationship loading"))
+    results = []
+    for fanout in args.fanout:
+        tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+        stats = StatementStats()
+        engine = create_sqlite_engine(os.path.join(tmpdir, "bench.sqlite3"), stats=stats)
+        try:
+            seed(engine, args.users, fanout)
+            for name in args.cases:
+                latencies, statements, addresses = run(engine, stats, CASES[name], args.users)
+                total = sum(latencies)
+                results.append({
+                    "case": name,
+                    "target": "file",
+                    "rows": args.users,
+                    "operations": len(latencies),
+                    "total_seconds": total,
+                    "rows_per_second": args.users / total,
+                    "p50_ms": percentile(latencies, 50) * 1000,
+                    "p99_ms": percentile(latencies, 99) * 1000,
+                    "fanout": fanout,
+                    "statements_per_page": statements / len(latencies),
+                    "addresses_last_page": addresses,
+                })
+                print_result(results[-1])
+        finally:
+            engine.dispose()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.output:
+        write_json(results, args.output, "Lazy vs eager relationship loading")
+    return results
+
+
+if __name__ == "__main__":
+    main()
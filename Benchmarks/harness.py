@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+import sqlalchemy
+
+from engine_factory import create_sqlite_engine
+from str_patterns import underline_for_header
+
+# Общая обвязка для бенчмарков.
+# Каждый сценарий - функция case(engine, rows, timer). Подготовка данных внутри нее не замеряется,
+# замеряются только блоки, обернутые в timer.measure(). Одна обертка - одна операция
+# (пачка вставок, один запрос и т.д.), из них считаются p50/p99 задержки,
+# а из суммарного времени - строки в секунду.
+
+TARGETS = ("memory", "file")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+class Timer:
+
+    def __init__(self):
+        self.latencies = []
+        # Если за прогон обрабатывается не rows строк (например, выборка повторяется несколько раз),
+        # сценарий сам выставляет фактическое число строк.
+        self.rows_processed = None
+        self.extra = {}
+
+    @contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+def chunks(seq, size):
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
+
+
+@contextmanager
+def bench_engine(target, **engine_kwargs):
+    # Для каждого прогона создается чистая база: в памяти или во временном файле.
+    if target == "memory":
+        engine = create_sqlite_engine(":memory:", **engine_kwargs)
+        try:
+            yield engine
+        finally:
+            engine.dispose()
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+        engine = create_sqlite_engine(os.path.join(tmpdir, "bench.sqlite3"), **engine_kwargs)
+        try:
+            yield engine
+        finally:
+            engine.dispose()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def summarize(name, target, rows, timer):
+    total = sum(timer.latencies)
+    processed = rows if timer.rows_processed is None else timer.rows_processed
+    result = {
+        "case": name,
+        "target": target,
+        "rows": rows,
+        "operations": len(timer.latencies),
+        "total_seconds": total,
+        "rows_per_second": processed / total if total else 0.0,
+        "p50_ms": percentile(timer.latencies, 50) * 1000,
+        "p99_ms": percentile(timer.latencies, 99) * 1000,
+    }
+    result.update(timer.extra)
+    return result
+
+
+def run_case(name, case, rows, target, **engine_kwargs):
+    timer = Timer()
+    with bench_engine(target, **engine_kwargs) as engine:
+        case(engine, rows, timer)
+    return summarize(name, target, rows, timer)
+
+
+def run_cases(cases, rows_list, targets=TARGETS, verbose=True):
+    results = []
+    for rows in rows_list:
+        for target in targets:
+            for name, case in cases.items():
+                result = run_case(name, case, rows, target)
+                results.append(result)
+                if verbose:
+                    print_result(result)
+    return results
+
+
+BASE_FIELDS = ("case", "target", "rows", "operations", "total_seconds", "rows_per_second", "p50_ms", "p99_ms")
+
+
+def print_result(result):
+    # Дополнительные метрики сценария (timer.extra) выводятся после основных.
+    extra = "  ".join(f"{key}={value}" for key, value in result.items() if key not in BASE_FIELDS)
+    print(
+        f"{result['case']:<32s} {result['target']:<7s} rows={result['rows']:<9d} "
+        f"{result['rows_per_second']:>14,.0f} rows/s  "
+        f"p50={result['p50_ms']:9.3f} ms  p99={result['p99_ms']:9.3f} ms  {extra}".rstrip()
+    )
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def write_json(results, path, benchmark):
+    with open(path, "w") as f:
+        json.dump(
+            {"benchmark": benchmark, "environment": environment(), "results": results},
+            f,
+            indent=2
+        )
+
+
+def main_cli(benchmark, cases, default_rows=(1000, 100000, 1000000), argv=None):
+    # Общий разбор аргументов: какие сценарии, какие объемы, какие базы и куда писать JSON.
+    parser = argparse.ArgumentParser(description=benchmark)
+    parser.add_argument("--rows", type=int, nargs="+", default=list(default_rows))
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--cases", nargs="+", choices=list(cases), default=list(cases))
+    parser.add_argument("--output", default=None, help="путь к JSON файлу с результатами")
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format(benchmark))
+    selected = {name: cases[name] for name in args.cases}
+    results = run_cases(selected, args.rows, args.targets)
+    if args.output:
+        write_json(results, args.output, benchmark)
+        print(f"results written to {args.output}")
+    return results
@@ -0,0 +1,59 @@
+import os
+from contextlib import redirect_stdout
+
+from sqlalchemy import bindparam, select
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import main_cli
+from instrumentation import StatementStats
+from SQL_Alchemy_metadata import user_table
+
+# Стоимость наблюдения за запросами: без инструментации, со StatementStats и с echo=True.
+# Нагрузка - много коротких выборок пользователя по id, где накладные расходы на запрос заметнее всего.
+# Вывод echo направляется в /dev/null, т.е. в замер входит только форматирование и запись в лог.
+# Запуск из корня проекта:
+#   python -m Benchmarks.instrumentation_overhead --rows 1000 100000 --output instrumentation.json
+
+QUERIES_PER_OP = 1000
+USERS = 1000
+
+
+def run_queries(engine, rows, timer):
+    seed_users(engine, USERS)
+    stmt = select(user_table).where(user_table.c.id == bindparam("user_id"))
+    with engine.connect() as conn:
+        for start in range(0, rows, QUERIES_PER_OP):
+            with timer.measure():
+                for i in range(start, min(start + QUERIES_PER_OP, rows)):
+                    conn.execute(stmt, {"user_id": i % USERS + 1}).first()
+
+
+def no_instrumentation(engine, rows, timer):
+    run_queries(engine, rows, timer)
+
+
+def statement_stats(engine, rows, timer):
+    stats = StatementStats()
+    stats.attach(engine)
+    run_queries(engine, rows, timer)
+    timer.extra["compiled_cache"] = stats.snapshot()["compiled_cache"]
+
+
+def echo_logging(engine, rows, timer):
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        engine.echo = True
+        try:
+            run_queries(engine, rows, timer)
+        finally:
+            engine.echo = False
+
+
+CASES = {
+    "no_instrumentation": no_instrumentation,
+    "statement_stats": statement_stats,
+    "echo_logging": echo_logging,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Instrumentation overhead", CASES, default_rows=(1000, 100000))
@@ -0,0 +1,121 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import percentile, print_result, write_json
+from DataOperations.Pagination import paginate
+from engine_factory import create_sqlite_engine
+from SQL_Alchemy_metadata import User, user_table
+from str_patterns import underline_for_header
+
+# Задержка одной страницы в зависимости от ее номера: LIMIT/OFFSET против keyset пагинации.
+# Keyset проходит все страницы подряд по токенам продолжения, задержки группируются по декадам
+# номера страницы (1-10, 11-100, ...). Для OFFSET страницы на тех же глубинах запрашиваются
+# напрямую, без прохода по всем предыдущим.
+# Запуск из корня проекта:
+#   python -m Benchmarks.keyset_pagination --pages 100000 --page-size 10 --output keyset.json
+
+OFFSET_SAMPLES = 20
+
+QUERIES = {
+    "core": select(user_table).order_by(user_table.c.name),
+    "orm": select(User).order_by(User.name),
+}
+
+
+def decades(pages):
+    # (1, 10), (11, 100), ... до pages включительно.
+    bounds = []
+    low, high = 1, 10
+    while low <= pages:
+        bounds.append((low, min(high, pages)))
+        low, high = high + 1, high * 10
+    return bounds
+
+
+def result(case, depth, page_size, latencies):
+    total = sum(latencies)
+    return {
+        "case": case,
+        "target": "file",
+        "rows": page_size,
+        "pages": f"{depth[0]}-{depth[1]}",
+        "operations": len(latencies),
+        "total_seconds": total,
+        "rows_per_second": page_size * len(latencies) / total,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def keyset_walk(conn, stmt, pages, page_size):
+    latencies = []
+    token = None
+    for _ in range(pages):
+        start = time.perf_counter()
+        page = paginate(conn, stmt, page_size, token)
+        latencies.append(time.perf_counter() - start)
+        token = page.next_token
+        if token is None:
+            break
+    return latencies
+
+
+def offset_page(conn, stmt, page, page_size):
+    start = time.perf_counter()
+    rows = conn.execute(stmt.limit(page_size).offset((page - 1) * page_size)).all()
+    elapsed = time.perf_counter() - start
+    assert len(rows) == page_size
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keyset vs OFFSET pagination")
+    parser.add_argument("--pages", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--cases", nargs="+", choices=list(QUERIES), default=list(QUERIES))
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format("Keyset vs OFFSET pagination"))
+    tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+    engine = create_sqlite_engine(os.path.join(tmpdir, "bench.sqlite3"))
+    results = []
+    try:
+        seed_users(engine, args.pages * args.page_size)
+        for name in args.cases:
+            stmt = QUERIES[name]
+            with Session(engine) as session:
+                # Session подходит и для Core запросов, а для ORM дает экземпляры User.
+                latencies = keyset_walk(session, stmt, args.pages, args.page_size)
+                for depth in decades(args.pages):
+                    results.append(result(
+                        f"{name}_keyset", depth, args.page_size, latencies[depth[0] - 1:depth[1]]
+                    ))
+                    print_result(results[-1])
+                    session.expunge_all()
+
+                for depth in decades(args.pages):
+                    samples = [
+                        offset_page(session, stmt, depth[1] - i % (depth[1] - depth[0] + 1), args.page_size)
+                        for i in range(OFFSET_SAMPLES)
+                    ]
+                    results.append(result(f"{name}_offset", depth, args.page_size, samples))
+                    print_result(results[-1])
+    finally:
+        engine.dispose()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.output:
+        write_json(results, args.output, "Keyset vs OFFSET pagination")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import csv
+import os
+import tempfile
+from itertools import islice
+
+from sqlalchemy import insert
+
+from Benchmarks.harness import main_cli
+from DataOperations.Loader import DEFAULT_BATCH_ROWS, load, read_csv
+from SQL_Alchemy_metadata import create_schema, user_table
+
+# Загрузка CSV файла в user_account: executemany по порциям против DataOperations.Loader
+# (проверка записей, многострочные INSERT ... VALUES и отметки о прогрессе).
+# Время чтения файла входит в замер в обоих сценариях.
+# Запуск из корня проекта:
+#   python -m Benchmarks.loader_throughput --rows 100000 1000000 --output loader_throughput.json
+
+
+def write_users_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "fullname"])
+        for i in range(rows):
+            writer.writerow([f"user{i}", f"User Number {i}"])
+
+
+def _with_csv(case):
+    def run(engine, rows, timer):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "users.csv")
+            write_users_csv(path, rows)
+            case(engine, path, timer)
+
+    run.__name__ = case.__name__
+    return run
+
+
+@_with_csv
+def executemany_batches(engine, path, timer):
+    create_schema(engine)
+    with timer.measure():
+        records = read_csv(path)
+        while True:
+            batch = list(islice(records, DEFAULT_BATCH_ROWS))
+            if not batch:
+                break
+            with engine.begin() as conn:
+                conn.execute(insert(user_table), batch)
+
+
+@_with_csv
+def multirow_loader(engine, path, timer):
+    with timer.measure():
+        load(engine, path, user_table)
+
+
+CASES = {
+    "executemany_batches": executemany_batches,
+    "multirow_loader": multirow_loader,
+}
+
+
+if __name__ == "__main__":
+    main_cli("CSV loader", CASES, default_rows=(1000, 100000, 1000000))
@@ -0,0 +1,108 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import percentile, print_result, write_json
+from DataOperations.ParallelScan import parallel_fetch
+from engine_factory import create_sqlite_engine
+from SQL_Alchemy_metadata import User, user_table
+from str_patterns import underline_for_header
+
+# Масштабирование параллельного чтения по диапазонам первичного ключа от 1 до N процессов.
+# Базовая линия - тот же запрос на одном соединении через conn.execute().
+# Отчетный запрос фильтрует всю таблицу по LIKE, поэтому основная работа идет внутри SQLite,
+# а в родительский процесс возвращается небольшая часть строк.
+# Запуск из корня проекта:
+#   python -m Benchmarks.parallel_scan --rows 1000000 --workers 1 2 4 8 --output parallel_scan.json
+
+REPEATS = 5
+
+
+def fetch_core(engine, stmt):
+    with engine.connect() as conn:
+        return conn.execute(stmt).all()
+
+
+def fetch_orm(engine, stmt):
+    with Session(engine) as session:
+        return session.execute(stmt).scalars().all()
+
+
+# Имя запроса -> (запрос, выполнение на одном соединении).
+QUERIES = {
+    "core_filter": (select(user_table).where(user_table.c.fullname.like("%77%")), fetch_core),
+    "orm_filter": (select(User).where(User.fullname.like("%77%")), fetch_orm),
+}
+
+
+def timed(run, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = len(run())
+        latencies.append(time.perf_counter() - start)
+    return count, latencies
+
+
+def summarize(case, workers, rows, count, latencies):
+    total = sum(latencies)
+    return {
+        "case": case,
+        "target": "file",
+        "rows": rows,
+        "workers": workers,
+        "matched_rows": count,
+        "operations": len(latencies),
+        "total_seconds": total,
+        "rows_per_second": rows * len(latencies) / total,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel PK-range scan scaling")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format("Parallel PK-range scan scaling"))
+    tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+    engine = create_sqlite_engine(os.path.join(tmpdir, "bench.sqlite3"))
+    results = []
+    try:
+        seed_users(engine, args.rows)
+        for name, (stmt, fetch_single) in QUERIES.items():
+            count, latencies = timed(lambda: fetch_single(engine, stmt), args.repeats)
+            results.append(summarize(f"{name}_single", 1, args.rows, count, latencies))
+            print_result(results[-1])
+
+            for workers in sorted(set(args.workers)):
+                # Процессы запускаются до замера и переиспользуются между повторами.
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    parallel_fetch(engine, stmt, workers, executor=executor)
+                    count, latencies = timed(
+                        lambda: parallel_fetch(engine, stmt, workers, executor=executor), args.repeats
+                    )
+                results.append(summarize(f"{name}_parallel", workers, args.rows, count, latencies))
+                print_result(results[-1])
+    finally:
+        engine.dispose()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.output:
+        write_json(results, args.output, "Parallel PK-range scan scaling")
+    return results
+
+
+if __name__ == "__main__":
+    main()
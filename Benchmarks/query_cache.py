@@ -0,0 +1,96 @@
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import chunks, main_cli
+from DataOperations.QueryCache import ResultCache
+from SQL_Alchemy_metadata import User, user_table
+
+# Повторяющиеся выборки пользователя по имени (как в Select.py) без кэша и через ResultCache.
+# rows - число выборок; имена берутся по кругу из HOT_USERS пользователей.
+# Сценарий *_with_writes каждые WRITE_EVERY выборок обновляет user_account, что сбрасывает кэш.
+# Задержка считается на пачку из BATCH_SIZE выборок.
+# Запуск из корня проекта:
+#   python -m Benchmarks.query_cache --rows 10000 100000 --output query_cache.json
+
+USERS = 10000
+HOT_USERS = 100
+BATCH_SIZE = 1000
+WRITE_EVERY = 1000
+
+
+def lookups(rows):
+    return [f"user{i % HOT_USERS}" for i in range(rows)]
+
+
+# Запросы собираются один раз, имя передается параметром: так и ключ компиляции, и ключ
+# ResultCache считаются по уже готовому объекту запроса.
+orm_stmt = select(User).where(User.name == bindparam("name"))
+core_stmt = select(user_table).where(user_table.c.name == bindparam("name"))
+
+
+def orm_uncached(engine, rows, timer):
+    seed_users(engine, USERS)
+    with Session(engine) as session:
+        for batch in chunks(lookups(rows), BATCH_SIZE):
+            with timer.measure():
+                for name in batch:
+                    session.execute(orm_stmt, {"name": name}).scalars().all()
+            session.expunge_all()
+
+
+def orm_cached(engine, rows, timer):
+    seed_users(engine, USERS)
+    cache = ResultCache(maxsize=HOT_USERS * 2).listen(engine)
+    for batch in chunks(lookups(rows), BATCH_SIZE):
+        with timer.measure():
+            for name in batch:
+                cache.scalars(engine, orm_stmt, {"name": name})
+    timer.extra.update(cache.stats())
+
+
+def core_uncached(engine, rows, timer):
+    seed_users(engine, USERS)
+    with engine.connect() as conn:
+        for batch in chunks(lookups(rows), BATCH_SIZE):
+            with timer.measure():
+                for name in batch:
+                    conn.execute(core_stmt, {"name": name}).all()
+
+
+def core_cached(engine, rows, timer):
+    seed_users(engine, USERS)
+    cache = ResultCache(maxsize=HOT_USERS * 2).listen(engine)
+    with engine.connect() as conn:
+        for batch in chunks(lookups(rows), BATCH_SIZE):
+            with timer.measure():
+                for name in batch:
+                    cache.execute(conn, core_stmt, {"name": name})
+    timer.extra.update(cache.stats())
+
+
+def orm_cached_with_writes(engine, rows, timer):
+    seed_users(engine, USERS)
+    cache = ResultCache(maxsize=HOT_USERS * 2).listen(engine)
+    touch = update(user_table).where(user_table.c.id == 1).values(fullname="User Number 0")
+    for batch in chunks(lookups(rows), BATCH_SIZE):
+        with timer.measure():
+            for i, name in enumerate(batch):
+                if i % WRITE_EVERY == 0:
+                    with engine.begin() as conn:
+                        conn.execute(touch)
+                cache.scalars(engine, orm_stmt, {"name": name})
+    timer.extra.update(cache.stats())
+
+
+CASES = {
+    "orm_uncached": orm_uncached,
+    "orm_cached": orm_cached,
+    "orm_cached_with_writes": orm_cached_with_writes,
+    "core_uncached": core_uncached,
+    "core_cached": core_cached,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Query result cache", CASES, default_rows=(10000, 100000))
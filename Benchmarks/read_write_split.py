@@ -0,0 +1,130 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import percentile, print_result, write_json
+from DataOperations.ReadWriteSplit import ReadWriteEngines
+from engine_factory import create_sqlite_engine
+from SQL_Alchemy_metadata import User
+from str_patterns import underline_for_header
+
+# Смешанная нагрузка чтения и записи: один engine против DataOperations.ReadWriteSplit.
+#   single - Session(engine) над одним пулом соединений, как в Select.py и ORM_Data_manipulation.py
+#   split  - RoutingSession: запись через одно соединение писателя, чтение - через пул mode=ro
+# --threads потоков в течение --duration секунд выполняют операции: с вероятностью --write-ratio
+# добавляют пользователя (add + commit), иначе читают пользователя по имени и страницу из PAGE строк.
+# Запуск из корня проекта:
+#   python -m Benchmarks.read_write_split --threads 8 --duration 10 --write-ratio 0.2
+
+USERS = 10000
+PAGE = 50
+
+by_name = select(User).where(User.name == bindparam("name"))
+page = select(User).where(User.id > bindparam("after")).order_by(User.id).limit(PAGE)
+
+
+def read(session, rng):
+    session.execute(by_name, {"name": f"user{rng.randrange(USERS)}"}).scalars().all()
+    session.execute(page, {"after": rng.randrange(USERS)}).scalars().all()
+    session.commit()
+
+
+def write(session, rng):
+    number = rng.randrange(1_000_000_000)
+    session.add(User(name=f"split{number}", fullname=f"Split User {number}"))
+    session.commit()
+
+
+def run(make_session, threads, duration, write_ratio):
+    results = {"read": [], "write": []}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(number):
+        rng = random.Random(number)
+        own = {"read": [], "write": []}
+        with make_session() as session:
+            while time.perf_counter() < deadline:
+                kind = "write" if rng.random() < write_ratio else "read"
+                began = time.perf_counter()
+                try:
+                    (write if kind == "write" else read)(session, rng)
+                except Exception as error:
+                    session.rollback()
+                    errors.append(error)
+                    continue
+                own[kind].append(time.perf_counter() - began)
+        with lock:
+            for kind, latencies in own.items():
+                results[kind].extend(latencies)
+
+    pool = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results, len(errors)
+
+
+def summarize(case, kind, latencies, duration, threads, errors):
+    return {
+        "case": f"{case}_{kind}",
+        "target": "file",
+        "rows": len(latencies),
+        "operations": len(latencies),
+        "total_seconds": duration,
+        "rows_per_second": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "threads": threads,
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read/write splitting")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--readers", type=int, default=4, help="соединений mode=ro в пуле")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format("Read/write splitting"))
+    tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+    results = []
+    try:
+        for case in ("single", "split"):
+            path = os.path.join(tmpdir, f"{case}.sqlite3")
+            engine = create_sqlite_engine(path)
+            seed_users(engine, USERS)
+            if case == "single":
+                make_session = lambda: Session(engine)
+            else:
+                engine.dispose()
+                engines = ReadWriteEngines(path, readers=args.readers)
+                make_session = engines.session
+            by_kind, errors = run(make_session, args.threads, args.duration, args.write_ratio)
+            (engine if case == "single" else engines).dispose()
+            for kind, latencies in by_kind.items():
+                results.append(summarize(case, kind, latencies, args.duration, args.threads, errors))
+                print_result(results[-1])
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.output:
+        write_json(results, args.output, "Read/write splitting")
+    return results
+
+
+if __name__ == "__main__":
+    main()
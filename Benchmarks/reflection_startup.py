@@ -0,0 +1,95 @@
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import MetaData, text
+
+from Benchmarks.harness import write_json
+from engine_factory import create_sqlite_engine
+from reflection_cache import default_cache_path, reflect_cached
+from str_patterns import underline_for_header
+
+# Холодный и теплый запуск с отражением схемы.
+#   cold  - кэша нет: полное отражение всех таблиц и запись кэша
+#   warm  - кэш есть и отпечаток совпадает: загрузка MetaData из файла
+#   plain - отражение без кэша (MetaData.reflect), для сравнения
+# Каждый замер - новый engine, как при старте процесса.
+# Запуск из корня проекта:
+#   python -m Benchmarks.reflection_startup --tables 10 100 500 --output reflection.json
+
+COLUMNS_PER_TABLE = 10
+REPEATS = 5
+
+
+def build_schema(path, tables):
+    engine = create_sqlite_engine(path)
+    with engine.begin() as conn:
+        for i in range(tables):
+            columns = ", ".join(f"c{j} INTEGER" for j in range(COLUMNS_PER_TABLE))
+            parent = f", parent_id INTEGER REFERENCES t{i - 1} (id)" if i else ""
+            conn.execute(text(f"CREATE TABLE t{i} (id INTEGER PRIMARY KEY, {columns}{parent})"))
+            conn.execute(text(f"CREATE INDEX ix_t{i}_c0 ON t{i} (c0)"))
+    engine.dispose()
+
+
+def timed(path, func):
+    timings = []
+    for _ in range(REPEATS):
+        engine = create_sqlite_engine(path)
+        start = time.perf_counter()
+        func(engine)
+        timings.append(time.perf_counter() - start)
+        engine.dispose()
+    return statistics.median(timings) * 1000
+
+
+def cold(engine):
+    cache_path = default_cache_path(engine)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    reflect_cached(engine, MetaData())
+
+
+def warm(engine):
+    reflect_cached(engine, MetaData())
+
+
+def plain(engine):
+    MetaData().reflect(bind=engine)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reflection cold vs warm startup")
+    parser.add_argument("--tables", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format("Reflection cold vs warm startup"))
+    results = []
+    for tables in args.tables:
+        tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+        try:
+            path = os.path.join(tmpdir, "bench.sqlite3")
+            build_schema(path, tables)
+            result = {
+                "tables": tables,
+                "plain_ms": timed(path, plain),
+                "cold_ms": timed(path, cold),
+                "warm_ms": timed(path, warm),
+            }
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        results.append(result)
+        print(f"tables={tables:<5d} plain={result['plain_ms']:9.2f} ms  "
+              f"cold={result['cold_ms']:9.2f} ms  warm={result['warm_ms']:9.2f} ms")
+
+    if args.output:
+        write_json(results, args.output, "Reflection cold vs warm startup")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy import bindparam, insert, select
+
+from Benchmarks.harness import percentile, print_result, write_json
+from DataOperations.Sharding import AddressShards
+from SQL_Alchemy_metadata import address_table, user_table
+from str_patterns import underline_for_header
+
+# Пропускная способность address, разбитой на 1..N файлов (DataOperations.Sharding).
+#   bulk_insert      - AddressShards.insert_addresses() пачками по BATCH_SIZE строк
+#   concurrent_write - WRITERS потоков одновременно вставляют пачки по SMALL_BATCH адресов
+#                      случайных пользователей; в одном файле они ждут общую блокировку записи
+#   point_read       - адреса одного пользователя: запрос уходит в одну часть
+#   fanout_read      - фильтр LIKE по всем адресам: все части параллельно, затем слияние
+# Для каждого числа частей создаются новые файлы; адресов на пользователя - ADDRESSES_PER_USER.
+# Пачка случайных пользователей делится между всеми частями, и на каждую часть приходится своя
+# транзакция: выигрыш от частей появляется, когда пачки крупнее и ядер больше одного.
+# Запуск из корня проекта:
+#   python -m Benchmarks.sharding --rows 200000 --shards 1 2 4 8 --output sharding.json
+
+ADDRESSES_PER_USER = 4
+BATCH_SIZE = 10000
+WRITERS = 8
+SMALL_BATCH = 50
+POINT_READS = 2000
+FANOUT_READS = 5
+
+by_user = select(address_table).where(address_table.c.user_id == bindparam("user_id"))
+by_email = select(address_table).where(address_table.c.email_address.like("%77%"))
+
+
+def summarize(case, shards, rows, operations, latencies):
+    total = sum(latencies)
+    return {
+        "case": case,
+        "target": "file",
+        "rows": rows,
+        "shards": shards,
+        "operations": len(latencies),
+        "total_seconds": total,
+        "rows_per_second": operations / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def address_rows(users, start, count, rng=None):
+    for number in range(start, start + count):
+        user_id = rng.randint(1, users) if rng else number // ADDRESSES_PER_USER + 1
+        yield {"user_id": user_id, "email_address": f"user{user_id}.{number}@example.com"}
+
+
+def bulk_insert(shards, rows, users):
+    latencies = []
+    for start in range(0, rows, BATCH_SIZE):
+        batch = list(address_rows(users, start, min(BATCH_SIZE, rows - start)))
+        began = time.perf_counter()
+        shards.insert_addresses(batch)
+        latencies.append(time.perf_counter() - began)
+    return rows, latencies
+
+
+def concurrent_write(shards, rows, users):
+    latencies = []
+    lock = threading.Lock()
+    per_writer = rows // 10 // WRITERS
+
+    def writer(number):
+        rng = random.Random(number)
+        own = []
+        for start in range(0, per_writer, SMALL_BATCH):
+            batch = list(address_rows(users, rows + number * per_writer + start, SMALL_BATCH, rng))
+            began = time.perf_counter()
+            shards.insert_addresses(batch)
+            own.append(time.perf_counter() - began)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(WRITERS)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    # Пропускная способность - по общему времени, задержки - по отдельным пачкам.
+    written = len(latencies) * SMALL_BATCH
+    return written, latencies, elapsed
+
+
+def point_read(shards, users):
+    rng = random.Random(0)
+    latencies = []
+    for _ in range(POINT_READS):
+        user_id = rng.randint(1, users)
+        began = time.perf_counter()
+        shards.execute(by_user, {"user_id": user_id})
+        latencies.append(time.perf_counter() - began)
+    return POINT_READS, latencies
+
+
+def fanout_read(shards, rows):
+    latencies = []
+    for _ in range(FANOUT_READS):
+        began = time.perf_counter()
+        shards.execute(by_email)
+        latencies.append(time.perf_counter() - began)
+    # Каждый проход просматривает все rows адресов.
+    return rows * FANOUT_READS, latencies
+
+
+def run(count, rows, tmpdir):
+    users = rows // ADDRESSES_PER_USER
+    shards = AddressShards.from_path(os.path.join(tmpdir, f"shards{count}.sqlite3"), count).create_schema()
+    results = []
+    try:
+        with shards.primary.begin() as conn:
+            conn.execute(
+                insert(user_table),
+                [{"id": i, "name": f"user{i}", "fullname": f"User Number {i}"} for i in range(1, users + 1)]
+            )
+        results.append(summarize("bulk_insert", count, rows, *bulk_insert(shards, rows, users)))
+        written, latencies, elapsed = concurrent_write(shards, rows, users)
+        result = summarize("concurrent_write", count, rows, written, latencies)
+        result["total_seconds"] = elapsed
+        result["rows_per_second"] = written / elapsed
+        results.append(result)
+        results.append(summarize("point_read", count, rows, *point_read(shards, users)))
+        results.append(summarize("fanout_read", count, rows, *fanout_read(shards, rows)))
+    finally:
+        shards.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Address sharding scaling")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format("Address sharding scaling"))
+    tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+    results = []
+    try:
+        for count in sorted(set(args.shards)):
+            for result in run(count, args.rows, tmpdir):
+                results.append(result)
+                print_result(result)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.output:
+        write_json(results, args.output, "Address sharding scaling")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+
+from sqlalchemy import func, select
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import main_cli
+from SQL_Alchemy_metadata import user_table
+from snapshot import close_shared, restore_shared, restore_snapshot, save_snapshot, seed_tutorial
+
+# Холодное заполнение базы против восстановления из снимка (snapshot.py).
+# rows - число дополнительных пользователей поверх учебных данных. cold_seed заполняет
+# базу прогона (в памяти или файл) с нуля, restore_* загружают заранее снятый снимок в новую базу
+# в памяти. Каждый сценарий повторяется REPEATS раз, задержка - на одно заполнение/восстановление.
+# Запуск из корня проекта:
+#   python -m Benchmarks.snapshot_restore --rows 10000 100000 --targets memory --output snapshot.json
+
+REPEATS = 5
+
+
+def seed(engine, rows):
+    seed_tutorial(engine)
+    seed_users(engine, rows)
+
+
+def count_users(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(user_table)).scalar_one()
+
+
+def cold_seed(engine, rows, timer):
+    from engine_factory import create_sqlite_engine
+    for _ in range(REPEATS):
+        fresh = create_sqlite_engine(":memory:")
+        with timer.measure():
+            seed(fresh, rows)
+        timer.extra["users"] = count_users(fresh)
+        fresh.dispose()
+    timer.rows_processed = rows * REPEATS
+
+
+def _with_snapshot(restore):
+    def run(engine, rows, timer):
+        seed(engine, rows)
+        tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+        try:
+            path = save_snapshot(engine, os.path.join(tmpdir, "snapshot.sqlite3"))
+            timer.extra["snapshot_kb"] = os.path.getsize(path) // 1024
+            for _ in range(REPEATS):
+                with timer.measure():
+                    restored = restore(path)
+                timer.extra["users"] = count_users(restored)
+                restored.dispose()
+        finally:
+            close_shared()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        timer.rows_processed = rows * REPEATS
+
+    run.__name__ = restore.__name__
+    return run
+
+
+CASES = {
+    "cold_seed": cold_seed,
+    "restore_private": _with_snapshot(restore_snapshot),
+    "restore_shared": _with_snapshot(restore_shared),
+}
+
+
+if __name__ == "__main__":
+    main_cli("Snapshot restore", CASES, default_rows=(10000, 100000))
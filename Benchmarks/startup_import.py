@@ -0,0 +1,63 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from str_patterns import underline_for_header
+
+# Замер стоимости импорта схемы.
+# Каждый вариант запускается в отдельном интерпретаторе, чтобы кэш модулей не влиял на результат.
+#   bare       - только импорт sqlalchemy (нижняя граница)
+#   lazy       - import SQL_Alchemy_metadata в текущем виде: схема без обращений к базе
+#   eager      - то, что раньше происходило при импорте: create_all, заполнение some_table,
+#                отражение some_table и вставки из Insert.py
+# Запуск из корня проекта: python -m Benchmarks.startup_import
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "bare": "import sqlalchemy, sqlalchemy.orm",
+    "lazy": "import SQL_Alchemy_metadata",
+    "eager": (
+        "import SQL_Alchemy_metadata as m\n"
+        "from SQLAlchemy_Connect_Session import seed_some_table\n"
+        "from DataOperations.Insert import seed_users_and_addresses\n"
+        "engine = seed_some_table()\n"
+        "m.reflect_some_table(engine)\n"
+        "seed_users_and_addresses(engine)\n"
+    ),
+}
+
+TIMER = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "{code}\n"
+    "print((time.perf_counter() - start) * 1000)\n"
+)
+
+
+def measure(code, runs=10):
+    env = dict(os.environ, PYTHONPATH=ROOT, TUTORIAL_DB_PATH=":memory:")
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", TIMER.format(code=code)],
+            env=env, cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def main(runs=10):
+    print(underline_for_header.format("Startup import benchmark"))
+    results = {name: measure(code, runs) for name, code in SCENARIOS.items()}
+    for name, ms in results.items():
+        print(f"{name:>6s}: {ms:8.2f} ms (median of {runs})")
+    print(f"import overhead above bare sqlalchemy: lazy {results['lazy'] - results['bare']:.2f} ms, "
+          f"eager {results['eager'] - results['bare']:.2f} ms")
+    print(f"database work moved out of import: {results['eager'] - results['lazy']:.2f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from sqlalchemy import insert, lambda_stmt, select
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import main_cli
+from DataOperations.Statements import statements
+from SQL_Alchemy_metadata import create_schema, user_table
+
+# Запросов в секунду: запрос, собранный на месте (как в Select.py и Insert.py), lambda_stmt,
+# запрос из DataOperations.Statements и его выполнение через exec_driver_sql.
+# rows - число выполненных запросов; все выполняются на одном соединении в одной транзакции,
+# выборки ищут пользователя по индексу name среди SELECT_USERS строк.
+# Запуск из корня проекта:
+#   python -m Benchmarks.statement_registry --rows 10000 100000 --targets memory --output statements.json
+
+SELECT_USERS = 10000
+
+
+def _selects(run):
+    def case(engine, rows, timer):
+        seed_users(engine, SELECT_USERS)
+        names = [f"user{i % SELECT_USERS}" for i in range(rows)]
+        with engine.connect() as conn:
+            with timer.measure():
+                for name in names:
+                    run(conn, name)
+
+    case.__name__ = run.__name__
+    return case
+
+
+def _inserts(run):
+    def case(engine, rows, timer):
+        create_schema(engine)
+        with engine.begin() as conn:
+            with timer.measure():
+                for i in range(rows):
+                    run(conn, f"user{i}", f"User Number {i}")
+
+    case.__name__ = run.__name__
+    return case
+
+
+@_selects
+def select_adhoc(conn, name):
+    conn.execute(select(user_table).where(user_table.c.name == name)).all()
+
+
+@_selects
+def select_lambda(conn, name):
+    conn.execute(lambda_stmt(lambda: select(user_table).where(user_table.c.name == name))).all()
+
+
+@_selects
+def select_registry(conn, name):
+    statements.execute(conn, "user.by_name", {"name": name}).all()
+
+
+@_selects
+def select_driver(conn, name):
+    statements.execute_driver(conn, "user.by_name", {"name": name}).all()
+
+
+@_inserts
+def insert_adhoc(conn, name, fullname):
+    conn.execute(insert(user_table).values(name=name, fullname=fullname))
+
+
+@_inserts
+def insert_registry(conn, name, fullname):
+    statements.execute(conn, "user.insert", {"name": name, "fullname": fullname})
+
+
+@_inserts
+def insert_driver(conn, name, fullname):
+    statements.execute_driver(conn, "user.insert", {"name": name, "fullname": fullname})
+
+
+CASES = {
+    "select_adhoc": select_adhoc,
+    "select_lambda": select_lambda,
+    "select_registry": select_registry,
+    "select_driver": select_driver,
+    "insert_adhoc": insert_adhoc,
+    "insert_registry": insert_registry,
+    "insert_driver": insert_driver,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Statement registry", CASES, default_rows=(10000, 100000))
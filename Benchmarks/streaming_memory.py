@@ -0,0 +1,76 @@
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import main_cli
+from DataOperations.Streaming import stream_objects, stream_rows
+from SQL_Alchemy_metadata import User, user_table
+
+# Пиковое потребление памяти при чтении user_account целиком и потоково.
+# Пик считается через tracemalloc (только память Python объектов), поэтому
+# абсолютные скорости здесь ниже, чем в остальных бенчмарках.
+# Запуск из корня проекта:
+#   python -m Benchmarks.streaming_memory --rows 10000 100000 1000000 --output streaming_memory.json
+
+PARTITION_SIZE = 1000
+
+
+def traced(timer, consume):
+    tracemalloc.start()
+    try:
+        with timer.measure():
+            count = consume()
+        timer.extra["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+    timer.extra["rows_read"] = count
+
+
+def core_fetch_all(engine, rows, timer):
+    seed_users(engine, rows)
+
+    def consume():
+        with engine.connect() as conn:
+            return len(conn.execute(select(user_table)).all())
+
+    traced(timer, consume)
+
+
+def core_stream(engine, rows, timer):
+    seed_users(engine, rows)
+    traced(timer, lambda: sum(1 for _ in stream_rows(engine, select(user_table), PARTITION_SIZE)))
+
+
+def orm_fetch_all(engine, rows, timer):
+    seed_users(engine, rows)
+
+    def consume():
+        with Session(engine) as session:
+            return len(session.execute(select(User)).scalars().all())
+
+    traced(timer, consume)
+
+
+def orm_stream(engine, rows, timer):
+    seed_users(engine, rows)
+    traced(timer, lambda: sum(1 for _ in stream_objects(engine, select(User), PARTITION_SIZE)))
+
+
+def orm_stream_expunge(engine, rows, timer):
+    seed_users(engine, rows)
+    traced(timer, lambda: sum(1 for _ in stream_objects(engine, select(User), PARTITION_SIZE, expunge=True)))
+
+
+CASES = {
+    "core_fetch_all": core_fetch_all,
+    "core_stream": core_stream,
+    "orm_fetch_all": orm_fetch_all,
+    "orm_stream": orm_stream,
+    "orm_stream_expunge": orm_stream_expunge,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Streaming memory", CASES, default_rows=(10000, 100000, 1000000))
@@ -0,0 +1,243 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import bindparam, event, select, text
+
+from Benchmarks.data_paths import seed_users
+from Benchmarks.harness import percentile, print_result, write_json
+from engine_factory import DEFAULT_BUSY_TIMEOUT, RetryPolicy, create_sqlite_engine, run_in_session, run_in_transaction
+from SQL_Alchemy_metadata import User, user_table
+from SQLAlchemy_Connect_Session import seed_some_table
+from str_patterns import underline_for_header
+
+# Нагрузочный тест конкурентного доступа к одной файловой базе SQLite.
+#
+# N процессов по M потоков в течение --duration секунд выполняют случайную смесь операций
+# из учебных примеров (веса задаются --mix):
+#   read_users   - engine.connect() и выборка пользователя по имени, как в Select.py
+#   insert_users - Session(engine), add(User(...)) и commit, как в ORM_Data_manipulation.py
+#   insert_some  - engine.begin() и INSERT INTO some_table, как в SQLAlchemy_Connect_Session.py
+#   update_some  - Session(engine) и UPDATE some_table ... WHERE x=:x, как в update_with_session()
+# Записи идут через engine_factory.run_in_transaction/run_in_session с повтором при
+# "database is locked".
+#
+# Для каждой операции выводятся пропускная способность, задержки p50/p95/p99, ожидание соединения
+# из пула (от начала операции до события checkout) и число повторов и отказов после всех повторов.
+# Если потоков больше, чем pool_size, QueuePool не гарантирует очередность ожидающих: поток, вернувший
+# соединение, часто сразу забирает его снова, и checkout_wait_max_ms показывает потоки, простоявшие
+# почти весь тест.
+# Запуск из корня проекта:
+#   python -m Benchmarks.stress --processes 2 --threads 8 --duration 10
+#   python -m Benchmarks.stress --threads 16 --pool-size 4 --busy-timeout 0.01 --deferred
+
+DEFAULT_MIX = "read_users=70,insert_users=10,insert_some=10,update_some=10"
+USERS = 1000
+SOME_TABLE_KEYS = 1000
+
+users_by_name = select(user_table).where(user_table.c.name == bindparam("name"))
+insert_some = text("INSERT INTO some_table (x, y) VALUES (:x, :y)")
+update_some = text("UPDATE some_table SET y=:y WHERE x=:x")
+
+
+def read_users(engine, policy, rng, immediate):
+    with engine.connect() as conn:
+        conn.execute(users_by_name, {"name": f"user{rng.randrange(USERS)}"}).all()
+
+
+def insert_users(engine, policy, rng, immediate):
+    number = rng.randrange(1_000_000_000)
+    run_in_session(
+        engine,
+        lambda session: session.add(User(name=f"stress{number}", fullname=f"Stress User {number}")),
+        policy,
+        immediate
+    )
+
+
+def insert_some_rows(engine, policy, rng, immediate):
+    x = rng.randrange(SOME_TABLE_KEYS)
+    run_in_transaction(engine, lambda conn: conn.execute(insert_some, [{"x": x, "y": x * 2}]), policy, immediate)
+
+
+def update_some_rows(engine, policy, rng, immediate):
+    x = rng.randrange(SOME_TABLE_KEYS)
+    run_in_session(
+        engine,
+        lambda session: session.execute(update_some, [{"x": x, "y": rng.randrange(SOME_TABLE_KEYS)}]),
+        policy,
+        immediate
+    )
+
+
+OPERATIONS = {
+    "read_users": read_users,
+    "insert_users": insert_users,
+    "insert_some": insert_some_rows,
+    "update_some": update_some_rows,
+}
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}, expected one of {sorted(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def prepare(path):
+    engine = create_sqlite_engine(path)
+    seed_users(engine, USERS)
+    seed_some_table(engine)
+    with engine.begin() as conn:
+        # Без индекса UPDATE ... WHERE x=:x просматривает всю растущую some_table,
+        # и тест мерил бы скорость полного просмотра, а не конкуренцию.
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_some_table_x ON some_table (x)"))
+    engine.dispose()
+
+
+def run_worker(path, weights, threads, duration, pool_size, busy_timeout, retries, immediate, seed):
+    # Выполняется в отдельном процессе: свой engine и свои потоки. Возвращает сырые задержки,
+    # чтобы родительский процесс посчитал общие перцентили.
+    engine = create_sqlite_engine(
+        path, pool_size=pool_size, max_overflow=0, pool_timeout=300, busy_timeout=busy_timeout
+    )
+    policies = {name: RetryPolicy(retries=retries) for name in weights}
+    names = list(weights)
+    relative = list(weights.values())
+    local = threading.local()
+
+    @event.listens_for(engine, "checkout")
+    def record_checkout(dbapi_connection, connection_record, connection_proxy):
+        if getattr(local, "wait", 0.0) is None:
+            local.wait = time.perf_counter() - local.started
+
+    results = {name: {"latencies": [], "waits": [], "errors": 0} for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(number):
+        rng = random.Random(seed * 1000 + number)
+        own = {name: {"latencies": [], "waits": [], "errors": 0} for name in names}
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, relative)[0]
+            local.wait = None
+            local.started = time.perf_counter()
+            try:
+                OPERATIONS[name](engine, policies[name], rng, immediate)
+            except Exception:
+                own[name]["errors"] += 1
+                continue
+            own[name]["latencies"].append(time.perf_counter() - local.started)
+            if local.wait is not None:
+                own[name]["waits"].append(local.wait)
+        with lock:
+            for name, data in own.items():
+                results[name]["latencies"].extend(data["latencies"])
+                results[name]["waits"].extend(data["waits"])
+                results[name]["errors"] += data["errors"]
+
+    pool = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    engine.dispose()
+
+    for name, policy in policies.items():
+        results[name].update(policy.snapshot())
+    return results
+
+
+def merge(parts):
+    merged = {}
+    for part in parts:
+        for name, data in part.items():
+            target = merged.setdefault(name, {"latencies": [], "waits": [], "errors": 0, "retried": 0, "failed": 0})
+            target["latencies"].extend(data["latencies"])
+            target["waits"].extend(data["waits"])
+            for key in ("errors", "retried", "failed"):
+                target[key] += data[key]
+    return merged
+
+
+def summarize(name, data, duration, processes, threads):
+    latencies = data["latencies"]
+    waits = data["waits"]
+    return {
+        "case": name,
+        "target": "file",
+        "rows": len(latencies),
+        "operations": len(latencies),
+        "total_seconds": duration,
+        "rows_per_second": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "checkout_wait_p50_ms": round(percentile(waits, 50) * 1000, 3),
+        "checkout_wait_p99_ms": round(percentile(waits, 99) * 1000, 3),
+        "checkout_wait_max_ms": round(max(waits, default=0.0) * 1000, 3),
+        "locked_retries": data["retried"],
+        "failed_after_retries": data["failed"],
+        "errors": data["errors"],
+        "processes": processes,
+        "threads": threads,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent access stress test")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8, help="потоков в каждом процессе")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--busy-timeout", type=float, default=DEFAULT_BUSY_TIMEOUT)
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument(
+        "--deferred", action="store_true", help="открывать пишущие транзакции без BEGIN IMMEDIATE"
+    )
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    print(underline_for_header.format("Concurrent access stress test"))
+    tmpdir = tempfile.mkdtemp(prefix="tutorial-bench-")
+    path = os.path.join(tmpdir, "bench.sqlite3")
+    try:
+        prepare(path)
+        worker_args = (
+            path, args.mix, args.threads, args.duration, args.pool_size,
+            args.busy_timeout, args.retries, not args.deferred
+        )
+        if args.processes == 1:
+            parts = [run_worker(*worker_args, 0)]
+        else:
+            with ProcessPoolExecutor(max_workers=args.processes) as executor:
+                futures = [executor.submit(run_worker, *worker_args, seed) for seed in range(args.processes)]
+                parts = [future.result() for future in futures]
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    results = [
+        summarize(name, data, args.duration, args.processes, args.threads)
+        for name, data in sorted(merge(parts).items())
+    ]
+    for result in results:
+        print_result(result)
+
+    if args.output:
+        write_json(results, args.output, "Concurrent access stress test")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from sqlalchemy import bindparam, insert, select, update
+
+from Benchmarks.harness import main_cli
+from DataOperations.AddressIngest import batched
+from DataOperations.Upsert import DEFAULT_BATCH_SIZE, upsert
+from SQL_Alchemy_metadata import create_schema, user_table
+
+# Синхронизация user_account: половина строк набора уже есть в таблице (обновление fullname),
+# половина - новые. Сравниваются
+#   per_row_select_write - SELECT по id на каждую строку и затем INSERT или UPDATE,
+#                          транзакция на DEFAULT_BATCH_SIZE строк
+#   upsert_batches       - DataOperations.Upsert, INSERT ... ON CONFLICT DO UPDATE executemany
+#   upsert_staging       - DataOperations.Upsert, временная таблица и один INSERT ... SELECT ... ON CONFLICT
+# Подготовка (rows/2 существующих строк) не замеряется.
+# Запуск из корня проекта:
+#   python -m Benchmarks.upsert --rows 10000 100000 1000000 --output upsert.json
+
+select_by_id = select(user_table.c.id).where(user_table.c.id == bindparam("key"))
+update_by_id = update(user_table).where(user_table.c.id == bindparam("key")).values(
+    name=bindparam("name"), fullname=bindparam("fullname")
+)
+
+
+def prepare(engine, rows):
+    create_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(user_table),
+            [{"id": i, "name": f"user{i}", "fullname": f"User Number {i}"} for i in range(1, rows // 2 + 1)]
+        )
+    return [{"id": i, "name": f"user{i}", "fullname": f"Synced User {i}"} for i in range(1, rows + 1)]
+
+
+def report(timer, result):
+    timer.extra["inserted"], timer.extra["updated"], timer.extra["skipped"] = result
+
+
+def per_row_select_write(engine, rows, timer):
+    data = prepare(engine, rows)
+    inserted = updated = 0
+    with timer.measure():
+        for batch in batched(data, DEFAULT_BATCH_SIZE):
+            with engine.begin() as conn:
+                for row in batch:
+                    if conn.execute(select_by_id, {"key": row["id"]}).first() is None:
+                        conn.execute(insert(user_table), row)
+                        inserted += 1
+                    else:
+                        conn.execute(update_by_id, dict(row, key=row["id"]))
+                        updated += 1
+    report(timer, (inserted, updated, 0))
+
+
+def upsert_batches(engine, rows, timer):
+    data = prepare(engine, rows)
+    with timer.measure():
+        result = upsert(engine, user_table, data)
+    report(timer, result)
+
+
+def upsert_staging(engine, rows, timer):
+    data = prepare(engine, rows)
+    with timer.measure():
+        result = upsert(engine, user_table, data, mode="staging")
+    report(timer, result)
+
+
+CASES = {
+    "per_row_select_write": per_row_select_write,
+    "upsert_batches": upsert_batches,
+    "upsert_staging": upsert_staging,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Bulk upsert", CASES, default_rows=(10000, 100000, 1000000))
@@ -0,0 +1,98 @@
+import threading
+from contextlib import nullcontext
+
+from sqlalchemy import insert
+from sqlalchemy.pool import StaticPool
+
+from Benchmarks.harness import main_cli
+from DataOperations.WriteBehind import WriteBehindWriter
+from SQL_Alchemy_metadata import create_schema, user_table
+
+# Одиночные вставки пользователей: транзакция на строку, как insert_spongebob() в Insert.py,
+# против DataOperations.WriteBehind.WriteBehindWriter.
+#   per_row_commit          - engine.connect(), execute(insert(...).values(...)), commit на каждую строку
+#   write_behind_submit     - все строки передаются в writer, замер до записи последней (flush)
+#   per_row_commit_threads  - THREADS потоков, каждый вставляет свою часть строк по одной
+#   write_behind_threads    - THREADS потоков, каждый ждет id своей строки перед следующей;
+#                             строки разных потоков попадают в одну пачку
+# Для файловой базы разница определяется числом транзакций (fsync), для базы в памяти -
+# накладными расходами на запрос и транзакцию.
+# Запуск из корня проекта:
+#   python -m Benchmarks.write_behind --rows 1000 10000 --output write_behind.json
+
+THREADS = 8
+
+
+def user_row(i):
+    return {"name": f"user{i}", "fullname": f"User Number {i}"}
+
+
+def insert_one(engine, i):
+    with engine.connect() as conn:
+        conn.execute(insert(user_table).values(**user_row(i)))
+        conn.commit()
+
+
+def per_row_commit(engine, rows, timer):
+    create_schema(engine)
+    with timer.measure():
+        for i in range(rows):
+            insert_one(engine, i)
+
+
+def write_behind_submit(engine, rows, timer):
+    create_schema(engine)
+    with WriteBehindWriter(engine) as writer:
+        with timer.measure():
+            futures = [writer.submit(user_table, user_row(i)) for i in range(rows)]
+            writer.flush()
+        timer.extra.update(writer.stats())
+    timer.extra["last_id"] = futures[-1].result()[0]
+
+
+def _in_threads(rows, work):
+    def run(number):
+        for i in range(number, rows, THREADS):
+            work(i)
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def per_row_commit_threads(engine, rows, timer):
+    create_schema(engine)
+    # База в памяти - одно соединение StaticPool на все потоки, транзакции на нем
+    # идут по очереди; для файла у каждого потока свое соединение из пула.
+    lock = threading.Lock() if isinstance(engine.pool, StaticPool) else nullcontext()
+
+    def work(i):
+        with lock:
+            insert_one(engine, i)
+
+    with timer.measure():
+        _in_threads(rows, work)
+
+
+def write_behind_threads(engine, rows, timer):
+    create_schema(engine)
+    # Ожидающий поток не добавит строку, пока не запишется предыдущая, поэтому пачка
+    # собирается не больше чем из THREADS строк, и ждать max_delay дольше нет смысла.
+    with WriteBehindWriter(engine, max_batch=THREADS, max_delay=0.002) as writer:
+        with timer.measure():
+            _in_threads(rows, lambda i: writer.submit(user_table, user_row(i)).result())
+        timer.extra.update(writer.stats())
+
+
+CASES = {
+    "per_row_commit": per_row_commit,
+    "write_behind_submit": write_behind_submit,
+    "per_row_commit_threads": per_row_commit_threads,
+    "write_behind_threads": write_behind_threads,
+}
+
+
+if __name__ == "__main__":
+    main_cli("Write-behind inserts", CASES, default_rows=(1000, 10000))
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+from sqlalchemy import event, insert, select
+
+from SQL_Alchemy_metadata import user_table, address_table
+
+# Массовая загрузка адресов без скалярного подзапроса.
+#
+# В Insert.py адрес вставляется как insert(address_table).values(user_id=scalar_subq), где
+# scalar_subq = select(user_table.c.id).where(user_table.c.name == bindparam('username')).
+# Это значит, что SQLite выполняет подзапрос на каждую строку адреса.
+# Здесь имена пользователей сначала переводятся в id одним запросом WHERE name IN (...) на пачку,
+# а найденные id держатся в ограниченном LRU кэше. Сами адреса вставляются уже с готовыми user_id
+# обычным executemany.
+
+# Количество параметров в одном IN (...). Старые сборки SQLite ограничивают запрос 999 параметрами.
+IN_CHUNK_SIZE = 900
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class UserIdResolver:
+    # Кэш name -> id с вытеснением самых давно использованных записей.
+    # Любая запись в user_account (INSERT/UPDATE/DELETE, в том числе text() и exec_driver_sql)
+    # через engine, на который подписан resolver, полностью сбрасывает кэш: имена могут
+    # переименовываться или удаляться. Запись в другом процессе resolver не видит - для нее
+    # нужно вызвать invalidate() явно.
+    #
+    # Один resolver можно использовать из нескольких потоков: кэш меняется под lock, а id,
+    # прочитанные до сброса кэша, в него уже не попадают.
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def resolve(self, conn, names):
+        found = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for name in set(names):
+                if name in self.cache:
+                    self.cache.move_to_end(name)
+                    found[name] = self.cache[name]
+                    self.hits += 1
+                else:
+                    missing.append(name)
+                    self.misses += 1
+
+        for chunk in batched(missing, IN_CHUNK_SIZE):
+            stmt = select(user_table.c.name, user_table.c.id).where(user_table.c.name.in_(chunk))
+            for name, user_id in conn.execute(stmt):
+                # Как и скалярный подзапрос, при повторяющихся именах берем первую найденную строку.
+                found.setdefault(name, user_id)
+
+        with self._lock:
+            if generation == self._generation:
+                for name in missing:
+                    if name in found:
+                        self._remember(name, found[name])
+        return found
+
+    def _remember(self, name, user_id):
+        self.cache[name] = user_id
+        self.cache.move_to_end(name)
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self.cache.clear()
+
+    def listen(self, engine):
+        # after_cursor_execute, в отличие от after_execute, вызывается и для exec_driver_sql.
+        @event.listens_for(engine, "after_cursor_execute")
+        def invalidate_on_user_write(conn, cursor, statement, parameters, context, executemany):
+            if _writes_user_table(statement, context):
+                self.invalidate()
+
+        return self
+
+
+def _writes_user_table(statement, context):
+    compiled = getattr(context, "compiled", None)
+    if compiled is not None and getattr(compiled.statement, "is_dml", False):
+        return compiled.statement.table.name == user_table.name
+    # text() и exec_driver_sql: любой запрос, кроме чтения, который упоминает user_account.
+    sql = statement.lstrip().lower()
+    return user_table.name in sql and not sql.startswith(("select", "explain"))
+
+
+def ingest_addresses(engine, rows, resolver=None, batch_size=10000, skip_missing=False):
+    # rows - итерируемый набор словарей {"username": ..., "email_address": ...}, как в Insert.py.
+    # Каждая пачка вставляется в своей транзакции. Возвращает число вставленных адресов.
+    # Неизвестное имя приводит к ValueError (скалярный подзапрос дал бы NULL и нарушение NOT NULL),
+    # либо строка пропускается, если skip_missing=True.
+    if resolver is None:
+        resolver = UserIdResolver()
+
+    inserted = 0
+    for batch in batched(rows, batch_size):
+        with engine.begin() as conn:
+            ids = resolver.resolve(conn, (row["username"] for row in batch))
+            params = []
+            for row in batch:
+                user_id = ids.get(row["username"])
+                if user_id is None:
+                    if skip_missing:
+                        continue
+                    raise ValueError(f"unknown username {row['username']!r}")
+                params.append({"user_id": user_id, "email_address": row["email_address"]})
+            if params:
+                conn.execute(insert(address_table), params)
+        inserted += len(params)
+    return inserted
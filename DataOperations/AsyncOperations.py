@@ -0,0 +1,148 @@
+from sqlalchemy import bindparam, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from engine_factory import create_async_sqlite_engine, get_async_engine, has_rows
+from SQL_Alchemy_metadata import User, address_table, create_schema, user_table
+
+# Асинхронные варианты примеров из SQLAlchemy_Connect_Session.py, Insert.py, Select.py
+# и ORM_Data_manipulation.py на основе sqlalchemy.ext.asyncio и драйвера aiosqlite.
+# Core запросы выполняются через AsyncEngine/AsyncConnection, ORM - через AsyncSession.
+# Потоковое чтение использует AsyncConnection.stream() / AsyncSession.stream(),
+# результат которых перебирается через async for порциями.
+#
+# Запуск примеров из корня проекта: python -m DataOperations.AsyncOperations
+
+DEFAULT_PARTITION_SIZE = 1000
+
+
+async def create_schema_async(engine):
+    # create_all и создание индексов - синхронный код, он выполняется через run_sync.
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+
+async def seed_some_table_async(engine):
+    # Как seed_some_table(): уже заполненная таблица не заполняется повторно.
+    async with engine.begin() as conn:
+        if await conn.run_sync(has_rows, "some_table"):
+            return
+        await conn.execute(text("CREATE TABLE IF NOT EXISTS some_table (x int, y int)"))
+        await conn.execute(
+            text("INSERT INTO some_table (x, y) VALUES (:x, :y)"),
+            [{"x": 1, "y": 1}, {"x": 2, "y": 4}, {"x": 6, "y": 8}, {"x": 9, "y": 10}]
+        )
+        await conn.execute(
+            text("INSERT INTO some_table (x, y) VALUES (:x, :y)"),
+            [{"x": 11, "y": 12}, {"x": 13, "y": 14}]
+        )
+        await conn.execute(
+            text("UPDATE some_table SET y=:y WHERE x=:x"),
+            [{"x": 9, "y": 11}, {"x": 13, "y": 15}]
+        )
+
+
+async def select_some_table_async(engine, y=6):
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT * FROM some_table WHERE y > :y ORDER BY x, y").bindparams(y=y)
+        )
+        return result.all()
+
+
+async def insert_users_async(engine, users):
+    async with engine.begin() as conn:
+        await conn.execute(insert(user_table), users)
+
+
+async def insert_addresses_async(engine, addresses):
+    # Тот же скалярный подзапрос, что и в Insert.py: addresses - словари username/email_address.
+    scalar_subq = (
+        select(user_table.c.id).
+            where(user_table.c.name == bindparam("username")).
+            scalar_subquery()
+    )
+    async with engine.begin() as conn:
+        await conn.execute(insert(address_table).values(user_id=scalar_subq), addresses)
+
+
+async def seed_users_and_addresses_async(engine):
+    await create_schema_async(engine)
+    async with engine.connect() as conn:
+        if await conn.run_sync(has_rows, user_table.name):
+            return
+    await insert_users_async(engine, [
+        {"name": "spongebob", "fullname": "Spongebob Squarepants"},
+        {"name": "sandy", "fullname": "Sandy Cheeks"},
+        {"name": "patric", "fullname": "Patrick Star"},
+    ])
+    await insert_addresses_async(engine, [
+        {"username": "spongebob", "email_address": "spongebob@sqlalchemy.org"},
+        {"username": "sandy", "email_address": "sandy@sqlalchemy.org"},
+        {"username": "sandy", "email_address": "sandy@squirrelpower.org"},
+    ])
+
+
+async def select_users_by_name_async(engine, name):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(user_table).where(user_table.c.name == name))
+        return result.all()
+
+
+async def stream_rows_async(engine, stmt, partition_size=DEFAULT_PARTITION_SIZE):
+    async with engine.connect() as conn:
+        result = await conn.stream(stmt)
+        async for partition in result.partitions(partition_size):
+            for row in partition:
+                yield row
+
+
+# ORM
+
+async def add_users_async(engine, users):
+    # users - экземпляры User. После commit у них заполнены id, expire_on_commit=False
+    # оставляет атрибуты загруженными, т.к. ленивая подгрузка в asyncio недоступна.
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add_all(users)
+        await session.commit()
+    return users
+
+
+async def select_user_objects_async(engine, name):
+    async with AsyncSession(engine) as session:
+        result = await session.execute(select(User).where(User.name == name))
+        return result.scalars().all()
+
+
+async def stream_user_objects_async(engine, partition_size=DEFAULT_PARTITION_SIZE):
+    async with AsyncSession(engine) as session:
+        result = await session.stream(select(User).execution_options(yield_per=partition_size))
+        async for user in result.scalars():
+            yield user
+
+
+async def main(engine=None):
+    if engine is None:
+        engine = get_async_engine()
+    await seed_some_table_async(engine)
+    for row in await select_some_table_async(engine):
+        print(f"x: {row.x}, y: {row.y}")
+
+    await seed_users_and_addresses_async(engine)
+    print(await select_users_by_name_async(engine, "spongebob"))
+
+    squidward = User(name="squidward", fullname="Squidward Tentacles")
+    krabs = User(name="ehkrabs", fullname="Eugene H. Krabs")
+    await add_users_async(engine, [squidward, krabs])
+    print(squidward.id, krabs.id)
+
+    print(await select_user_objects_async(engine, "spongebob"))
+    async for user in stream_user_objects_async(engine, partition_size=2):
+        print(user)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    # main() добавляет пользователей при каждом вызове, поэтому скрипт работает с базой в памяти.
+    asyncio.run(main(create_async_sqlite_engine(":memory:")))
@@ -0,0 +1,93 @@
+from collections import defaultdict
+
+from sqlalchemy import func, inspect, select
+from sqlalchemy.orm import MANYTOONE
+
+# Массовая вставка ORM объектов (User, Address и любых моделей с одним целочисленным первичным ключом).
+#
+# Как видно в ORM_Data_manipulation.py, при session.add() + session.flush() объекты без id вставляются
+# по одному INSERT на объект: Session должна получить id каждой строки через cursor.lastrowid.
+# SQLAlchemy 1.4 не использует RETURNING для SQLite, поэтому здесь первичные ключи выделяются заранее
+# одним блоком на модель (SELECT max(id) + 1 ... max(id) + n) и проставляются объектам до вставки.
+# Когда у всех строк есть id, вставка уходит пачками через executemany.
+#
+# Блок выделяется на соединении сессии, поэтому max(id) и вставка выполняются в одной транзакции.
+# SQLite допускает только одного писателя: если другой процесс успеет вставить строки с теми же id,
+# вставка завершится IntegrityError/database is locked, а не тихой перезаписью.
+#
+# Session.bulk_save_objects не обрабатывает связи: Address(user=spongebob) без явного user_id
+# вставился бы с user_id = NULL. Поэтому перед такой вставкой внешние ключи заполняются из связей
+# многие-к-одному; если у связанного объекта нет первичного ключа (его нет ни в базе, ни среди
+# переданных объектов), выбрасывается ValueError.
+
+
+def _primary_key(model):
+    mapper = inspect(model)
+    if len(mapper.primary_key) != 1:
+        raise ValueError(f"{model.__name__} must have a single-column primary key for bulk insert")
+    column = mapper.primary_key[0]
+    return column, mapper.get_property_by_column(column).key
+
+
+def allocate_primary_keys(session, model, count):
+    # Возвращает range из count свободных id для модели.
+    column, _ = _primary_key(model)
+    last_id = session.execute(select(func.coalesce(func.max(column), 0))).scalar_one()
+    return range(last_id + 1, last_id + 1 + count)
+
+
+def _resolve_foreign_keys(obj):
+    # Заполняет внешние ключи obj из загруженных связей многие-к-одному (Address.user -> user_id).
+    mapper = inspect(type(obj))
+    for relationship in mapper.relationships:
+        if relationship.direction is not MANYTOONE:
+            continue
+        related = obj.__dict__.get(relationship.key)
+        if related is None:
+            continue
+        related_mapper = inspect(type(related))
+        for local, remote in relationship.local_remote_pairs:
+            local_key = mapper.get_property_by_column(local).key
+            if getattr(obj, local_key) is not None:
+                continue
+            value = getattr(related, related_mapper.get_property_by_column(remote).key)
+            if value is None:
+                raise ValueError(
+                    f"{obj!r}.{relationship.key} refers to {related!r} without a primary key, "
+                    f"pass it to bulk_save() together with the objects that reference it"
+                )
+            setattr(obj, local_key, value)
+
+
+def bulk_save(session, objects, attach=False, batch_size=10000):
+    # Вставляет объекты, проставляя им первичные ключи.
+    #   attach=False - Session.bulk_save_objects: самый быстрый путь, объекты получают id,
+    #                  но не попадают в identity map сессии (изменения в них не отслеживаются);
+    #                  внешние ключи берутся из связей многие-к-одному.
+    #   attach=True  - обычный session.add_all() + flush(): объекты становятся persistent,
+    #                  но благодаря заранее выданным id flush группирует INSERT в executemany.
+    # Порядок моделей сохраняется, поэтому User, переданные до Address, вставляются первыми.
+    # id выдаются всем моделям до вставки, чтобы внешние ключи можно было взять из связей.
+    by_model = defaultdict(list)
+    for obj in objects:
+        by_model[type(obj)].append(obj)
+
+    for model, model_objects in by_model.items():
+        _, key = _primary_key(model)
+        pending = [obj for obj in model_objects if getattr(obj, key) is None]
+        for obj, new_id in zip(pending, allocate_primary_keys(session, model, len(pending))):
+            setattr(obj, key, new_id)
+
+    for model, model_objects in by_model.items():
+        if not attach:
+            for obj in model_objects:
+                _resolve_foreign_keys(obj)
+        for start in range(0, len(model_objects), batch_size):
+            batch = model_objects[start:start + batch_size]
+            if attach:
+                session.add_all(batch)
+                session.flush()
+            else:
+                session.bulk_save_objects(batch)
+
+    return objects
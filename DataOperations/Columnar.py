@@ -0,0 +1,179 @@
+from sqlalchemy import Boolean, Float, Integer, Numeric, func, select
+
+# Выгрузка результатов запроса в колонки NumPy для аналитики.
+#
+# Обычный путь - conn.execute(stmt) и перебор Row объектов, по объекту на строку и по Python
+# объекту на каждое значение. Здесь запрос компилируется как обычно (IN (...) раскрывается сразу,
+# параметры проходят обработчики типов, см. driver_statement()), но выполняется на курсоре
+# DBAPI напрямую: строки забираются порциями через cursor.fetchmany() и сразу раскладываются
+# в заранее выделенные массивы NumPy по колонкам. Row и ORM объекты не создаются, а в памяти
+# одновременно находится только одна порция кортежей.
+#
+# NULL хранится по аналогии с Arrow: массив значений плюс маска (True - значение отсутствует),
+# результат для такой колонки - numpy.ma.MaskedArray. Это касается колонок любого типа, в том числе
+# строковых (массив object) и Boolean. Обработчики типов результата не применяются: значения
+# приходят такими, какими их отдает драйвер.
+#
+# NumPy указан в requirments.txt, но импортируется только при вызове функций модуля: остальным
+# примерам он не нужен.
+
+# Небольшие порции выгоднее: кортежи порции остаются в кэше процессора при раскладке по колонкам.
+DEFAULT_CHUNK_SIZE = 2048
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("DataOperations.Columnar requires numpy: pip install numpy") from None
+    return numpy
+
+
+def _dtype(np, column):
+    if isinstance(column.type, Boolean):
+        return np.bool_
+    if isinstance(column.type, Integer):
+        return np.int64
+    if isinstance(column.type, (Float, Numeric)):
+        return np.float64
+    return object
+
+
+def driver_parameters(compiled, params=None):
+    # Позиционные параметры для курсора DBAPI с обработкой типов, как при conn.execute().
+    values = compiled.construct_params(params)
+    processors = compiled._bind_processors
+    return tuple(
+        processors[name](values[name]) if name in processors else values[name]
+        for name in compiled.positiontup or ()
+    )
+
+
+def driver_statement(stmt, dialect, params=None):
+    # (SQL строка, параметры) для выполнения на курсоре DBAPI. render_postcompile раскрывает
+    # IN (...) в SQL: иначе в строке остается [POSTCOMPILE_...], который SQLite не разберет.
+    compiled = stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    return compiled.string, driver_parameters(compiled, params)
+
+
+def count_rows(conn, stmt):
+    return conn.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+
+
+def fetch_columns(conn, stmt, chunk_size=DEFAULT_CHUNK_SIZE, expected_rows=None):
+    # Возвращает словарь имя колонки -> массив NumPy. Если expected_rows не задан,
+    # размер результата узнается запросом SELECT count(*) FROM (stmt). Имена колонок должны
+    # различаться: для select(user_table.c.id, address_table.c.id) одной из них нужен label().
+    np = _numpy()
+    columns = list(stmt.selected_columns)
+    names = [column.key for column in columns]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate column names {duplicates}, give the columns distinct labels")
+    if expected_rows is None:
+        expected_rows = count_rows(conn, stmt)
+
+    values = [np.empty(expected_rows, dtype=_dtype(np, column)) for column in columns]
+    masks = [None] * len(columns)
+
+    sql, positional = driver_statement(stmt, conn.dialect)
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(sql, positional)
+        filled = 0
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            end = filled + len(chunk)
+            if end > len(values[0]):
+                # Таблица выросла между count(*) и выборкой - массивы расширяются. np.resize
+                # заполняет хвост повтором старых значений, поэтому маска дополняется нулями.
+                size = max(end, len(values[0]) * 2)
+                values = [np.resize(array, size) for array in values]
+                masks = [
+                    None if mask is None else np.concatenate([mask, np.zeros(size - len(mask), dtype=np.bool_)])
+                    for mask in masks
+                ]
+            for i, column_values in enumerate(zip(*chunk)):
+                masks[i] = _fill(np, values[i], masks[i], filled, column_values)
+            filled = end
+    finally:
+        cursor.close()
+
+    result = {}
+    for name, array, mask in zip(names, values, masks):
+        array = array[:filled]
+        result[name] = array if mask is None else np.ma.MaskedArray(array, mask[:filled])
+    return result
+
+
+def _fill(np, array, mask, start, column_values):
+    end = start + len(column_values)
+    # Проверка по всей порции, а не TypeError от fromiter: для Boolean None молча стал бы False.
+    has_nulls = None in column_values
+    if has_nulls:
+        if mask is None:
+            mask = np.zeros(len(array), dtype=np.bool_)
+        mask[start:end] = np.fromiter(
+            (value is None for value in column_values), dtype=np.bool_, count=len(column_values)
+        )
+    if array.dtype == object:
+        array[start:end] = column_values
+    elif has_nulls:
+        # Под маской значения заменяются нулями.
+        array[start:end] = np.fromiter(
+            (0 if value is None else value for value in column_values),
+            dtype=array.dtype,
+            count=len(column_values)
+        )
+    else:
+        array[start:end] = np.fromiter(column_values, dtype=array.dtype, count=len(column_values))
+    return mask
+
+
+# Векторные агрегаты поверх колонок: группировка по ключу без перебора строк в Python.
+
+GROUP_FUNCTIONS = ("count", "sum", "mean", "min", "max")
+
+
+def group_by(keys, values, how="sum"):
+    # keys, values - массивы одинаковой длины. Возвращает (уникальные ключи, агрегаты).
+    # Значения под маской (NULL) не участвуют в агрегатах, как в SQL. Строки с NULL в ключе,
+    # как в GROUP BY, образуют одну отдельную группу - последнюю, ее ключ в результате под маской.
+    np = _numpy()
+    if how not in GROUP_FUNCTIONS:
+        raise ValueError(f"unknown aggregate {how!r}, expected one of {GROUP_FUNCTIONS}")
+
+    null_keys = np.ma.getmaskarray(keys)
+    keys = np.ma.getdata(keys)
+    unique, present = np.unique(keys[~null_keys], return_inverse=True)
+    inverse = np.empty(len(keys), dtype=np.intp)
+    inverse[~null_keys] = present.ravel()
+    if null_keys.any():
+        inverse[null_keys] = len(unique)
+        mask = np.zeros(len(unique) + 1, dtype=np.bool_)
+        mask[-1] = True
+        unique = np.ma.MaskedArray(np.concatenate([unique, np.zeros(1, dtype=unique.dtype)]), mask)
+
+    valid = ~np.ma.getmaskarray(values)
+    data = np.ma.getdata(values)
+    inverse, data = inverse[valid], data[valid]
+
+    counts = np.bincount(inverse, minlength=len(unique))
+    if how == "count":
+        return unique, counts
+    if how in ("sum", "mean"):
+        sums = np.bincount(inverse, weights=data, minlength=len(unique))
+        if how == "sum":
+            return unique, sums
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return unique, sums / counts
+    if how == "min":
+        out = np.full(len(unique), np.inf)
+        np.minimum.at(out, inverse, data)
+    else:
+        out = np.full(len(unique), -np.inf)
+        np.maximum.at(out, inverse, data)
+    return unique, out
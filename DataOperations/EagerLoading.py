@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, lazyload, selectinload, subqueryload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from DataOperations.AddressIngest import IN_CHUNK_SIZE, batched
+from SQL_Alchemy_metadata import Address, User
+
+# Загрузка пользователей вместе с адресами без N+1 запросов.
+#
+# При ленивой загрузке (lazy="select") обращение к user.addresses на странице из 500 пользователей
+# дает 1 + 500 запросов. В модели (SQL_Alchemy_metadata.py) связь ленивая, жадная загрузка
+# включается в отдельном запросе опцией:
+#   selectin - второй запрос SELECT ... FROM address WHERE user_id IN (...), SQLAlchemy сам
+#              делит список id на пачки; подходит для больших выборок и yield_per
+#   joined   - LEFT OUTER JOIN address в том же запросе; строки пользователя повторяются по числу
+#              адресов, поэтому выгоден при небольшом числе адресов на пользователя
+#
+# Для очень больших выборок есть stream_users_with_addresses(): пользователи читаются порциями
+# через yield_per, а адреса каждой порции догружаются одним запросом IN (...) и раскладываются
+# по коллекциям без запросов на каждого пользователя.
+
+LOADER_OPTIONS = {
+    "select": lazyload,
+    "selectin": selectinload,
+    "joined": joinedload,
+    "subquery": subqueryload,
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def with_addresses(stmt, strategy="selectin"):
+    # Добавляет к select(User) опцию загрузки User.addresses.
+    try:
+        option = LOADER_OPTIONS[strategy]
+    except KeyError:
+        raise ValueError(f"unknown loading strategy {strategy!r}, expected one of {sorted(LOADER_OPTIONS)}") from None
+    return stmt.options(option(User.addresses))
+
+
+def load_users_with_addresses(session, stmt, strategy="selectin"):
+    result = session.execute(with_addresses(stmt, strategy))
+    if strategy == "joined":
+        # JOIN по коллекции повторяет пользователя в каждой строке, unique() оставляет по одному.
+        result = result.unique()
+    return result.scalars().all()
+
+
+def batch_load_addresses(session, users):
+    # Заполняет user.addresses для уже загруженных пользователей запросами
+    # WHERE user_id IN (...) по IN_CHUNK_SIZE id. Коллекции, загруженные раньше, не трогаются.
+    pending = {user.id: user for user in users if "addresses" not in user.__dict__}
+    collections = defaultdict(list)
+    for ids in batched(pending, IN_CHUNK_SIZE):
+        stmt = (
+            select(Address).
+                where(Address.user_id.in_(ids)).
+                order_by(Address.user_id, Address.id).
+                options(lazyload(Address.user))
+        )
+        for address in session.execute(stmt).scalars():
+            collections[address.user_id].append(address)
+            # Обратная ссылка известна, запрос за пользователем не нужен.
+            set_committed_value(address, "user", pending[address.user_id])
+    for user_id, user in pending.items():
+        set_committed_value(user, "addresses", collections.get(user_id, []))
+    return users
+
+
+def stream_users_with_addresses(session, stmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    # Отдает пользователей выборки stmt (по умолчанию всех) порциями по batch_size
+    # с уже загруженными адресами.
+    if stmt is None:
+        stmt = select(User).order_by(User.id)
+    stmt = stmt.options(lazyload(User.addresses)).execution_options(yield_per=batch_size)
+    for partition in session.execute(stmt).scalars().partitions():
+        yield from batch_load_addresses(session, partition)
@@ -1,10 +1,20 @@
-from sqlalchemy import engine, insert
-from SQL_Alchemy_metadata import user_table, address_table, engine
+from sqlalchemy import insert
+from SQL_Alchemy_metadata import user_table, address_table, create_schema
+from engine_factory import create_sqlite_engine, get_engine, has_rows
 
-print("\n{:_^80s}".format("Inser Log Statret")) # Для выделения лога исполнения Insert конструкций
+# Импорт модуля не выполняет вставок: каждый пример оформлен функцией, принимающей engine.
+# seed_users_and_addresses() - явная точка входа для заполнения user_account и address,
+# main() - прогон всех примеров с выводом.
 
 stmt = insert(user_table).values(name="spongebob", fullname="Spongebob Squarepants")
-print(stmt)
+
+
+def show_insert_construct():
+    print("\n{:_^80s}".format("Inser Log Statret")) # Для выделения лога исполнения Insert конструкций
+    print(stmt)
+    compiled = stmt.compile()
+    print(compiled.params, type(compiled))
+
 # Вывод: INSERT INTO user_account (name, fullname) VALUES (:name, :fullname)
 # Как видно из примера, подготовка запроса на вставку осуществляется при помощи функции insert
 # Не стоит ошибаться и предполагать, что данннная функция возвращает именно строковое представление оператора.
@@ -12,16 +22,17 @@ print(stmt)
 # Что-то аналогичное мы встречали при использовании функции text().
 
 # Преобразование Insert в конструкцию со строковым представлением и набором параметров
-compiled = stmt.compile()
+# compiled = stmt.compile()
 # Параметры передаются в поле params у скомпилированного.
-print(compiled.params, type(compiled))
+# print(compiled.params, type(compiled))
 # Сам обхект представлен в виде класса sqlalchemy.sql.compiler.StrSQLCompiler
 
 # Сам объект Insert можно употребить при помощи объекта Connection соответствущего движка.
-with engine.connect() as conn:
-    result = conn.execute(stmt)
-    conn.commit()
-    print(result.inserted_primary_key)
+def insert_spongebob(engine):
+    with engine.connect() as conn:
+        result = conn.execute(stmt)
+        conn.commit()
+    return result.inserted_primary_key
 #   Вывод:(1, ) - первичный ключ вновь добавленного объекта в БД.
 #   В случае добавления нескольких записей результат будет другой.
 # Вывод:
@@ -35,15 +46,16 @@ with engine.connect() as conn:
 # Однако не обязательно использовать именно функцию values, для заполнения полей таблицы. Можно добавит их на этапе
 # исполнения в виде списка словарей, как было при использования функции text()
 
-with engine.connect() as conn:
-    result = conn.execute(
-        insert(user_table),
-        [
-            {"name": "sandy", "fullname": "Sandy Cheeks"},
-            {"name": "patric", "fullname": "Patrick Star"},
-        ]
-    )
-    conn.commit()
+def insert_users(engine):
+    with engine.connect() as conn:
+        result = conn.execute(
+            insert(user_table),
+            [
+                {"name": "sandy", "fullname": "Sandy Cheeks"},
+                {"name": "patric", "fullname": "Patrick Star"},
+            ]
+        )
+        conn.commit()
 # Данная конструкция представляет собой форму ExecuteMany.
 # Однако в этом случае не нужно писать SQL, он генерируется из объекта Insert.
 # Вывод:
@@ -55,7 +67,6 @@ with engine.connect() as conn:
 # Заметка
 # _________________________________Пример подзапроса__________________________________
 
-print("\n{:_^80s}".format("Subquery Example"))
 from sqlalchemy import select, bindparam
 
 
@@ -65,16 +76,17 @@ scalar_subq = (
         scalar_subquery()
 )
 
-with engine.connect() as conn:
-    result = conn.execute(
-        insert(address_table).values(user_id=scalar_subq),
-        [
-            {"username": 'spongebob', "email_address": "spongebob@sqlalchemy.org"},
-            {"username": 'sandy', "email_address": "sandy@sqlalchemy.org"},
-            {"username": 'sandy', "email_address": "sandy@squirrelpower.org"}
-        ]
-    )
-    conn.commit()
+def insert_addresses(engine):
+    with engine.connect() as conn:
+        result = conn.execute(
+            insert(address_table).values(user_id=scalar_subq),
+            [
+                {"username": 'spongebob', "email_address": "spongebob@sqlalchemy.org"},
+                {"username": 'sandy', "email_address": "sandy@sqlalchemy.org"},
+                {"username": 'sandy', "email_address": "sandy@squirrelpower.org"}
+            ]
+        )
+        conn.commit()
 
 # Вывод:
 # 2021-09-06 00:46:28,674 INFO sqlalchemy.engine.Engine BEGIN (implicit)
@@ -91,24 +103,20 @@ with engine.connect() as conn:
 # можно сделать при помощи специальной функции from_select обзекта Insert.
 # Первым параметром передается список полей, которые используются для вставки,
 # вторым сам запрос на выборку созданый при помощи sqlalchemy.select.
-print("\n{:_^80s}".format("INSERT FROM SELECT Example"))
-
 select_stmt = select(user_table.c.id, user_table.c.name + "@aol.com")
 insert_stmt = insert(address_table).from_select(
     ["user_id", "email_address"], select_stmt
 )
 
-print(insert_stmt)
+# print(insert_stmt)
 # Вывод:
 # INSERT INTO address (user_id, email_address) SELECT user_account.id, user_account.name || :name_1 AS anon_1
 # FROM user_account
 
 # INSERT RETURNING
 # Обычно возврат первого значения поддерживается по умолчанию, но его можно указать явно с помощью Insert.returning()
-print("\n{:_^80s}".format("INSERT FROM SELECT Example"))
-
-insert_stmt = insert(address_table).returning(address_table.c.id, address_table.c.email_address)
-print(insert_stmt)
+returning_stmt = insert(address_table).returning(address_table.c.id, address_table.c.email_address)
+# print(returning_stmt)
 
 # Вывод:
 # INSERT INTO address (id, user_id, email_address)
@@ -118,4 +126,44 @@ print(insert_stmt)
 # Заметка:
 # Returning так же поддерживается операторами UPDATE и DELETE, однако обычно его не стоит использовать
 # при выполнении операций сразу с несколькими строками. Форма Executemany, как и API некоторых движков (например Oracle)
-# позволяют возвращать только одно значение.
\ No newline at end of file
+# позволяют возвращать только одно значение.
+
+
+def show_from_select_and_returning():
+    print("\n{:_^80s}".format("INSERT FROM SELECT Example"))
+    print(insert_stmt)
+    print("\n{:_^80s}".format("INSERT RETURNING Example"))
+    print(returning_stmt)
+
+
+# Точки входа.
+# seed_users_and_addresses() заполняет таблицы только один раз: если в user_account уже есть строки
+# (файловая база от прошлого запуска), вставки пропускаются. main() при запуске скрипта работает
+# с базой в памяти, чтобы примеры вставок не копили дубликаты в файле.
+
+def seed_users_and_addresses(engine=None):
+    if engine is None:
+        engine = get_engine()
+    create_schema(engine)
+    if has_rows(engine, user_table.name):
+        return engine
+    insert_spongebob(engine)
+    insert_users(engine)
+    insert_addresses(engine)
+    return engine
+
+
+def main(engine=None):
+    if engine is None:
+        engine = get_engine()
+    create_schema(engine)
+    show_insert_construct()
+    print(insert_spongebob(engine))
+    insert_users(engine)
+    print("\n{:_^80s}".format("Subquery Example"))
+    insert_addresses(engine)
+    show_from_select_and_returning()
+
+
+if __name__ == "__main__":
+    main(create_sqlite_engine(":memory:"))
@@ -0,0 +1,283 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from itertools import islice
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, delete, insert, select
+from sqlalchemy.types import Boolean, Float, Numeric
+
+from DataOperations.AddressIngest import UserIdResolver
+from engine_factory import get_engine
+from SQL_Alchemy_metadata import address_table, create_schema, user_table
+
+# Потоковая загрузка CSV/JSONL файлов в user_account и address.
+#
+# Файл читается генератором по одной записи, каждая запись проверяется по колонкам таблицы
+# из SQL_Alchemy_metadata.py (тип, длина String, nullable), после чего записи собираются в
+# многострочные INSERT ... VALUES (?, ?), (?, ?), ... с числом параметров в пределах лимита SQLite.
+# Каждая порция фиксируется в своей транзакции вместе с отметкой о прогрессе в таблице
+# load_checkpoint, поэтому прерванную загрузку можно продолжить с первой незафиксированной записи.
+#
+# Для address вместо user_id можно передать username - имена переводятся в id пакетно
+# через DataOperations.AddressIngest.UserIdResolver.
+#
+# Запуск из корня проекта:
+#   python -m DataOperations.Loader users.csv --table user_account
+#   python -m DataOperations.Loader addresses.jsonl --table address
+
+# SQLITE_MAX_VARIABLE_NUMBER по умолчанию: 999 до SQLite 3.32, 32766 начиная с 3.32. Сборка SQLite
+# может задать другой лимит; начиная с Python 3.11 он читается у соединения (variable_limit).
+MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+DEFAULT_BATCH_ROWS = 50000
+
+LOADABLE_TABLES = {table.name: table for table in (user_table, address_table)}
+
+# Отметки о прогрессе хранятся в отдельном MetaData, чтобы служебная таблица не попадала
+# в схему учебных примеров.
+checkpoint_metadata = MetaData()
+
+checkpoint_table = Table(
+    "load_checkpoint",
+    checkpoint_metadata,
+    Column("source", String, primary_key=True),
+    Column("table_name", String, nullable=False),
+    Column("records", Integer, nullable=False),
+)
+
+
+class ValidationError(ValueError):
+
+    def __init__(self, record_number, message):
+        super().__init__(f"record {record_number}: {message}")
+        self.record_number = record_number
+
+
+class AlreadyLoadedError(ValueError):
+    # Все записи файла уже зафиксированы по отметке load_checkpoint.
+
+    def __init__(self, source, table_name, records):
+        super().__init__(
+            f"{source} is already loaded into {table_name} ({records} records), use restart=True (--restart) to load it again"
+        )
+        self.records = records
+
+
+def variable_limit(conn):
+    # Лимит параметров в одном запросе для соединения Connection.
+    # В SQLAlchemy 1.4.23 у _ConnectionFairy еще нет dbapi_connection, только connection.
+    dbapi_connection = conn.connection.connection
+    if hasattr(dbapi_connection, "getlimit"):
+        return dbapi_connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    return MAX_VARIABLES
+
+
+# Чтение
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        for record in csv.DictReader(f):
+            # Пустое поле CSV означает NULL.
+            yield {key: (value if value != "" else None) for key, value in record.items()}
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_records(path, file_format=None):
+    if file_format is None:
+        file_format = "jsonl" if path.endswith((".jsonl", ".json", ".ndjson")) else "csv"
+    if file_format == "csv":
+        return read_csv(path)
+    if file_format == "jsonl":
+        return read_jsonl(path)
+    raise ValueError(f"unknown format {file_format!r}, expected csv or jsonl")
+
+
+# Проверка
+
+def _converter(column):
+    type_ = column.type
+    if isinstance(type_, Boolean):
+        return lambda value: value if isinstance(value, bool) else str(value).lower() in ("1", "true", "t", "yes")
+    if isinstance(type_, Integer):
+        return int
+    if isinstance(type_, (Float, Numeric)):
+        return float
+    if isinstance(type_, String):
+        length = type_.length
+
+        def convert(value):
+            value = str(value)
+            if length is not None and len(value) > length:
+                raise ValueError(f"longer than {length} characters")
+            return value
+
+        return convert
+    return lambda value: value
+
+
+class RecordValidator:
+    # Приводит запись к кортежу значений в порядке self.columns.
+    # Первичный ключ можно не указывать - тогда его назначит SQLite. Набор колонок задается полями
+    # первой записи; в остальных записях поле может отсутствовать (NULL), но лишнее поле - ошибка.
+
+    def __init__(self, table, fields):
+        self.table = table
+        unknown = [field for field in fields if field not in table.c]
+        if unknown:
+            raise ValueError(f"unknown columns for {table.name}: {', '.join(unknown)}")
+        self.fields = frozenset(fields)
+        self.columns = [column for column in table.columns if column.key in fields]
+        self.converters = [_converter(column) for column in self.columns]
+        missing = [
+            column.key for column in table.columns
+            if not column.nullable and not column.primary_key and column.key not in fields
+        ]
+        if missing:
+            raise ValueError(f"missing required columns for {table.name}: {', '.join(missing)}")
+
+    def __call__(self, record_number, record):
+        if not self.fields.issuperset(record):
+            extra = [field for field in record if field not in self.fields]
+            unknown = [field for field in extra if field not in self.table.c]
+            if unknown:
+                raise ValidationError(record_number, f"unknown columns for {self.table.name}: {', '.join(unknown)}")
+            raise ValidationError(
+                record_number, f"columns {', '.join(extra)} are not in the first record of the file"
+            )
+        values = []
+        for column, convert in zip(self.columns, self.converters):
+            value = record.get(column.key)
+            if value is None:
+                if not column.nullable and not column.primary_key:
+                    raise ValidationError(record_number, f"{column.key} must not be NULL")
+                values.append(None)
+                continue
+            try:
+                values.append(convert(value))
+            except (TypeError, ValueError) as error:
+                raise ValidationError(record_number, f"{column.key}: {error}") from None
+        return tuple(values)
+
+
+# Загрузка
+
+def multirow_insert_sql(dialect, table, columns, rows):
+    preparer = dialect.identifier_preparer
+    names = ", ".join(preparer.quote(column.name) for column in columns)
+    placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+    return f"INSERT INTO {preparer.format_table(table)} ({names}) VALUES " + ", ".join([placeholders] * rows)
+
+
+def _resolve_usernames(conn, resolver, records, start):
+    ids = resolver.resolve(conn, (record["username"] for record in records if "username" in record))
+    for offset, record in enumerate(records):
+        if "username" in record:
+            username = record.pop("username")
+            if username not in ids:
+                raise ValidationError(start + offset + 1, f"unknown username {username!r}")
+            record["user_id"] = ids[username]
+
+
+def load(engine, path, table, file_format=None, batch_rows=DEFAULT_BATCH_ROWS, restart=False, progress=None):
+    # Загружает файл в таблицу и возвращает число загруженных записей (включая загруженные
+    # до прерывания). progress(records_loaded) вызывается после каждой зафиксированной порции.
+    if isinstance(table, str):
+        table = LOADABLE_TABLES[table]
+    create_schema(engine)
+    checkpoint_metadata.create_all(engine)
+    source = os.path.abspath(path)
+
+    with engine.begin() as conn:
+        if restart:
+            conn.execute(delete(checkpoint_table).where(checkpoint_table.c.source == source))
+        done = conn.execute(
+            select(checkpoint_table.c.records).where(checkpoint_table.c.source == source)
+        ).scalar() or 0
+
+    records = read_records(path, file_format)
+    # Уже зафиксированные записи пропускаются без проверки.
+    records = islice(records, done, None)
+    resolver = UserIdResolver() if table is address_table else None
+
+    validator = None
+    sql_cache = {}
+    loaded = done
+    while True:
+        batch = list(islice(records, batch_rows))
+        if not batch:
+            if done and loaded == done:
+                raise AlreadyLoadedError(source, table.name, done)
+            break
+        with engine.begin() as conn:
+            if resolver is not None:
+                _resolve_usernames(conn, resolver, batch, loaded)
+            if validator is None:
+                validator = RecordValidator(table, list(batch[0]))
+            rows = [validator(loaded + i + 1, record) for i, record in enumerate(batch)]
+
+            # Одна порция делится на многострочные INSERT, каждый в пределах лимита параметров.
+            rows_per_statement = max(1, variable_limit(conn) // len(validator.columns))
+            for start in range(0, len(rows), rows_per_statement):
+                chunk = rows[start:start + rows_per_statement]
+                sql = sql_cache.get(len(chunk))
+                if sql is None:
+                    sql = sql_cache[len(chunk)] = multirow_insert_sql(
+                        conn.dialect, table, validator.columns, len(chunk)
+                    )
+                conn.exec_driver_sql(sql, tuple(value for row in chunk for value in row))
+
+            loaded += len(batch)
+            _save_checkpoint(conn, source, table.name, loaded)
+        if progress is not None:
+            progress(loaded)
+    return loaded
+
+
+def _save_checkpoint(conn, source, table_name, records):
+    updated = conn.execute(
+        checkpoint_table.update().
+            where(checkpoint_table.c.source == source).
+            values(records=records)
+    ).rowcount
+    if not updated:
+        conn.execute(insert(checkpoint_table).values(source=source, table_name=table_name, records=records))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream CSV/JSONL files into user_account or address")
+    parser.add_argument("path")
+    parser.add_argument("--table", choices=sorted(LOADABLE_TABLES), required=True)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument("--restart", action="store_true", help="начать загрузку файла заново")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    def report(loaded):
+        print(f"\r{loaded:,} records loaded", end="", file=sys.stderr, flush=True)
+
+    try:
+        loaded = load(
+            get_engine(), args.path, args.table, args.format, args.batch_rows, args.restart,
+            progress=None if args.quiet else report,
+        )
+    except AlreadyLoadedError as error:
+        parser.exit(1, f"{error}\n")
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"{loaded} records in {args.table}")
+    return loaded
+
+
+if __name__ == "__main__":
+    main()
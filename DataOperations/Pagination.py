@@ -0,0 +1,186 @@
+import base64
+import hashlib
+import json
+import weakref
+
+from sqlalchemy import and_, bindparam, or_, tuple_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+# Постраничная выборка по ключу (keyset / seek) вместо LIMIT ... OFFSET.
+#
+# При OFFSET n база все равно перебирает и отбрасывает первые n строк, поэтому каждая следующая
+# страница дороже предыдущей. Здесь следующая страница начинается с условия на значения колонок
+# ORDER BY последней выданной строки:
+#   ORDER BY x, y  ->  WHERE (x, y) > (:x, :y) ORDER BY x, y LIMIT :n
+# и при индексе по (x, y) SQLite сразу переходит к нужной позиции индекса - время страницы
+# не зависит от ее номера.
+#
+# Значения ключа последней строки упаковываются в непрозрачный токен продолжения (base64 от JSON
+# вместе с отпечатком запроса), который клиент передает за следующей страницей.
+#
+# Требования к запросу: ORDER BY по колонкам (желательно покрытым индексом), значения которых
+# не NULL и в сумме уникальны. Если запрос читает одну таблицу с первичным ключом и ключ не входит
+# в ORDER BY, он добавляется последним, чтобы строки с одинаковыми значениями не терялись
+# на границе страниц. Работает и с Connection (Core), и с Session (ORM select(User)).
+
+DEFAULT_PAGE_SIZE = 100
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class Page:
+
+    def __init__(self, items, next_token):
+        self.items = items
+        # None - страница последняя.
+        self.next_token = next_token
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"Page(items={len(self.items)}, next_token={self.next_token!r})"
+
+
+def order_keys(stmt):
+    # Возвращает [(колонка, по убыванию)] для ORDER BY запроса, дополненный первичным ключом.
+    if not stmt._order_by_clauses:
+        raise ValueError("keyset pagination needs a statement with ORDER BY")
+    keys = []
+    for clause in stmt._order_by_clauses:
+        descending = False
+        if isinstance(clause, UnaryExpression) and clause.modifier in (operators.desc_op, operators.asc_op):
+            descending = clause.modifier is operators.desc_op
+            clause = clause.element
+        if not hasattr(clause, "table"):
+            raise ValueError(f"keyset pagination can only order by columns, got {clause}")
+        keys.append((clause, descending))
+
+    froms = stmt.get_final_froms()
+    if len(froms) == 1 and len(froms[0].primary_key) == 1:
+        pk = list(froms[0].primary_key)[0]
+        if not any(column.compare(pk) for column, _ in keys):
+            keys.append((pk, keys[-1][1]))
+    return keys
+
+
+def seek_predicate(keys, values):
+    # (x, y) > (:x, :y), если все колонки в одном направлении; иначе развернутое условие
+    # x > :x OR (x = :x AND y < :y) ...
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1:
+        left = tuple_(*[column for column, _ in keys])
+        right = tuple_(*values)
+        return left < right if directions.pop() else left > right
+
+    alternatives = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        alternatives.append(and_(*equal, step))
+    return or_(*alternatives)
+
+
+def _fingerprint(keys):
+    # Токен привязан к колонкам и направлениям сортировки, а не к тексту запроса целиком:
+    # компиляция запроса в строку на каждой странице стоила бы дороже самой выборки.
+    signature = "|".join(f"{column}:{int(descending)}" for column, descending in keys)
+    return hashlib.sha256(signature.encode()).hexdigest()[:16]
+
+
+def encode_token(keys, values):
+    data = json.dumps({"q": _fingerprint(keys), "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_token(keys, token):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        values = data["k"]
+        fingerprint = data["q"]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidToken("malformed continuation token") from None
+    if fingerprint != _fingerprint(keys) or len(values) != len(keys):
+        raise InvalidToken("continuation token belongs to a different query")
+    return values
+
+
+class KeysetQuery:
+    # Запросы первой и следующих страниц строятся один раз на исходный select(), значения ключа
+    # и размер страницы передаются параметрами - на каждой странице остается только выполнение
+    # запроса из кэша скомпилированных запросов.
+
+    def __init__(self, stmt):
+        self.keys = order_keys(stmt)
+        # column_descriptions у Core select() в SQLAlchemy 1.4.23 не реализован, поэтому он
+        # читается только у ORM запросов.
+        if stmt._propagate_attrs.get("compile_state_plugin") == "orm":
+            descriptions = stmt.column_descriptions
+            self.width = len(descriptions)
+            # select(User) -> отдаются экземпляры User, а не строки из одного элемента.
+            self.entity = self.width == 1 and descriptions[0]["expr"] is descriptions[0]["type"]
+        else:
+            self.width = len(stmt.selected_columns)
+            self.entity = False
+
+        # Значения ключа выбираются дополнительными колонками после колонок самого запроса.
+        ordered = stmt.order_by(None).order_by(
+            *[column.desc() if descending else column for column, descending in self.keys]
+        ).add_columns(*[column for column, _ in self.keys]).limit(bindparam("page_limit"))
+        self.first_stmt = ordered
+        self.seek_names = [f"seek_{i}" for i in range(len(self.keys))]
+        self.next_stmt = ordered.where(seek_predicate(self.keys, [
+            bindparam(name, type_=column.type) for name, (column, _) in zip(self.seek_names, self.keys)
+        ]))
+
+    def page(self, conn, page_size=DEFAULT_PAGE_SIZE, token=None):
+        # Лишняя строка показывает, есть ли следующая страница.
+        params = {"page_limit": page_size + 1}
+        if token is None:
+            stmt = self.first_stmt
+        else:
+            stmt = self.next_stmt
+            params.update(zip(self.seek_names, decode_token(self.keys, token)))
+        rows = conn.execute(stmt, params).all()
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        width = self.width
+        if self.entity:
+            items = [row[0] for row in rows]
+        else:
+            items = [row[:width] for row in rows]
+        next_token = encode_token(self.keys, rows[-1][width:]) if has_more else None
+        return Page(items, next_token)
+
+
+_queries = weakref.WeakKeyDictionary()
+
+
+def keyset_query(stmt):
+    query = _queries.get(stmt)
+    if query is None:
+        query = _queries[stmt] = KeysetQuery(stmt)
+    return query
+
+
+def paginate(conn, stmt, page_size=DEFAULT_PAGE_SIZE, token=None):
+    # conn - Connection или Session. Возвращает Page: строки (или экземпляры модели
+    # для select(User)) и токен следующей страницы.
+    return keyset_query(stmt).page(conn, page_size, token)
+
+
+def iterate_pages(conn, stmt, page_size=DEFAULT_PAGE_SIZE, token=None):
+    # Все страницы подряд, начиная с token.
+    while True:
+        page = paginate(conn, stmt, page_size, token)
+        yield page
+        token = page.next_token
+        if token is None:
+            return
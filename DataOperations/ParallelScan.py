@@ -0,0 +1,156 @@
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from sqlalchemy import bindparam, func, inspect, select
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import instance_state
+
+from DataOperations.Columnar import driver_parameters
+from engine_factory import READ_ONLY_PRAGMAS
+
+# Параллельное чтение большой выборки из файла SQLite несколькими процессами.
+#
+# Запрос select() делится на диапазоны первичного ключа: к WHERE добавляется
+# pk >= :scan_lo AND pk < :scan_hi, и каждый диапазон выполняется в отдельном процессе
+# ProcessPoolExecutor на своем соединении, открытом только на чтение (file:...?mode=ro).
+# В режиме WAL читатели не блокируют друг друга, поэтому разбор страниц и фильтрация
+# идут на нескольких ядрах одновременно, а GIL родительского процесса не мешает.
+#
+# Запрос компилируется один раз в родительском процессе; в процессы передаются только SQL строка
+# и параметры, назад возвращаются кортежи значений (как в DataOperations.Columnar, без обработчиков
+# типов результата). Для select(User) из кортежей собираются detached экземпляры модели.
+#
+# Диапазоны делятся поровну по значениям ключа между min(pk) и max(pk), что хорошо работает
+# для плотных автоинкрементных id. Запросы с ORDER BY, LIMIT/OFFSET и GROUP BY не делятся
+# на независимые диапазоны и не поддерживаются. База в памяти недоступна другим процессам.
+
+# Диапазонов больше, чем процессов, чтобы быстрые процессы забирали оставшуюся работу.
+PARTITIONS_PER_WORKER = 4
+
+# Соединения процесса-обработчика, по одному на файл базы.
+_connections = {}
+
+
+def _read_only_connection(path):
+    conn = _connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+        for name, value in READ_ONLY_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        _connections[path] = conn
+    return conn
+
+
+def _scan_partition(task):
+    path, sql, params = task
+    return _read_only_connection(path).execute(sql, params).fetchall()
+
+
+def _database_path(engine):
+    database = engine.url.database
+    if not database or database == ":memory:":
+        raise ValueError("parallel scans need a file database, in-memory SQLite is private to one process")
+    return database
+
+
+def _scan_table(stmt):
+    if stmt._order_by_clauses or stmt._group_by_clauses:
+        raise ValueError("parallel scans do not support ORDER BY or GROUP BY")
+    if stmt._limit_clause is not None or stmt._offset_clause is not None:
+        raise ValueError("parallel scans do not support LIMIT or OFFSET")
+    froms = stmt.get_final_froms()
+    if len(froms) != 1 or len(froms[0].primary_key) != 1:
+        raise ValueError("parallel scans need a single table with a single-column primary key")
+    return froms[0]
+
+
+def _entity_mapper(stmt):
+    # select(User) -> mapper User, select(user_table) и select(User.name) -> None.
+    # column_descriptions у Core select() в SQLAlchemy 1.4.23 не реализован.
+    if stmt._propagate_attrs.get("compile_state_plugin") != "orm":
+        return None
+    descriptions = stmt.column_descriptions
+    if len(descriptions) == 1 and descriptions[0]["expr"] is descriptions[0]["type"]:
+        return inspect(descriptions[0]["entity"])
+    return None
+
+
+def pk_ranges(conn, pk, partitions):
+    # Делит [min(pk), max(pk)] на не более чем partitions полуинтервалов [lo, hi).
+    low, high = conn.execute(select(func.min(pk), func.max(pk))).one()
+    if low is None:
+        return []
+    span = high - low + 1
+    partitions = max(1, min(partitions, span))
+    step = -(-span // partitions)
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+def _instances(mapper, columns, rows):
+    keys = [mapper.get_property_by_column(column).key for column in columns]
+    new_instance = mapper.class_manager.new_instance
+    for row in rows:
+        # Значения кладутся прямо в __dict__ экземпляра, минуя __init__ и события атрибутов,
+        # после чего экземпляр получает identity key и ведет себя как загруженный и
+        # отсоединенный от Session.
+        obj = new_instance()
+        instance_state(obj).dict.update(zip(keys, row))
+        make_transient_to_detached(obj)
+        yield obj
+
+
+def parallel_scan(engine, stmt, workers=None, partitions=None, executor=None, ordered=True):
+    # Выполняет stmt по диапазонам первичного ключа и отдает строки (или экземпляры модели
+    # для select(User)) по мере готовности диапазонов. При ordered=True диапазоны отдаются
+    # по возрастанию ключа, иначе - в порядке завершения.
+    # executor - готовый ProcessPoolExecutor, чтобы не запускать процессы на каждый запрос.
+    path = _database_path(engine)
+    table = _scan_table(stmt)
+    pk = list(table.primary_key)[0]
+    mapper = _entity_mapper(stmt)
+
+    if workers is None:
+        # Число процессов готового executor из него не узнать без приватных атрибутов:
+        # вместе с executor передается и workers, иначе диапазоны считаются по числу ядер.
+        workers = os.cpu_count() or 1
+    if partitions is None:
+        partitions = workers * PARTITIONS_PER_WORKER
+
+    with engine.connect() as conn:
+        ranges = pk_ranges(conn, pk, partitions)
+        # Как в DataOperations.Columnar.driver_statement(): IN (...) раскрывается при компиляции,
+        # параметры проходят обработчики типов. render_postcompile требует значения всех параметров,
+        # поэтому у границ диапазона есть значения по умолчанию, заменяемые для каждого диапазона.
+        compiled = stmt.where(pk >= bindparam("scan_lo", 0), pk < bindparam("scan_hi", 0)).compile(
+            dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+        )
+    tasks = [
+        (path, compiled.string, driver_parameters(compiled, {"scan_lo": low, "scan_hi": high}))
+        for low, high in ranges
+    ]
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        if ordered:
+            results = executor.map(_scan_partition, tasks)
+        else:
+            results = (future.result() for future in as_completed(
+                [executor.submit(_scan_partition, task) for task in tasks]
+            ))
+        for rows in results:
+            if mapper is not None:
+                yield from _instances(mapper, stmt.selected_columns, rows)
+            else:
+                yield from rows
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def parallel_fetch(engine, stmt, workers=None, partitions=None, executor=None):
+    # Все строки одним списком, по возрастанию первичного ключа.
+    return list(parallel_scan(engine, stmt, workers, partitions, executor))
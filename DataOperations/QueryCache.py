@@ -0,0 +1,236 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import Table, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
+
+# Кэш результатов запросов на чтение для часто повторяющихся выборок,
+# например select(User).where(User.name == ...) из Select.py.
+#
+# Ключ кэша - ключ скомпилированного запроса (тот же, по которому SQLAlchemy находит запрос
+# в кэше компиляции) плюс значения всех параметров. Записи вытесняются по LRU при превышении
+# maxsize и устаревают через ttl секунд. Ключ запроса SQLAlchemy запоминает на самом объекте
+# запроса, поэтому горячие выборки лучше собирать один раз с bindparam() и передавать значения
+# через params: тогда попадание в кэш не строит ни запрос, ни его ключ заново.
+#
+# Инвалидация по записи: ResultCache.listen(engine) подписывается на выполнение запросов и для каждого
+# INSERT/UPDATE/DELETE (в том числе из Session.flush()) увеличивает счетчик поколения таблицы.
+# Запись кэша хранит поколения таблиц, из которых читал запрос, и при несовпадении считается
+# устаревшей. Поколение увеличивается еще раз при commit/rollback пишущей транзакции: иначе
+# другое соединение могло бы закэшировать данные, прочитанные до фиксации записи.
+#
+# Соединение или Session с незафиксированной записью в таблицы запроса работает мимо кэша:
+# оно должно видеть свои изменения, а другие - не должны.
+#
+# ORM запросы выполняются в отдельной короткой Session, поэтому в кэш попадают отсоединенные
+# экземпляры моделей. Они общие для всех, кто получил их из кэша, и их нельзя менять на месте:
+# для изменения экземпляр переносится в свою Session через session.merge(obj, load=False).
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 60.0
+
+WRITES_KEY = "result_cache_writes"
+
+_WRITE_SQL = re.compile(
+    r"^\s*(?:(?:insert|replace)(?:\s+or\s+\w+)?\s+into|update(?:\s+or\s+\w+)?|delete\s+from)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE
+)
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item)) for key, item in value.items()))
+    return value
+
+
+def written_tables(statement, context=None):
+    # Имена таблиц, в которые пишет запрос; None - запрос меняет неизвестно что (DDL).
+    # Пустое множество - запрос только читает. Чтением считаются только SELECT и EXPLAIN:
+    # WITH ... UPDATE или PRAGMA x=y тоже пишут, и для них сбрасывается весь кэш.
+    compiled = getattr(context, "compiled", None)
+    if compiled is not None and getattr(compiled.statement, "is_dml", False):
+        return {compiled.statement.table.name}
+    sql = statement.lstrip().lower()
+    if sql.startswith(("select", "explain", "savepoint", "release")):
+        return set()
+    match = _WRITE_SQL.match(sql)
+    return {match.group(1)} if match else None
+
+
+class ResultCache:
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, clock=time.monotonic):
+        # ttl=None - записи устаревают только по инвалидации.
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._dependencies = {}
+        self._generations = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bypassed = 0
+
+    # Инвалидация
+
+    def listen(self, engine):
+        # after_cursor_execute, а не after_execute: в режиме future=True exec_driver_sql()
+        # (им пишет DataOperations.Loader) не вызывает after_execute. Цена - несколько
+        # микросекунд на каждый запрос engine, см. комментарий в instrumentation.py.
+        @event.listens_for(engine, "after_cursor_execute")
+        def invalidate_on_write(conn, cursor, statement, parameters, context, executemany):
+            tables = written_tables(statement, context)
+            if tables is None or tables:
+                self.invalidate(tables)
+                pending = conn.info.setdefault(WRITES_KEY, set())
+                pending.update(tables if tables is not None else {None})
+
+        @event.listens_for(engine, "commit")
+        @event.listens_for(engine, "rollback")
+        def invalidate_on_transaction_end(conn):
+            pending = conn.info.pop(WRITES_KEY, None)
+            if pending:
+                self.invalidate(None if None in pending else pending)
+
+        return self
+
+    def invalidate(self, tables=None):
+        # tables - имена таблиц; None сбрасывает весь кэш.
+        with self._lock:
+            self.invalidations += 1
+            if tables is None:
+                self._epoch += 1
+                self._entries.clear()
+                return
+            for name in tables:
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+    def clear(self):
+        self.invalidate(None)
+
+    # Выборка
+
+    def _dependencies_of(self, stmt, shape):
+        tables = self._dependencies.get(shape)
+        if tables is None:
+            tables = tuple(sorted({
+                table.name for table in find_tables(stmt, check_columns=True, include_aliases=True)
+                if isinstance(table, Table)
+            }))
+            self._dependencies[shape] = tables
+        return tables
+
+    def _versions(self, tables):
+        return (self._epoch,) + tuple(self._generations.get(name, 0) for name in tables)
+
+    def execute(self, bind, stmt, params=None):
+        # bind - Engine, Connection или Session. Возвращает список Row; для ORM запросов
+        # в строках лежат отсоединенные экземпляры моделей.
+        cache_key = stmt._generate_cache_key()
+        if cache_key is None:
+            self.bypassed += 1
+            return _run(bind, stmt, params, detach=False)
+        tables = self._dependencies_of(stmt, cache_key.key)
+        if _has_pending_writes(bind, tables):
+            self.bypassed += 1
+            return _run(bind, stmt, params, detach=False)
+
+        key = (
+            cache_key.key,
+            tuple(_hashable(bind_param.effective_value) for bind_param in cache_key.bindparams),
+            _hashable(params or {}),
+        )
+        now = self.clock()
+        with self._lock:
+            versions = self._versions(tables)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_versions, rows = entry
+                if entry_versions == versions and (expires_at is None or now < expires_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return rows
+                del self._entries[key]
+                if entry_versions == versions:
+                    self.expired += 1
+            self.misses += 1
+
+        # Поколения зафиксированы до выполнения: если запись в таблицу произойдет во время
+        # выборки, сохраненный результат сразу окажется устаревшим.
+        rows = _run(bind, stmt, params)
+        expires_at = None if self.ttl is None else now + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, versions, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return rows
+
+    def scalars(self, bind, stmt, params=None):
+        # Первый элемент каждой строки, например экземпляры User для select(User).
+        return [row[0] for row in self.execute(bind, stmt, params)]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "bypassed": self.bypassed,
+            }
+
+
+def _is_orm(stmt):
+    # column_descriptions у Core select() в SQLAlchemy 1.4.23 не реализован, поэтому Core запрос
+    # отсекается до обращения к нему.
+    if stmt._propagate_attrs.get("compile_state_plugin") != "orm":
+        return False
+    return any(description.get("entity") is not None for description in stmt.column_descriptions)
+
+
+def _has_pending_writes(bind, tables):
+    if isinstance(bind, Session):
+        if bind.new or bind.dirty or bind.deleted:
+            return True
+        if not bind.in_transaction():
+            return False
+        bind = bind.connection()
+    if isinstance(bind, Connection):
+        pending = bind.info.get(WRITES_KEY)
+        return bool(pending) and (None in pending or not pending.isdisjoint(tables))
+    return False
+
+
+def _run(bind, stmt, params, detach=True):
+    # detach=False - результат не кэшируется и выполняется прямо в Session вызывающего,
+    # чтобы она видела свои еще не записанные изменения.
+    if isinstance(bind, Session) and not detach:
+        return bind.execute(stmt, params).all()
+    if _is_orm(stmt):
+        # Отдельная Session на том же соединении (или engine): экземпляры не попадают
+        # в identity map вызывающей Session и после close() становятся отсоединенными.
+        if isinstance(bind, Session):
+            bind = bind.connection()
+        with Session(bind=bind) as session:
+            return session.execute(stmt, params).all()
+    if isinstance(bind, Engine):
+        with bind.connect() as conn:
+            return conn.execute(stmt, params).all()
+    return bind.execute(stmt, params).all()
@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Режим только для чтения: компактные DTO вместо ORM экземпляров.
+#
+# Каждый ORM экземпляр User/Address - это объект с __dict__, InstanceState с историей изменений
+# и запись в identity map Session. Для эндпоинтов, которые только отдают данные, это лишняя
+# работа и память. Здесь select(User) переписывается в выборку колонок модели
+# (with_only_columns сохраняет WHERE, ORDER BY и LIMIT) и выполняется на Connection, без Session,
+# а каждая строка превращается в namedtuple с полями модели - кортеж с __slots__ = ().
+#
+# DTO нельзя изменить, и они не знают о связях: addresses пользователя выбираются отдельным
+# запросом select(Address).where(Address.user_id == ...).
+
+DEFAULT_PARTITION_SIZE = 1000
+
+_dto_types = {}
+
+
+def dto_type(model):
+    # namedtuple с полями - колонками модели в порядке маппера, один тип на модель.
+    dto = _dto_types.get(model)
+    if dto is None:
+        keys = [attr.key for attr in inspect(model).column_attrs]
+        dto = namedtuple(f"{model.__name__}Row", keys)
+        _dto_types[model] = dto
+    return dto
+
+
+def dto_statement(stmt):
+    # select(User)... -> (select(User.id, User.name, User.fullname)..., тип DTO).
+    # column_descriptions у Core select() в SQLAlchemy 1.4.23 не реализован, Core запрос
+    # отклоняется до обращения к нему.
+    if stmt._propagate_attrs.get("compile_state_plugin") != "orm":
+        descriptions = []
+    else:
+        descriptions = stmt.column_descriptions
+    if len(descriptions) != 1 or descriptions[0]["expr"] is not descriptions[0]["type"]:
+        raise ValueError("DTO loading expects a statement selecting a single mapped class, e.g. select(User)")
+    model = descriptions[0]["entity"]
+    dto = dto_type(model)
+    columns = [getattr(model, key) for key in dto._fields]
+    return stmt.with_only_columns(*columns), dto
+
+
+def fetch_dtos(bind, stmt):
+    # bind - Engine, Connection или Session. Session используется только ради ее соединения
+    # и транзакции, identity map не затрагивается.
+    column_stmt, dto = dto_statement(stmt)
+    make = dto._make
+    if isinstance(bind, Engine):
+        with bind.connect() as conn:
+            return [make(row) for row in conn.execute(column_stmt)]
+    if isinstance(bind, Session):
+        bind = bind.connection()
+    return [make(row) for row in bind.execute(column_stmt)]
+
+
+def stream_dtos(engine, stmt, partition_size=DEFAULT_PARTITION_SIZE):
+    column_stmt, dto = dto_statement(stmt)
+    make = dto._make
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(column_stmt)
+        for partition in result.partitions(partition_size):
+            yield from map(make, partition)
@@ -0,0 +1,95 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from engine_factory import DEFAULT_DATABASE_PATH, create_read_only_engine, create_sqlite_engine
+
+# Разделение чтения и записи для файловой базы SQLite в режиме WAL.
+#
+# Во всех примерах (Select.py, ORM_Data_manipulation.py) Session(engine) работает с одним engine.
+# В WAL читатели не мешают писателю, но только на своих соединениях. ReadWriteEngines - пара engine
+# над одним файлом:
+#   writer  - одно соединение (pool_size=1): все INSERT/UPDATE/DELETE и flush идут через него, и
+#             писатели одного процесса ждут друг друга в пуле, а не в "database is locked"
+#   reader  - пул соединений file:...?mode=ro (engine_factory.create_read_only_engine) для select()
+#
+# RoutingSession выбирает engine в get_bind(): запросы SELECT (и text("SELECT ...")) - reader,
+# все остальное - writer. Другие текстовые запросы по тексту не разбираются: text("WITH ... INSERT")
+# или text("PRAGMA x=y") тоже пишут, поэтому идут на writer. Текстовое чтение, которое начинается
+# не с SELECT, можно отправить на reader опцией запроса:
+#   text("WITH ... SELECT ...").execution_options(read_only=True)
+# read_only=False, наоборот, отправляет на writer любой запрос.
+# Чтение своих записей: как только в транзакции Session что-то записала
+# (flush или DML), все следующие запросы этой транзакции идут на writer - соединение reader
+# не видит незафиксированных изменений. После commit/rollback Session снова читает с reader.
+# Autoflush выполняется до выбора engine для запроса, поэтому запрос, перед которым сбрасываются
+# изменения, тоже попадает на writer.
+#
+# Данные, зафиксированные другой Session, reader видит с начала своей следующей транзакции
+# чтения: SQLite читает снимок базы на момент первого запроса транзакции.
+
+READ_ONLY_OPTION = "read_only"
+
+
+def is_read(clause):
+    if clause is None:
+        # session.connection() без запроса - обычно для записи через exec_driver_sql.
+        return False
+    read_only = clause.get_execution_options().get(READ_ONLY_OPTION)
+    if read_only is not None:
+        return bool(read_only)
+    if isinstance(clause, TextClause):
+        words = clause.text.split(None, 1)
+        return bool(words) and words[0].lower() == "select"
+    return getattr(clause, "is_select", False) and getattr(clause, "_for_update_arg", None) is None
+
+
+class RoutingSession(Session):
+
+    def __init__(self, writer, reader, **kwargs):
+        super().__init__(**kwargs)
+        self.writer = writer
+        self.reader = reader
+        self.wrote = False
+        self.reads = 0
+        self.writes = 0
+        event.listen(self, "after_transaction_end", self._reset_after_transaction)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or self.wrote or not is_read(clause):
+            self.wrote = True
+            self.writes += 1
+            return self.writer
+        self.reads += 1
+        return self.reader
+
+    @staticmethod
+    def _reset_after_transaction(session, transaction):
+        if transaction.parent is None:
+            session.wrote = False
+
+
+class ReadWriteEngines:
+
+    def __init__(self, path=DEFAULT_DATABASE_PATH, readers=4, **engine_kwargs):
+        # Писатель создается первым: файл базы и журнал WAL должны существовать до того,
+        # как их откроют соединения только для чтения.
+        self.writer = create_sqlite_engine(path, pool_size=1, max_overflow=0, **engine_kwargs)
+        with self.writer.connect():
+            pass
+        self.reader = create_read_only_engine(path, pool_size=readers, max_overflow=0, **engine_kwargs)
+
+    def session(self, **kwargs):
+        return RoutingSession(self.writer, self.reader, **kwargs)
+
+    def connect(self):
+        # Core: чтение.
+        return self.reader.connect()
+
+    def begin(self):
+        # Core: транзакция записи.
+        return self.writer.begin()
+
+    def dispose(self):
+        self.reader.dispose()
+        self.writer.dispose()
@@ -6,17 +6,23 @@ from str_patterns import underline_for_header
 # ORM и Core для запросов на выборку данных пользуются оператором sqlalchemy.select
 # Однако в ORM есть возможность использовать достаточно много дополнительных опций.
 from SQL_Alchemy_metadata import *
-from SQL_Alchemy_metadata import engine
-import Insert
+from DataOperations.Insert import seed_users_and_addresses
+from engine_factory import get_engine
+
+# Импорт модуля не трогает базу: выборки оформлены функциями, а данные для них
+# заполняются явно в main() через seed_users_and_addresses().
 
 
-print(underline_for_header.format("Select Block"))
 stmt = select(user_table).where(user_table.c.name == "spongebob")
-print(stmt)
 
-with engine.connect() as conn:
-    for row in conn.execute(stmt):
-        print(row)
+
+def select_core(engine):
+    print(underline_for_header.format("Select Block"))
+    print(stmt)
+
+    with engine.connect() as conn:
+        for row in conn.execute(stmt):
+            print(row)
 # Пример простого Select. Как и в остальных случаях, Оператор передается на исполнение либо
 # объекту Connections, в случае с core режимом, либо Объекту Session, в случае, когда мы работаем с ORM.
 # Вывод:
@@ -32,13 +38,16 @@ with engine.connect() as conn:
 # 2021-09-14 00:17:11,224 INFO sqlalchemy.engine.Engine ROLLBACK
 
 
-print(underline_for_header.format("Select Block with ORM style"))
-
-stmt = select(User).where(User.name == 'spongebob')
+orm_stmt = select(User).where(User.name == 'spongebob')
 from sqlalchemy.orm import Session
-with Session(engine) as session:
-    for row in session.execute(stmt):
-        print(row)
+
+
+def select_orm(engine):
+    print(underline_for_header.format("Select Block with ORM style"))
+
+    with Session(engine) as session:
+        for row in session.execute(orm_stmt):
+            print(row)
 # В случае с ORM результатом select будет не набор Row обхектов, а набор Экземпляров класса модели, которую вы
 # пытаетесь получить.
 # Вывод:
@@ -51,5 +60,13 @@ with Session(engine) as session:
 # 2021-09-14 00:31:34,414 INFO sqlalchemy.engine.Engine ROLLBACK
 
 
+def main(engine=None):
+    if engine is None:
+        engine = get_engine()
+    seed_users_and_addresses(engine)
+    select_core(engine)
+    select_orm(engine)
 
 
+if __name__ == "__main__":
+    main()
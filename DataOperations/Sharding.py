@@ -0,0 +1,368 @@
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.engine.result import result_tuple
+from sqlalchemy.sql.elements import (
+    BindParameter, BinaryExpression, BooleanClauseList, UnaryExpression, _textual_label_reference
+)
+from sqlalchemy.sql.functions import FunctionElement
+
+from engine_factory import create_sqlite_engine, run_in_transaction
+from SQL_Alchemy_metadata import Address, address_table, user_table
+
+# Горизонтальное разбиение таблицы address по нескольким файлам SQLite.
+#
+# user_account остается в основной базе ("primary"), а строки address раскладываются по N файлам
+# по хэшу user_id (crc32 от 8 байт значения, по модулю N): все адреса одного пользователя лежат
+# в одном файле. Запись в разные файлы не конкурирует за одну блокировку записи, и VACUUM
+# выполняется по частям. Число частей менять нельзя без переноса данных: у адреса изменится файл.
+#
+# Первичные ключи address не должны повторяться между файлами, поэтому в части i выдаются только
+# id с остатком i по модулю N (N + i, 2N + i, ...). По id тоже можно найти часть: id % N.
+#
+# Доступ:
+#   AddressShards.session()   - ORM Session (sqlalchemy.ext.horizontal_shard.ShardedSession):
+#                               User пишутся и читаются в primary, Address - в часть по user_id;
+#                               запросы select(Address) с условием Address.user_id == ... / .in_(...)
+#                               или Address.id == ... идут только в нужные части, остальные - во все
+#                               части по очереди
+#   AddressShards.execute()   - выполнение запроса к address во всех нужных частях параллельно
+#                               (поток на часть, свое соединение у каждой); результаты сливаются,
+#                               ORDER BY, DISTINCT и LIMIT/OFFSET применяются к объединенному
+#                               результату. Выражения ORDER BY добавляются в запрос к каждой части
+#                               скрытыми колонками, поэтому сортировать можно и по невыбранным
+#                               колонкам; в итоговых строках скрытых колонок нет
+#   AddressShards.insert_addresses() - пачка строк address, раскладывается по частям и пишется
+#                               в них параллельно
+#
+# Запросы с GROUP BY и агрегатами (count(*), sum(...)) при слиянии не объединяются: результат
+# содержал бы по строке от каждой части, поэтому execute() выполняет их только в пределах одной
+# части (условие по user_id) и отклоняет при обращении к нескольким.
+# DISTINCT выполняется в каждой части и еще раз после слияния (одинаковые строки из разных частей
+# остаются один раз); ORDER BY в запросе с DISTINCT, как и в стандартном SQL, допускается только
+# по выбранным колонкам. JOIN user_account с address невозможен - таблицы в разных файлах.
+
+PRIMARY = "primary"
+
+
+def shard_ids(count):
+    return [f"address_{index}" for index in range(count)]
+
+
+def shard_index(user_id, count):
+    return zlib.crc32(int(user_id).to_bytes(8, "little", signed=True)) % count
+
+
+# Разбор условий запроса
+
+def _is_column(element, column):
+    # По именам: у модели Address своя таблица "address" в Base.metadata, не address_table.
+    table = getattr(element, "table", None)
+    return getattr(table, "name", None) == column.table.name and getattr(element, "name", None) == column.name
+
+
+def _bound_value(element, params):
+    if not isinstance(element, BindParameter):
+        return None
+    if params and element.key in params:
+        return params[element.key]
+    return element.effective_value
+
+
+def _criteria(stmt):
+    # lambda_stmt (ими строит запросы selectin загрузка связей) хранит готовый запрос в _resolved.
+    stmt = getattr(stmt, "_resolved", stmt)
+    return getattr(stmt, "_where_criteria", ())
+
+
+def _values_for(column, criteria, params):
+    # Значения column из условий вида column == :value и column IN (...) на верхнем уровне AND,
+    # None - по условиям нельзя ограничить набор значений.
+    for criterion in criteria:
+        if isinstance(criterion, BooleanClauseList) and criterion.operator is operators.and_:
+            found = _values_for(column, criterion.clauses, params)
+        elif isinstance(criterion, BinaryExpression) and _is_column(criterion.left, column):
+            value = _bound_value(criterion.right, params)
+            if value is None:
+                found = None
+            elif criterion.operator is operators.eq:
+                found = {value}
+            elif criterion.operator is operators.in_op:
+                found = set(value)
+            else:
+                found = None
+        elif (
+                isinstance(criterion, BinaryExpression)
+                and criterion.operator is operators.eq
+                and _is_column(criterion.right, column)
+        ):
+            # Ленивая загрузка связи строит условие в обратном порядке: :param_1 = address.user_id.
+            value = _bound_value(criterion.left, params)
+            found = None if value is None else {value}
+        else:
+            found = None
+        if found is not None:
+            return found
+    return None
+
+
+class AddressShards:
+
+    def __init__(self, primary, shards):
+        # primary - engine с user_account, shards - список engine частей address.
+        self.primary = primary
+        self.shards = list(shards)
+        self.ids = shard_ids(len(self.shards))
+        self.engines = dict(zip(self.ids, self.shards))
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="address-shard")
+        for index, engine in enumerate(self.shards):
+            _shard_engines[engine] = (index, len(self.shards))
+
+    @classmethod
+    def from_path(cls, path, count, **engine_kwargs):
+        # Части лежат рядом с основной базой: tutorial.sqlite3 -> tutorial.address-0.sqlite3, ...
+        stem, ext = os.path.splitext(path)
+        shards = [create_sqlite_engine(f"{stem}.address-{index}{ext}", **engine_kwargs) for index in range(count)]
+        return cls(create_sqlite_engine(path, **engine_kwargs), shards)
+
+    def create_schema(self):
+        # user_account - только в primary, address - в каждой части. Внешний ключ на user_account
+        # в частях SQLite не проверяет (PRAGMA foreign_keys выключена), таблицу он создать не мешает.
+        user_table.create(self.primary, checkfirst=True)
+        for engine in self.shards:
+            address_table.create(engine, checkfirst=True)
+        return self
+
+    def dispose(self):
+        self._executor.shutdown()
+        for engine in self.shards:
+            _shard_engines.pop(engine, None)
+            engine.dispose()
+        self.primary.dispose()
+
+    # Маршрутизация
+
+    def shard_for_user(self, user_id):
+        return self.ids[shard_index(user_id, len(self.ids))]
+
+    def shard_for_address_id(self, address_id):
+        return self.ids[address_id % len(self.ids)]
+
+    def shards_for(self, stmt, params=None):
+        # Части, в которых может быть результат запроса к address.
+        criteria = _criteria(stmt)
+        user_ids = _values_for(address_table.c.user_id, criteria, params)
+        if user_ids is not None:
+            return sorted({self.shard_for_user(user_id) for user_id in user_ids})
+        address_ids = _values_for(address_table.c.id, criteria, params)
+        if address_ids is not None:
+            return sorted({self.shard_for_address_id(address_id) for address_id in address_ids})
+        return list(self.ids)
+
+    def _is_address(self, mapper):
+        return mapper is not None and mapper.local_table.name == address_table.name
+
+    # ORM
+
+    def session(self, **kwargs):
+        return ShardedSession(
+            shard_chooser=self._shard_chooser,
+            id_chooser=self._id_chooser,
+            execute_chooser=self._execute_chooser,
+            shards=dict(self.engines, **{PRIMARY: self.primary}),
+            **kwargs
+        )
+
+    def _shard_chooser(self, mapper, instance, clause=None):
+        if not self._is_address(mapper):
+            return PRIMARY
+        if instance is not None:
+            user_id = instance.user_id
+            user = instance.__dict__.get("user")
+            if user_id is None and user is not None:
+                user_id = user.id
+            if user_id is None:
+                raise ValueError(f"{instance!r} has no user_id, its address shard is unknown")
+            return self.shard_for_user(user_id)
+        shards = self.shards_for(clause) if clause is not None else self.ids
+        if len(shards) != 1:
+            raise ValueError("address statement does not name a single user_id, pass shard_id explicitly")
+        return shards[0]
+
+    def _id_chooser(self, query, ident):
+        if self._is_address(query._only_full_mapper_zero("id_chooser")):
+            return [self.shard_for_address_id(ident[0])]
+        return [PRIMARY]
+
+    def _execute_chooser(self, orm_context):
+        if not self._is_address(orm_context.bind_mapper):
+            return [PRIMARY]
+        return self.shards_for(orm_context.statement, orm_context.parameters)
+
+    # Параллельное выполнение
+
+    def _run_on_shard(self, shard_id, stmt, params, orm):
+        engine = self.engines[shard_id]
+        if orm:
+            # Своя Session в каждом потоке; после закрытия экземпляры Address отсоединены.
+            with Session(engine) as session:
+                return session.execute(stmt, params).all()
+        with engine.connect() as conn:
+            return conn.execute(stmt, params).all()
+
+    def execute(self, stmt, params=None):
+        # Список строк запроса к address из всех нужных частей; для select(Address) в строках
+        # лежат отсоединенные экземпляры.
+        shards = self.shards_for(stmt, params)
+        # column_descriptions у Core select() в SQLAlchemy 1.4.23 не реализован.
+        orm = stmt._propagate_attrs.get("compile_state_plugin") == "orm"
+        if len(shards) == 1:
+            return self._run_on_shard(shards[0], stmt, params, orm)
+        if stmt._group_by_clauses:
+            raise ValueError("sharded fan-out does not merge GROUP BY results")
+        if _has_aggregate(stmt):
+            raise ValueError("sharded fan-out does not merge aggregates such as count(), filter by user_id instead")
+
+        # Каждая часть отдает limit + offset строк, срез делается после слияния.
+        limit, offset = stmt._limit, stmt._offset or 0
+        order = _order_keys(stmt)
+        width = len(stmt.column_descriptions) if orm else len(stmt.selected_columns)
+        shard_stmt = stmt.offset(None)
+        if order:
+            shard_stmt = shard_stmt.add_columns(
+                *[expression.label(f"shard_sort_{index}") for index, (expression, _) in enumerate(order)]
+            )
+        if limit is not None:
+            shard_stmt = shard_stmt.limit(limit + offset)
+        futures = [self._executor.submit(self._run_on_shard, shard, shard_stmt, params, orm) for shard in shards]
+        rows = [row for future in futures for row in future.result()]
+        if order:
+            rows = _sorted(rows, order, width)
+        if stmt._distinct:
+            rows = _unique(rows)
+        if offset or limit is not None:
+            rows = list(islice(rows, offset, None if limit is None else offset + limit))
+        return rows
+
+    def scalars(self, stmt, params=None):
+        return [row[0] for row in self.execute(stmt, params)]
+
+    def insert_addresses(self, rows):
+        # rows - словари с user_id и email_address (id выдается здесь). Возвращает число строк.
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(self.shard_for_user(row["user_id"]), []).append(row)
+
+        def write(shard_id, shard_rows):
+            index = self.ids.index(shard_id)
+
+            def work(conn):
+                step = len(self.ids)
+                next_id = _next_address_id(conn, index, step, len(shard_rows))
+                conn.execute(
+                    insert(address_table),
+                    [dict(row, id=next_id + number * step) for number, row in enumerate(shard_rows)]
+                )
+                return len(shard_rows)
+
+            return run_in_transaction(self.engines[shard_id], work)
+
+        futures = [self._executor.submit(write, shard_id, shard_rows) for shard_id, shard_rows in by_shard.items()]
+        return sum(future.result() for future in futures)
+
+
+AGGREGATES = {"count", "sum", "total", "avg", "min", "max", "group_concat"}
+
+
+def _has_aggregate(stmt):
+    for column in stmt.selected_columns:
+        for node in visitors.iterate(column):
+            if isinstance(node, FunctionElement) and getattr(node, "name", "").lower() in AGGREGATES:
+                return True
+    return False
+
+
+def _order_keys(stmt):
+    # [(выражение, по убыванию)] для ORDER BY запроса. Ссылка по имени (order_by("email_address"))
+    # ищется среди выбранных колонок, затем среди колонок таблиц FROM.
+    keys = []
+    for clause in stmt._order_by_clauses:
+        descending = isinstance(clause, UnaryExpression) and clause.modifier is operators.desc_op
+        expression = clause.element if isinstance(clause, UnaryExpression) else clause
+        if isinstance(expression, _textual_label_reference):
+            expression = _column_by_name(stmt, expression.element)
+        if stmt._distinct and not any(expression.compare(column) for column in stmt.selected_columns):
+            raise ValueError(f"ORDER BY {expression} is not selected, DISTINCT results cannot be ordered by it")
+        keys.append((expression, descending))
+    return keys
+
+
+def _column_by_name(stmt, name):
+    if name in stmt.selected_columns:
+        return stmt.selected_columns[name]
+    for table in stmt.get_final_froms():
+        if name in table.c:
+            return table.c[name]
+    raise ValueError(f"ORDER BY {name!r} does not name a column of the statement")
+
+
+def _sorted(rows, order, width):
+    # Сортировка объединенных строк по скрытым колонкам shard_sort_*, которые идут после width
+    # выбранных. Сортировки стабильны, поэтому ключи применяются от последнего к первому. NULL,
+    # как в SQLite, меньше любого значения. Строки возвращаются без скрытых колонок.
+    for position in reversed(range(len(order))):
+        index = width + position
+        rows = sorted(
+            rows,
+            key=lambda row: (row[index] is not None, row[index]),
+            reverse=order[position][1]
+        )
+    if not rows:
+        return rows
+    make_row = result_tuple(rows[0]._fields[:width])
+    return [make_row(tuple(row)[:width]) for row in rows]
+
+
+def _unique(rows):
+    seen = set()
+    unique = []
+    for row in rows:
+        if row not in seen:
+            seen.add(row)
+            unique.append(row)
+    return unique
+
+
+# Выдача id адресов в частях
+
+# engine части -> (номер части, число частей), заполняется в AddressShards.__init__.
+_shard_engines = {}
+
+
+LAST_ID_KEY = "address_shard_last_id"
+
+
+def _next_address_id(conn, index, count, reserve=1):
+    # Первый из reserve id с остатком index по модулю count, больших всех id части. Последний
+    # выданный id запоминается в conn.info: при flush все before_insert выполняются до INSERT,
+    # и max(id) еще не видит адреса, получившие id раньше. После отката остаются только пропуски.
+    last_id = conn.execute(select(func.max(address_table.c.id))).scalar() or 0
+    last_id = max(last_id, conn.info.get(LAST_ID_KEY, 0))
+    first = (last_id // count + 1) * count + index
+    conn.info[LAST_ID_KEY] = first + (reserve - 1) * count
+    return first
+
+
+@event.listens_for(Address, "before_insert")
+def _assign_address_id(mapper, connection, target):
+    # Для Address, которые ShardedSession пишет в часть, id выдается заранее; в обычной базе
+    # (engine не из AddressShards) id по-прежнему назначает SQLite.
+    shard = _shard_engines.get(connection.engine)
+    if shard is not None and target.id is None:
+        target.id = _next_address_id(connection, *shard)
@@ -0,0 +1,170 @@
+from sqlalchemy import bindparam, delete, insert, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from SQL_Alchemy_metadata import Address, User, address_table, user_table
+
+# Реестр именованных заранее собранных запросов.
+#
+# В примерах запрос строится заново при каждом вызове: insert(user_table).values(...) в Insert.py,
+# select(user_table).where(user_table.c.name == "spongebob") в Select.py. Каждая такая сборка - это
+# создание объектов выражения на Python и вычисление ключа кэша компиляции, и в горячих циклах они
+# заметны в профиле раньше, чем сам SQLite. Здесь запросы собираются один раз с bindparam(),
+# значения передаются параметрами при выполнении. Ключ кэша SQLAlchemy запоминает на объекте
+# запроса, поэтому повторное выполнение сразу находит скомпилированный запрос в кэше engine.
+#
+#   statements.execute(conn, "user.by_name", {"name": "spongebob"})
+#
+# execute_driver() идет дальше: SQL строка и порядок параметров вычисляются один раз для диалекта,
+# запрос уходит в драйвер через exec_driver_sql() без обработки параметров и строк результата
+# типами SQLAlchemy. Поэтому он доступен только для запросов без обработчиков типов параметров
+# (Integer и String в SQLite их не имеют), а строки результата содержат значения драйвера как есть.
+
+
+class StatementRegistry:
+
+    def __init__(self):
+        self._statements = {}
+        self._examples = {}
+        self._compiled = {}
+
+    def register(self, name, stmt, example=None):
+        # example - параметры, с которыми check() выполняет запрос.
+        if name in self._statements:
+            raise ValueError(f"statement {name!r} is already registered")
+        self._statements[name] = stmt
+        self._examples[name] = example or {}
+        return stmt
+
+    def __getitem__(self, name):
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"unknown statement {name!r}, expected one of {sorted(self._statements)}") from None
+
+    def __contains__(self, name):
+        return name in self._statements
+
+    def names(self):
+        return sorted(self._statements)
+
+    def execute(self, bind, name, params=None):
+        # bind - Connection или Session (ORM запросы вроде "user.orm_by_name" - только Session).
+        # Для Engine открывается соединение, результат читается целиком, запись фиксируется.
+        stmt = self[name]
+        if isinstance(bind, Engine):
+            with bind.begin() as conn:
+                result = conn.execute(stmt, params)
+                return result.all() if result.returns_rows else result
+        return bind.execute(stmt, params)
+
+    def check(self, engine):
+        # Выполняет каждый запрос реестра через execute() с параметрами из register() в порядке
+        # регистрации в одной транзакции и откатывает ее. Ошибка компиляции или выполнения
+        # выбрасывается с именем запроса.
+        with Session(engine) as session:
+            for name in self._statements:
+                try:
+                    self.execute(session, name, self._examples[name])
+                except Exception as error:
+                    raise RuntimeError(f"registered statement {name!r} failed: {error}") from error
+            session.rollback()
+        return list(self._statements)
+
+    def compiled(self, name, dialect):
+        # (SQL строка, имена параметров по порядку) для диалекта, один раз на пару (name, диалект).
+        key = (name, dialect.name, dialect.paramstyle)
+        found = self._compiled.get(key)
+        if found is None:
+            compiled = self[name].compile(dialect=dialect)
+            if compiled._bind_processors:
+                raise ValueError(f"statement {name!r} has typed parameters, use execute() instead")
+            found = self._compiled[key] = (compiled.string, tuple(compiled.positiontup or ()))
+        return found
+
+    def execute_driver(self, conn, name, params=None):
+        # Только Connection; params - словарь, как для execute().
+        sql, names = self.compiled(name, conn.dialect)
+        params = params or {}
+        return conn.exec_driver_sql(sql, tuple(params[key] for key in names))
+
+    def executemany_driver(self, conn, name, rows):
+        sql, names = self.compiled(name, conn.dialect)
+        return conn.exec_driver_sql(sql, [tuple(row[key] for key in names) for row in rows])
+
+
+statements = StatementRegistry()
+
+# user_account
+statements.register(
+    "user.insert",
+    insert(user_table).values(name=bindparam("name"), fullname=bindparam("fullname")),
+    {"name": "spongebob", "fullname": "Spongebob Squarepants"}
+)
+statements.register(
+    "user.by_id", select(user_table).where(user_table.c.id == bindparam("user_id")), {"user_id": 1}
+)
+statements.register(
+    "user.by_name", select(user_table).where(user_table.c.name == bindparam("name")), {"name": "spongebob"}
+)
+# Имя параметра в WHERE не должно совпадать с колонкой: bindparam("name") в UPDATE SQLAlchemy
+# резервирует для SET name=... и выбрасывает CompileError.
+statements.register(
+    "user.update_fullname",
+    update(user_table).where(user_table.c.name == bindparam("b_name")).values(fullname=bindparam("fullname")),
+    {"b_name": "spongebob", "fullname": "Spongebob Squarepants"}
+)
+statements.register(
+    "user.delete", delete(user_table).where(user_table.c.id == bindparam("user_id")), {"user_id": 2}
+)
+statements.register(
+    "user.orm_by_name", select(User).where(User.name == bindparam("name")), {"name": "spongebob"}
+)
+
+# address
+statements.register(
+    "address.insert",
+    insert(address_table).values(user_id=bindparam("user_id"), email_address=bindparam("email_address")),
+    {"user_id": 1, "email_address": "spongebob@sqlalchemy.org"}
+)
+# Как в Insert.py: user_id находится по имени пользователя скалярным подзапросом.
+statements.register(
+    "address.insert_for_username",
+    insert(address_table).values(
+        user_id=select(user_table.c.id).where(user_table.c.name == bindparam("username")).scalar_subquery(),
+        email_address=bindparam("email_address")
+    ),
+    {"username": "spongebob", "email_address": "spongebob@sqlalchemy.org"}
+)
+statements.register(
+    "address.by_user",
+    select(address_table).where(address_table.c.user_id == bindparam("user_id")).order_by(address_table.c.id),
+    {"user_id": 1}
+)
+statements.register(
+    "address.orm_by_user",
+    select(Address).where(Address.user_id == bindparam("user_id")).order_by(Address.id),
+    {"user_id": 1}
+)
+
+# some_table не описана в metadata_obj (создается text() в SQLAlchemy_Connect_Session.py),
+# поэтому ее запросы - text() с теми же параметрами, что в примерах.
+statements.register("some_table.insert", text("INSERT INTO some_table (x, y) VALUES (:x, :y)"), {"x": 1, "y": 1})
+statements.register("some_table.update_y", text("UPDATE some_table SET y=:y WHERE x=:x"), {"x": 1, "y": 2})
+statements.register(
+    "some_table.by_y", text("SELECT x, y FROM some_table WHERE y > :y ORDER BY x, y"), {"y": 0}
+)
+
+
+if __name__ == "__main__":
+    # Проверка реестра на базе в памяти:
+    #   python -m DataOperations.Statements
+    from engine_factory import create_sqlite_engine
+    from SQL_Alchemy_metadata import create_schema
+    from SQLAlchemy_Connect_Session import create_some_table
+
+    engine = create_sqlite_engine(":memory:")
+    create_schema(engine)
+    create_some_table(engine)
+    for checked in statements.check(engine):
+        print(f"ok  {checked}")
@@ -0,0 +1,88 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from SQL_Alchemy_metadata import User, user_table, reflect_some_table
+
+# Потоковое чтение больших выборок с постоянным расходом памяти.
+#
+# В Select.py и SQLAlchemy_Connect_Session.py результат conn.execute(stmt) перебирается целиком,
+# а session.execute(select(User)) складывает каждый загруженный объект в identity map сессии.
+# Здесь строки читаются порциями фиксированного размера:
+#   Core - execution_options(stream_results=True) + Result.partitions(size)
+#   ORM  - execution_options(yield_per=size), объекты загружаются порциями и не накапливаются
+#          в identity map, при необходимости отсоединяются от сессии после каждой порции.
+# Поверх генераторов строится простая цепочка обработки Pipeline(...).map(...).filter(...).
+
+DEFAULT_PARTITION_SIZE = 1000
+
+
+def stream_partitions(engine, stmt, partition_size=DEFAULT_PARTITION_SIZE):
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(stmt)
+        for partition in result.partitions(partition_size):
+            yield partition
+
+
+def stream_rows(engine, stmt, partition_size=DEFAULT_PARTITION_SIZE):
+    for partition in stream_partitions(engine, stmt, partition_size):
+        yield from partition
+
+
+def stream_objects(engine, stmt, partition_size=DEFAULT_PARTITION_SIZE, expunge=False):
+    # identity map сессии хранит объекты по слабым ссылкам, поэтому объекты прочитанной порции,
+    # на которые не осталось ссылок, освобождаются и без явных действий.
+    # expunge=True дополнительно отсоединяет каждую порцию от сессии после обработки: загруженные
+    # атрибуты остаются доступны, но объект больше не отслеживается. Это примерно вдвое медленнее,
+    # и нужно, только если объекты передаются дальше и не должны быть связаны с сессией.
+    # expunge_all() здесь не подходит - он заменяет identity map, в который результат
+    # продолжает загружать следующие порции.
+    with Session(engine) as session:
+        result = session.execute(stmt.execution_options(yield_per=partition_size))
+        for partition in result.scalars().partitions(partition_size):
+            yield from partition
+            if expunge:
+                for obj in partition:
+                    session.expunge(obj)
+
+
+def stream_users(engine, partition_size=DEFAULT_PARTITION_SIZE):
+    return Pipeline(stream_rows(engine, select(user_table), partition_size))
+
+
+def stream_user_objects(engine, partition_size=DEFAULT_PARTITION_SIZE, expunge=False):
+    return Pipeline(stream_objects(engine, select(User), partition_size, expunge))
+
+
+def stream_some_table(engine, partition_size=DEFAULT_PARTITION_SIZE):
+    some_table = reflect_some_table(engine)
+    return Pipeline(stream_rows(engine, select(some_table), partition_size))
+
+
+class Pipeline:
+    # Ленивая цепочка генераторов. Каждая стадия обрабатывает по одному элементу,
+    # поэтому в памяти одновременно находится не больше одной порции строк.
+
+    def __init__(self, source):
+        self.source = source
+
+    def map(self, func):
+        return Pipeline(func(item) for item in self.source)
+
+    def filter(self, predicate):
+        return Pipeline(item for item in self.source if predicate(item))
+
+    def batches(self, size):
+        def generate():
+            batch = []
+            for item in self.source:
+                batch.append(item)
+                if len(batch) == size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        return Pipeline(generate())
+
+    def __iter__(self):
+        return iter(self.source)
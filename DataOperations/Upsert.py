@@ -0,0 +1,220 @@
+from collections import namedtuple
+from itertools import count
+
+from sqlalchemy import Column, MetaData, Table, func, inspect, literal_column, select, true, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from DataOperations.AddressIngest import IN_CHUNK_SIZE, batched
+
+# Массовая вставка-или-обновление (upsert) для таблиц и ORM моделей.
+#
+# Единственный путь обновления в учебных примерах - UPDATE some_table SET y=:y WHERE x=:x
+# в SQLAlchemy_Connect_Session.py, а синхронизация "вставить, если нет, иначе обновить" строка за строкой
+# стоит SELECT и INSERT/UPDATE на каждую строку. Здесь используется
+# INSERT ... ON CONFLICT (<ключ>) DO UPDATE SET c = excluded.c из sqlalchemy.dialects.sqlite:
+#   mode="batches" - executemany такого запроса по batch_size строк
+#   mode="staging" - строки сначала вставляются обычным executemany во временную таблицу без
+#                    ограничений, затем переносятся одним INSERT ... SELECT ... ON CONFLICT;
+#                    для очень больших наборов, когда проверка конфликта на каждую строку executemany
+#                    обходится дороже одного прохода по временной таблице
+#
+# Ключ конфликта (index_elements) по умолчанию - первичный ключ. SQLite требует, чтобы на ключе
+# был PRIMARY KEY или UNIQUE индекс; у some_table (x int, y int) его нет, и для upsert по x индекс
+# создается явно: ensure_unique_index(engine, some_table, ["x"]).
+#
+# Результат - UpsertResult(inserted, updated, skipped). ON CONFLICT не сообщает, какая ветка
+# сработала, поэтому перед записью пачки ее ключи, уже существующие в таблице, находятся одним
+# запросом WHERE (<ключ>) IN (...). Повтор ключа внутри набора считается обновлением: вторая строка
+# обновляет вставленную первой, как и при последовательной обработке. Если обновлять нечего
+# (update_columns=[] или в строке только колонки ключа), запрос - ON CONFLICT DO NOTHING, и строки
+# с существующим ключом считаются пропущенными (skipped), а не обновленными.
+
+DEFAULT_BATCH_SIZE = 10000
+MODES = ("batches", "staging")
+
+UpsertResult = namedtuple("UpsertResult", ["inserted", "updated", "skipped"])
+
+_staging_names = count()
+
+
+def _resolve(target, rows):
+    # Таблица и строки с ключами-колонками; для ORM модели ключи строк - имена атрибутов.
+    mapper = inspect(target, raiseerr=False)
+    if mapper is None or isinstance(target, Table):
+        return target, rows
+    columns = {attr.key: attr.columns[0].key for attr in mapper.column_attrs}
+    if all(key == column for key, column in columns.items()):
+        return mapper.local_table, rows
+    return mapper.local_table, ({columns[key]: value for key, value in row.items()} for row in rows)
+
+
+def ensure_unique_index(engine, table, columns):
+    # UNIQUE индекс для ключа конфликта; если в таблице уже есть повторы, CREATE завершится ошибкой.
+    name = f"ux_{table.name}_{'_'.join(columns)}"
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table.name} ({', '.join(columns)})"
+        )
+    return name
+
+
+def _upsert_statement(insert_stmt, keys, update_columns):
+    if not update_columns:
+        return insert_stmt.on_conflict_do_nothing(index_elements=keys)
+    return insert_stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: insert_stmt.excluded[name] for name in update_columns}
+    )
+
+
+def _key_expression(table, keys):
+    columns = [table.c[name] for name in keys]
+    return columns[0] if len(columns) == 1 else tuple_(*columns)
+
+
+def _existing_keys(conn, table, keys, values):
+    # Какие из значений ключа values уже есть в таблице. values - кортежи, по IN_CHUNK_SIZE параметров.
+    expression = _key_expression(table, keys)
+    found = set()
+    for chunk in batched(values, max(1, IN_CHUNK_SIZE // len(keys))):
+        params = [value[0] for value in chunk] if len(keys) == 1 else chunk
+        stmt = select(*[table.c[name] for name in keys]).where(expression.in_(params))
+        found.update(tuple(row) for row in conn.execute(stmt))
+    return found
+
+
+def _update_columns(update_columns, columns, keys):
+    # Колонки для DO UPDATE SET; None - все колонки строки, кроме ключа. Пустой список - DO NOTHING.
+    requested = columns if update_columns is None else update_columns
+    return [name for name in requested if name not in keys and name in columns]
+
+
+def _is_new(row, keys, existing, seen):
+    # Первое появление ключа, которого нет в таблице, - вставка, все остальное - конфликт.
+    value = tuple(row[name] for name in keys)
+    new = value not in existing and value not in seen
+    seen.add(value)
+    return new
+
+
+def _check_keys(row, keys):
+    if any(row.get(name) is None for name in keys):
+        # NULL в ключе никогда не конфликтует (NULL не равен NULL), такая строка всегда вставлялась бы.
+        raise ValueError(f"upsert row has no value for key columns {keys}: {row!r}")
+
+
+def _upsert_batches(conn, table, rows, keys, update_columns, batch_size):
+    inserted = updated = skipped = 0
+    updates = {}
+    statements = {}
+    for batch in batched(rows, batch_size):
+        for row in batch:
+            _check_keys(row, keys)
+        existing = _existing_keys(conn, table, keys, {tuple(row[name] for name in keys) for row in batch})
+        seen = set()
+        # executemany требует одинаковый набор колонок у всех строк, поэтому пачка выполняется
+        # подряд идущими участками с одним набором колонок - в исходном порядке строк, чтобы при
+        # повторе ключа последней оставалась более поздняя строка.
+        runs = []
+        for row in batch:
+            columns = tuple(row)
+            if columns not in updates:
+                updates[columns] = _update_columns(update_columns, columns, keys)
+            if _is_new(row, keys, existing, seen):
+                inserted += 1
+            elif updates[columns]:
+                updated += 1
+            else:
+                skipped += 1
+            if runs and runs[-1][0] == columns:
+                runs[-1][1].append(row)
+            else:
+                runs.append((columns, [row]))
+        for columns, run in runs:
+            stmt = statements.get(columns)
+            if stmt is None:
+                stmt = statements[columns] = _upsert_statement(sqlite_insert(table), keys, updates[columns])
+            conn.execute(stmt, run)
+    return UpsertResult(inserted, updated, skipped)
+
+
+def _upsert_staging(conn, table, rows, keys, update_columns, batch_size):
+    # Временная таблица существует только в этом соединении и удаляется в конце.
+    staging = Table(
+        f"upsert_staging_{table.name}_{next(_staging_names)}",
+        MetaData(),
+        *[Column(column.name, column.type) for column in table.columns],
+        prefixes=["TEMP"]
+    )
+    staging.create(conn)
+    try:
+        total = 0
+        columns = None
+        for batch in batched(rows, batch_size):
+            if columns is None:
+                # Набор колонок берется из первой строки, у остальных строк он должен быть тем же:
+                # в одном INSERT ... SELECT у всех строк одни и те же колонки.
+                columns = list(batch[0])
+                column_set = set(columns)
+            for row in batch:
+                _check_keys(row, keys)
+                if row.keys() != column_set:
+                    raise ValueError(
+                        f"staging upsert needs the same columns in every row, expected {columns}: {row!r}"
+                    )
+            conn.execute(staging.insert(), batch)
+            total += len(batch)
+        if not total:
+            return UpsertResult(0, 0, 0)
+
+        staged_keys = [staging.c[name] for name in keys]
+        matches = [table.c[name] == staging.c[name] for name in keys]
+        new_keys = (
+            select(*staged_keys).
+                where(~select(literal_column("1")).where(*matches).exists()).
+                distinct().
+                subquery()
+        )
+        inserted = conn.execute(select(func.count()).select_from(new_keys)).scalar_one()
+
+        update = _update_columns(update_columns, columns, keys)
+        source = (
+            select(*[staging.c[name] for name in columns]).
+                # WHERE нужен SQLite, чтобы отличить ON CONFLICT от условия JOIN в INSERT ... SELECT.
+                where(true()).
+                order_by(literal_column("rowid"))
+        )
+        insert_stmt = sqlite_insert(table).from_select(columns, source)
+        conn.execute(_upsert_statement(insert_stmt, keys, update))
+        if update:
+            return UpsertResult(inserted, total - inserted, 0)
+        return UpsertResult(inserted, 0, total - inserted)
+    finally:
+        staging.drop(conn)
+
+
+def upsert(bind, target, rows, index_elements=None, update_columns=None, mode="batches",
+           batch_size=DEFAULT_BATCH_SIZE):
+    # target - Table (user_table, отраженная some_table) или ORM модель (User, Address).
+    # rows - итерируемое словарей; update_columns - какие колонки обновлять при конфликте
+    # (по умолчанию все колонки строки, кроме ключа; пустой список - только вставка новых).
+    # bind - Engine (все выполняется в одной транзакции engine.begin()), Connection или Session
+    # (транзакцией управляет вызывающий).
+    if mode not in MODES:
+        raise ValueError(f"unknown upsert mode {mode!r}, expected one of {MODES}")
+    table, rows = _resolve(target, rows)
+    keys = list(index_elements or [column.name for column in table.primary_key.columns])
+    if not keys:
+        raise ValueError(f"{table.name} has no primary key, pass index_elements with a unique key")
+    if update_columns is not None:
+        update_columns = tuple(update_columns)
+
+    run = _upsert_staging if mode == "staging" else _upsert_batches
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return run(conn, table, rows, keys, update_columns, batch_size)
+    if isinstance(bind, Session):
+        bind = bind.connection()
+    return run(bind, table, rows, keys, update_columns, batch_size)
@@ -0,0 +1,235 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import Integer, func, insert, select
+
+from engine_factory import run_in_transaction
+from SQL_Alchemy_metadata import metadata_obj
+
+# Отложенная запись одиночных вставок пачками (write-behind).
+#
+# В Insert.py каждая строка вставляется отдельно: insert(user_table).values(...) и сразу commit,
+# то есть одна транзакция (и один fsync для файловой базы) на строку. WriteBehindWriter принимает
+# одиночные строки для любой таблицы metadata_obj, копит их в памяти и записывает фоновым потоком
+# одной транзакцией executemany, когда набралось max_batch строк, самая старая строка ждет
+# дольше max_delay секунд или вызван flush().
+#
+# submit() возвращает concurrent.futures.Future, который после записи получает первичный ключ
+# строки - кортеж, как result.inserted_primary_key в insert_spongebob(). executemany не сообщает
+# lastrowid каждой строки, поэтому для таблиц с одним целочисленным первичным ключом id выделяются
+# в той же транзакции записи (max(id) + 1 ..., как в DataOperations/BulkInsert.py); пишущая
+# транзакция открывается BEGIN IMMEDIATE, и другой писатель не может вклиниться между выделением
+# и вставкой. Для таблиц без первичного ключа (some_table) Future получает пустой кортеж.
+#
+# Противодавление: в очереди и в записи одновременно не больше max_pending строк, submit() ждет
+# освобождения места до timeout секунд и затем выбрасывает queue.Full.
+#
+# Пачка пишется одной транзакцией. Если она не прошла (например, IntegrityError из-за одной строки),
+# строки пачки записываются повторно по одной, и исключение получают только Future неудачных строк.
+#
+# Для базы в памяти (StaticPool) фоновый поток пишет через то же единственное соединение, что
+# и остальной код, поэтому пока writer открыт, другие потоки не должны писать в базу напрямую.
+
+DEFAULT_MAX_BATCH = 500
+DEFAULT_MAX_DELAY = 0.05
+DEFAULT_MAX_PENDING = 10000
+
+
+def _table(table):
+    # Таблица metadata_obj по объекту или имени.
+    name = table if isinstance(table, str) else table.name
+    found = metadata_obj.tables.get(name)
+    if found is None or (not isinstance(table, str) and found is not table):
+        raise ValueError(f"{name!r} is not a table of metadata_obj")
+    return found
+
+
+def _generated_key(table):
+    # Колонка первичного ключа, значения которой выделяет writer, или None.
+    columns = list(table.primary_key.columns)
+    if len(columns) == 1 and isinstance(columns[0].type, Integer):
+        return columns[0]
+    return None
+
+
+class WriteBehindWriter:
+
+    def __init__(
+            self,
+            engine,
+            max_batch=DEFAULT_MAX_BATCH,
+            max_delay=DEFAULT_MAX_DELAY,
+            max_pending=DEFAULT_MAX_PENDING,
+            policy=None
+    ):
+        # policy - engine_factory.RetryPolicy для повторов при "database is locked".
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.policy = policy
+        self._condition = threading.Condition()
+        self._pending = []
+        self._oldest = None
+        self._submitted = 0
+        self._completed = 0
+        self._flush_target = 0
+        self._closed = False
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # Прием строк
+
+    def submit(self, table, values=None, timeout=None, **kwargs):
+        # submit(user_table, name=..., fullname=...) или submit("user_account", {...}).
+        table = _table(table)
+        row = dict(values or {}, **kwargs)
+        future = Future()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._closed and self._submitted - self._completed >= self.max_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Full(f"write-behind queue holds {self.max_pending} rows")
+                self._condition.wait(remaining)
+            if self._closed:
+                raise RuntimeError("write-behind writer is closed")
+            self._pending.append((table, row, future))
+            self._submitted += 1
+            # Первая строка запускает отсчет max_delay, полная пачка пишется сразу.
+            if len(self._pending) == 1:
+                self._oldest = time.monotonic()
+                self._condition.notify_all()
+            elif len(self._pending) >= self.max_batch:
+                self._condition.notify_all()
+        return future
+
+    def flush(self, timeout=None):
+        # Ждет записи всех строк, принятых до вызова. Возвращает False, если не дождался.
+        with self._condition:
+            target = self._submitted
+            self._flush_target = max(self._flush_target, target)
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._completed >= target, timeout)
+
+    def close(self, timeout=None):
+        # Записывает оставшиеся строки и останавливает фоновый поток.
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "pending": self._submitted - self._completed,
+                "batches": self.batches,
+                "rows_written": self.rows_written,
+                "rows_failed": self.rows_failed,
+            }
+
+    # Фоновая запись
+
+    def _ready(self):
+        if not self._pending:
+            return False
+        return (
+            self._closed
+            or len(self._pending) >= self.max_batch
+            or self._flush_target > self._completed
+            or time.monotonic() - self._oldest >= self.max_delay
+        )
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._ready():
+                    if self._closed and not self._pending:
+                        return
+                    timeout = None
+                    if self._pending:
+                        timeout = max(0.0, self._oldest + self.max_delay - time.monotonic())
+                    self._condition.wait(timeout)
+                taken = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                self._oldest = time.monotonic() if self._pending else None
+
+            # Отмененные до записи строки не вставляются.
+            batch = [item for item in taken if item[2].set_running_or_notify_cancel()]
+            written, failed = self._write(batch) if batch else (0, 0)
+
+            with self._condition:
+                self._completed += len(taken)
+                self.batches += 1
+                self.rows_written += written
+                self.rows_failed += failed
+                self._condition.notify_all()
+
+    def _write(self, batch):
+        try:
+            keys = run_in_transaction(self.engine, lambda conn: _insert_batch(conn, batch), self.policy)
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0][2].set_exception(error)
+                return 0, 1
+            return self._write_one_by_one(batch)
+        for (_, _, future), key in zip(batch, keys):
+            future.set_result(key)
+        return len(batch), 0
+
+    def _write_one_by_one(self, batch):
+        written = failed = 0
+        for item in batch:
+            try:
+                key = run_in_transaction(self.engine, lambda conn: _insert_batch(conn, [item])[0], self.policy)
+            except Exception as error:
+                item[2].set_exception(error)
+                failed += 1
+            else:
+                item[2].set_result(key)
+                written += 1
+        return written, failed
+
+
+def _insert_batch(conn, batch):
+    # Вставляет строки пачки в одной транзакции и возвращает их первичные ключи в порядке пачки.
+    # Таблицы обходятся в порядке зависимостей metadata_obj.sorted_tables, строки одной таблицы с
+    # одинаковым набором колонок уходят одним executemany.
+    order = {table: position for position, table in enumerate(metadata_obj.sorted_tables)}
+    by_table = {}
+    for position, (table, row, _) in enumerate(batch):
+        # Копия: выделенные id не должны остаться в строке, если транзакция откатится.
+        by_table.setdefault(table, []).append((position, dict(row)))
+
+    keys = [None] * len(batch)
+    for table in sorted(by_table, key=order.__getitem__):
+        items = by_table[table]
+        key_column = _generated_key(table)
+        if key_column is not None:
+            missing = [row for _, row in items if row.get(key_column.key) is None]
+            if missing:
+                # Явно заданные id этой же пачки тоже учитываются, чтобы выделенные не совпали с ними.
+                last_id = conn.execute(select(func.coalesce(func.max(key_column), 0))).scalar_one()
+                explicit = [row[key_column.key] for _, row in items if row.get(key_column.key) is not None]
+                last_id = max([last_id] + explicit)
+                for new_id, row in enumerate(missing, start=last_id + 1):
+                    row[key_column.key] = new_id
+
+        groups = {}
+        for position, row in items:
+            groups.setdefault(tuple(row), []).append(row)
+            keys[position] = tuple(row.get(column.key) for column in table.primary_key.columns)
+        for rows in groups.values():
+            conn.execute(insert(table), rows)
+    return keys
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from engine_factory import create_sqlite_engine, get_engine, has_rows
 
 # sqlalchemy.__versio__ shows sqlalchemy version
 # print(sqlalchemy.__version__) current version is 1.4.23
@@ -9,7 +9,10 @@ from sqlalchemy import create_engine
 # engine.future say that we use sqlalchemy 2.0 style
 
 
-engine = create_engine('sqlite+pysqlite:///:memory:', echo=True, future=True)
+# Сам engine теперь создается в engine_factory.create_sqlite_engine: файловая база SQLite в режиме WAL,
+# настроенные PRAGMA, пул соединений и echo=False по умолчанию. Логи ниже получены с TUTORIAL_DB_ECHO=1.
+# Импорт модуля к базе не обращается: каждый пример ниже - функция, принимающая engine,
+# а seed_some_table() и main() - явные точки входа.
 
 # Connection - объект, через который производятся все действия с бд. Так как это открытый ресурс,
 # то область его действия стоит ограничить. Проще всего сделать это через менеджер контекста
@@ -38,15 +41,16 @@ engine = create_engine('sqlite+pysqlite:///:memory:', echo=True, future=True)
 # -------------------- Code --------------------
 from sqlalchemy import text
 
-with engine.connect() as conn:
-    conn.execute(
-        text("CREATE TABLE some_table (x int, y int)")
-    )
-    conn.execute(
-        text("INSERT INTO some_table (x, y) VALUES(:x, :y)"),
-        [{"x": 1, "y": 1 }, {"x": 2, "y": 4}]
-    )
-    conn.commit()
+def create_some_table(engine):
+    with engine.connect() as conn:
+        conn.execute(
+            text("CREATE TABLE IF NOT EXISTS some_table (x int, y int)")
+        )
+        conn.execute(
+            text("INSERT INTO some_table (x, y) VALUES(:x, :y)"),
+            [{"x": 1, "y": 1 }, {"x": 2, "y": 4}]
+        )
+        conn.commit()
 
 # В Этом примере commit происходить по инициативе пользователя.
 # 2021-09-02 00:05:04,374 INFO sqlalchemy.engine.Engine BEGIN (implicit)
@@ -66,11 +70,12 @@ with engine.connect() as conn:
 
 
 # -------------------- Code --------------------
-with engine.begin() as conn:
-    conn.execute(
-        text("INSERT INTO some_table (x, y) VALUES(:x, :y)"),
-        [{"x": 6, "y": 8}, {"x": 9, "y": 10}]
-    )
+def insert_begin_once(engine):
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO some_table (x, y) VALUES(:x, :y)"),
+            [{"x": 6, "y": 8}, {"x": 9, "y": 10}]
+        )
 
 # 2021-09-02 00:29:58,619 INFO sqlalchemy.engine.Engine BEGIN (implicit)
 # 2021-09-02 00:29:58,619 INFO sqlalchemy.engine.Engine INSERT INTO some_table (x, y) VALUES(?, ?)
@@ -87,10 +92,11 @@ with engine.begin() as conn:
 
 
 # -------------------- Code --------------------
-with engine.connect() as conn:
-    result = conn.execute(text("SELECT x, y FROM some_table"))
-    for row in result:
-        print(f"x: {row.x}, y: {row.y}")
+def print_some_table(engine):
+    with engine.connect() as conn:
+        result = conn.execute(text("SELECT x, y FROM some_table"))
+        for row in result:
+            print(f"x: {row.x}, y: {row.y}")
 
 # 2021-09-02 01:17:43,911 INFO sqlalchemy.engine.Engine BEGIN (implicit)
 # 2021-09-02 01:17:43,911 INFO sqlalchemy.engine.Engine SELECT x, y FROM some_table
@@ -114,13 +120,14 @@ with engine.connect() as conn:
 
 
 # Параметры отправки (Связные параметры)
-with engine.connect() as conn:
-    result = conn.execute(
-        text("SELECT x, y FROM some_table WHERE y > :y"),
-        {"y": 2}
-    )
-    for row in result:
-        print(f"x: {row.x}, y: {row.y}")
+def print_some_table_where(engine):
+    with engine.connect() as conn:
+        result = conn.execute(
+            text("SELECT x, y FROM some_table WHERE y > :y"),
+            {"y": 2}
+        )
+        for row in result:
+            print(f"x: {row.x}, y: {row.y}")
 
 # Значения в запрос передаются вторым парамтром функции execute в виде списка словарей
 # В запрос в функции text параметры транслируются через маску вида :<ключ из словаря>.
@@ -135,12 +142,13 @@ with engine.connect() as conn:
 # Как видно из лога, значение :y преобразовалось в "?". Если действовать так, то можно избеждать sql-инъекций.
 # Если в параметрах передавать несколько словарей, то под капотом будет вызвана функция cursor.executemany()
 
-with engine.connect() as conn:
-    conn.execute(
-        text("INSERT INTO some_table (x, y) VALUES (:x, :y)"),
-        [{"x": 11, "y": 12}, {"x": 13, "y": 14}]
-    )
-    conn.commit()
+def insert_more_rows(engine):
+    with engine.connect() as conn:
+        conn.execute(
+            text("INSERT INTO some_table (x, y) VALUES (:x, :y)"),
+            [{"x": 11, "y": 12}, {"x": 13, "y": 14}]
+        )
+        conn.commit()
 
 # Объединение параметров
 # Так же параметры можно передавать через функцию bindparams(<параметр>=<значение>) у объекта возвращаемого из text(),
@@ -148,10 +156,11 @@ with engine.connect() as conn:
 
 
 
-with engine.connect() as conn:
-    result = conn.execute(text("SELECT * FROM some_table WHERE y > :y ORDER BY x, y").bindparams(y=6))
-    for row in result:
-        print(f"x: {row.x}, y: {row.y}")
+def print_some_table_ordered(engine):
+    with engine.connect() as conn:
+        result = conn.execute(text("SELECT * FROM some_table WHERE y > :y ORDER BY x, y").bindparams(y=6))
+        for row in result:
+            print(f"x: {row.x}, y: {row.y}")
 
 # 2021-09-03 00:11:21,246 INFO sqlalchemy.engine.Engine BEGIN (implicit)
 # 2021-09-03 00:11:21,246 INFO sqlalchemy.engine.Engine SELECT * FROM some_table WHERE y > ? ORDER BY x, y
@@ -171,14 +180,51 @@ with engine.connect() as conn:
 # и получает новое соединение при следующем запросе.
 
 from sqlalchemy.orm import Session
-with Session(engine) as session:
-    session.execute(
-        text("UPDATE some_table SET y=:y WHERE x=:x"),
-        [{"x": 9, "y":11}, {"x": 13, "y": 15}]
-    )
-    session.commit()
+
+
+def update_with_session(engine):
+    with Session(engine) as session:
+        session.execute(
+            text("UPDATE some_table SET y=:y WHERE x=:x"),
+            [{"x": 9, "y":11}, {"x": 13, "y": 15}]
+        )
+        session.commit()
 
 # 2021-09-03 00:23:20,646 INFO sqlalchemy.engine.Engine BEGIN (implicit)
 # 2021-09-03 00:23:20,646 INFO sqlalchemy.engine.Engine UPDATE some_table SET y=? WHERE x=?
 # 2021-09-03 00:23:20,647 INFO sqlalchemy.engine.Engine [generated in 0.00014s] ((11, 9), (15, 13))
-# 2021-09-03 00:23:20,647 INFO sqlalchemy.engine.Engine COMMIT
\ No newline at end of file
+# 2021-09-03 00:23:20,647 INFO sqlalchemy.engine.Engine COMMIT
+
+
+# Точки входа.
+# seed_some_table() создает и заполняет some_table без вывода на экран - ее используют другие модули,
+# которым нужна эта таблица. База по умолчанию - файл, переживающий запуски, поэтому уже заполненная
+# some_table не заполняется повторно. main() проходит все примеры этого файла по порядку; примеры
+# вставляют строки при каждом вызове, и при запуске скрипта main() работает с базой в памяти.
+
+def seed_some_table(engine=None):
+    if engine is None:
+        engine = get_engine()
+    if has_rows(engine, "some_table"):
+        return engine
+    create_some_table(engine)
+    insert_begin_once(engine)
+    insert_more_rows(engine)
+    update_with_session(engine)
+    return engine
+
+
+def main(engine=None):
+    if engine is None:
+        engine = get_engine()
+    create_some_table(engine)
+    insert_begin_once(engine)
+    print_some_table(engine)
+    print_some_table_where(engine)
+    insert_more_rows(engine)
+    print_some_table_ordered(engine)
+    update_with_session(engine)
+
+
+if __name__ == "__main__":
+    main(create_sqlite_engine(":memory:"))
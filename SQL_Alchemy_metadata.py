@@ -18,22 +18,22 @@ user_table = Table(
     "user_account",
     metadata_obj,
     Column("id", Integer, primary_key=True),
-    Column("name", String(30)),
+    Column("name", String(30), index=True),
     Column("fullname", String)
 )
 
 # Коллекция колонок обычно существует в виде словаря/ассоциативного массива расположенного по адресу Table.c
-print(user_table.c.name, type(user_table.c.name))
+# print(user_table.c.name, type(user_table.c.name))
 # Вывод: user_account.name <class 'sqlalchemy.sql.schema.Column'>
 
-print(user_table.c.keys())
+# print(user_table.c.keys())
 # Вывод: ['id', 'name', 'fullname']
 
 # id - является первичным ключем таблицы, и так же расположено по адресу Table.primary_key
 # обернутое в конструкция PrimaryKeyConstraint (Ограничение первичного ключа)
 
-print(user_table.primary_key, type(user_table.primary_key))
-print(user_table.c.id, type(user_table.c.id)) # Само поле не обернуто в этот класс.
+# print(user_table.primary_key, type(user_table.primary_key))
+# print(user_table.c.id, type(user_table.c.id)) # Само поле не обернуто в этот класс.
 
 # Так же есть понятие ForeingKeyConstraint (Ограничение внешнего ключа). Как правило, это поле
 # по которому осуществляется привязка к таблице. Внешний ключ.
@@ -45,7 +45,7 @@ address_table = Table(
     "address",
     metadata_obj,
     Column("id", Integer, primary_key=True),
-    Column('user_id', ForeignKey('user_account.id'), nullable=False), # Указание внешнего ключа
+    Column('user_id', ForeignKey('user_account.id'), nullable=False, index=True), # Указание внешнего ключа
     Column('email_address', String, nullable=False)
 )
 # При определении ForeingKey, тип данных столбца определяется связанным столбцом.
@@ -53,18 +53,35 @@ address_table = Table(
 
 # параметр nullable=False - аналог оператора NOT NULL при создании таблицы средствами SQL.
 # Это ограничение так же доступно для анализа по пути Column.nullable
-print(address_table.c.email_address.nullable)
+# print(address_table.c.email_address.nullable)
 # Вывод: False
 
+# Параметр index=True создает вторичный индекс ix_<таблица>_<колонка>.
+# Выборки в Select.py и подзапрос вставки адресов ищут пользователя по user_account.name,
+# а соединения address с user_account идут по address.user_id. Без индексов SQLite
+# просматривает таблицу целиком. Индекс по name заодно покрывает запрос id по имени:
+# в SQLite id INTEGER PRIMARY KEY совпадает с rowid, который хранится в каждой записи индекса.
+
 
-print("{:_^80s}".format("Create Table"))
 # После описания таблиц в виде классов Python, можно их создать при помощи метода create_all.
 # Первым параметром нужно будет указать заранее созданный engine.
+# Импорт этого модуля не обращается к базе: схема создается явным вызовом create_schema(),
+# а engine берется из engine_factory только в момент вызова.
+
+from engine_factory import get_engine
+
 
-from sqlalchemy import create_engine
+def create_schema(engine=None):
+    if engine is None:
+        engine = get_engine()
+    metadata_obj.create_all(engine)
+    # create_all создает индексы только вместе с новыми таблицами.
+    # Для уже существующей файловой базы недостающие индексы досоздаются отдельно.
+    for table in metadata_obj.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    return engine
 
-engine = create_engine('sqlite+pysqlite:///:memory:', echo=True, future=True)
-metadata_obj.create_all(engine)
 # Вывод:
 # __________________________________Create Table__________________________________
 # 2021-09-04 19:54:23,670 INFO sqlalchemy.engine.Engine BEGIN (implicit)
@@ -120,7 +137,7 @@ from sqlalchemy.orm import registry
 mapper_registry = registry()
 
 # registr уже содержит в себе MetaData по адресу registry().metadata
-print(mapper_registry.metadata, type(mapper_registry.metadata))
+# print(mapper_registry.metadata, type(mapper_registry.metadata))
 # Вывод:
 # MetaData() <class 'sqlalchemy.sql.schema.MetaData'>
 
@@ -138,14 +155,20 @@ Base = declarative_base()  # Base перегружен
 
 from sqlalchemy.orm import relationship
 
+# Обе связи загружаются лениво (lazy="select", по умолчанию): отдельный запрос при первом
+# обращении к атрибуту. Стратегия на уровне модели действовала бы на каждый select(User), в том
+# числе там, где адреса не нужны, а joined загрузка коллекции к тому же требует Result.unique()
+# у всех вызывающих. Поэтому жадная загрузка включается в конкретном запросе:
+#   with_addresses(select(User), "selectin")  - см. DataOperations/EagerLoading.py
+
 class User(Base):
     __tablename__ = "user_account"
 
     id = Column(Integer, primary_key=True)
-    name = Column(String(30))
+    name = Column(String(30), index=True)
     fullname = Column(String)
 
-    #addresses = relationship("Address", back_populates="user")
+    addresses = relationship("Address", back_populates="user")
 
     def __repr__(self):
         return f"User(id={self.id!r}, name={self.name!r}, fullname={self.fullname!r})"
@@ -154,18 +177,18 @@ class Address(Base):
     __tablename__ = "address"
 
     id = Column(Integer, primary_key=True)
-    email_addres = Column(String, nullable=False)
-    user_id = Column(Integer, ForeignKey("user_account.id")) #, nullable=False)
+    email_address = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("user_account.id"), index=True) #, nullable=False)
 
-    #user = relationship("User", back_populates="address")
+    user = relationship("User", back_populates="addresses")
 
     def __repr__(self):
-        return f"Address(id={self.id!r}, email_addres={self.email_addres!r})"
+        return f"Address(id={self.id!r}, email_address={self.email_address!r})"
 
 
 # Перечисленные выше классы теперь являются сопоставленными классами и доступны для работы с операчиями добавления
 # Посмотреть его основу можно через параметр __table__
-print(repr(User.__table__))
+# print(repr(User.__table__))
 
 # Это Table объект, который создан в результате декларативного процесса но основе поля __tablename__,
 # полей класса созданных при помощи класса Column
@@ -184,8 +207,40 @@ print(repr(User.__table__))
 # если у него указан параметр autoload_with=<engine>, то класс проинициализируется на основе уже имеющейсяс
 # в БД Таблицы.
 
-from SQLAlchemy_Connect_Session import engine as other_engine
+# Отражение тоже стоит базе нескольких запросов, поэтому оно выполняется лениво, при первом вызове
+# reflect_some_table(), а не при импорте. Повторные вызовы возвращают уже отраженную таблицу.
+# Для файловой базы результат отражения кэшируется на диске (reflection_cache.reflect_cached)
+# и при следующем запуске берется из кэша, пока схема базы не изменится.
+# Без кэша это эквивалентно Table("some_table", metadata_obj, autoload_with=engine).
+
+def reflect_some_table(engine=None):
+    if "some_table" in metadata_obj.tables:
+        return metadata_obj.tables["some_table"]
+    if engine is None:
+        engine = get_engine()
+    from reflection_cache import reflect_cached
+    return reflect_cached(engine, metadata_obj, only=["some_table"])["some_table"]
+
+
+def show_schema(engine=None):
+    print(user_table.c.name, type(user_table.c.name))
+    print(user_table.c.keys())
+    print(user_table.primary_key, type(user_table.primary_key))
+    print(user_table.c.id, type(user_table.c.id))
+    print(address_table.c.email_address.nullable)
+
+    print("{:_^80s}".format("Create Table"))
+    engine = create_schema(engine)
+
+    print(mapper_registry.metadata, type(mapper_registry.metadata))
+    print(repr(User.__table__))
+
+    from SQLAlchemy_Connect_Session import seed_some_table
+    seed_some_table(engine)
+    some_table = reflect_some_table(engine)
+    print(some_table, repr(some_table))
+
 
-some_table = Table("some_table", metadata_obj, autoload_with=other_engine)
+if __name__ == "__main__":
+    show_schema()
 
-print(some_table, repr(some_table))
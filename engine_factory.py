@@ -0,0 +1,342 @@
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+# Единая точка создания engine для всех скриптов проекта.
+# Раньше каждый модуль создавал свой create_engine('sqlite+pysqlite:///:memory:', echo=True, future=True),
+# из-за чего у каждого модуля была своя приватная база в памяти, а echo=True форматировал и писал в лог
+# каждый запрос со всеми параметрами.
+#
+# Настройки берутся из переменных окружения:
+#   TUTORIAL_DB_PATH  - путь к файлу SQLite (":memory:" - база в памяти), по умолчанию tutorial.sqlite3
+#   TUTORIAL_DB_ECHO  - "1" включает логирование запросов (как в исходных примерах с echo=True)
+#   TUTORIAL_DB_STATS - "1" подключает к общему engine сбор статистики instrumentation.default_stats
+#   TUTORIAL_DB_BUSY_TIMEOUT - сколько секунд соединение ждет освобождения блокировки записи, по умолчанию 5
+
+DEFAULT_DATABASE_PATH = os.environ.get("TUTORIAL_DB_PATH", "tutorial.sqlite3")
+DEFAULT_ECHO = os.environ.get("TUTORIAL_DB_ECHO", "0") == "1"
+DEFAULT_STATS = os.environ.get("TUTORIAL_DB_STATS", "0") == "1"
+DEFAULT_BUSY_TIMEOUT = float(os.environ.get("TUTORIAL_DB_BUSY_TIMEOUT", "5"))
+
+# PRAGMA, которые выставляются на каждом новом DBAPI соединении.
+#   journal_mode=WAL    - читатели не блокируют писателя и наоборот
+#   synchronous=NORMAL  - в режиме WAL безопасно и сильно быстрее FULL
+#   cache_size=-64000   - отрицательное значение задается в KiB, т.е. ~64MB кэша страниц
+#   mmap_size           - чтение файла базы через mmap (256MB)
+#   temp_store=MEMORY   - временные таблицы и индексы для сортировок держатся в памяти
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+}
+
+# journal_mode и synchronous - настройки записи, соединению только для чтения их менять нельзя.
+READ_ONLY_PRAGMAS = {
+    name: value for name, value in DEFAULT_PRAGMAS.items() if name not in ("journal_mode", "synchronous")
+}
+
+
+def apply_pragmas(engine, pragmas):
+    # Событие connect вызывается один раз для каждого нового DBAPI соединения пула,
+    # поэтому PRAGMA не повторяются при каждом checkout.
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+def create_sqlite_engine(
+        path=DEFAULT_DATABASE_PATH,
+        echo=DEFAULT_ECHO,
+        pragmas=None,
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=-1,
+        pool_pre_ping=False,
+        stats=None,
+        busy_timeout=DEFAULT_BUSY_TIMEOUT,
+        **kwargs
+):
+    # stats - объект instrumentation.StatementStats, который нужно подключить к engine.
+    if pragmas is None:
+        pragmas = DEFAULT_PRAGMAS
+
+    # check_same_thread=False позволяет пулу отдавать соединение в любой поток.
+    # timeout - busy timeout драйвера: пока другое соединение держит блокировку записи,
+    # SQLite повторяет попытку до timeout секунд и только потом отвечает "database is locked".
+    connect_args = {"check_same_thread": False, "timeout": busy_timeout}
+    connect_args.update(kwargs.pop("connect_args", {}))
+
+    if path == ":memory:":
+        # База в памяти существует только пока открыто соединение, поэтому все обращения
+        # должны идти через одно и то же соединение - StaticPool.
+        engine = create_engine(
+            "sqlite+pysqlite:///:memory:",
+            echo=echo,
+            future=True,
+            poolclass=StaticPool,
+            connect_args=connect_args,
+            **kwargs
+        )
+    else:
+        engine = create_engine(
+            f"sqlite+pysqlite:///{path}",
+            echo=echo,
+            future=True,
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args=connect_args,
+            **kwargs
+        )
+
+    apply_pragmas(engine, pragmas)
+    if stats is not None:
+        stats.attach(engine)
+    return engine
+
+
+def create_read_only_engine(
+        path=DEFAULT_DATABASE_PATH,
+        echo=DEFAULT_ECHO,
+        pragmas=None,
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        stats=None,
+        busy_timeout=DEFAULT_BUSY_TIMEOUT,
+        **kwargs
+):
+    # Engine над тем же файлом, но каждое соединение открывается как file:<path>?mode=ro:
+    # любая запись через него завершается "attempt to write a readonly database".
+    # В режиме WAL такие соединения читают параллельно с писателем. База в памяти видна только
+    # своему соединению, для нее отдельного читающего engine быть не может.
+    if path == ":memory:":
+        raise ValueError("read-only engines need a file database, in-memory SQLite is private to one connection")
+    if pragmas is None:
+        pragmas = READ_ONLY_PRAGMAS
+
+    connect_args = {"check_same_thread": False, "timeout": busy_timeout}
+    connect_args.update(kwargs.pop("connect_args", {}))
+    engine = create_engine(
+        f"sqlite+pysqlite:///{Path(path).resolve().as_uri()}?mode=ro&uri=true",
+        echo=echo,
+        future=True,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        connect_args=connect_args,
+        **kwargs
+    )
+
+    apply_pragmas(engine, pragmas)
+    if stats is not None:
+        stats.attach(engine)
+    return engine
+
+
+# Повтор транзакций при конкурентной записи.
+#
+# В SQLite один писатель. busy timeout покрывает ожидание блокировки, но не все случаи: транзакция,
+# которая начала с чтения (BEGIN DEFERRED), не может повысить блокировку до записи, пока другой писатель
+# изменил базу, и SQLite сразу отвечает "database is locked" без ожидания. Повторять в этом случае
+# можно только транзакцию целиком, поэтому run_in_transaction/run_in_session принимают функцию
+# с телом транзакции. Пишущие транзакции по умолчанию открываются как BEGIN IMMEDIATE - блокировка
+# записи берется сразу (с ожиданием по busy timeout), и описанная ситуация не возникает.
+
+RETRYABLE_MESSAGES = ("database is locked", "database table is locked", "database is busy")
+
+
+class RetryPolicy:
+
+    def __init__(self, retries=5, backoff=0.01, max_backoff=1.0):
+        # Пауза перед повтором растет вдвое с каждой попыткой (со случайным разбросом), до max_backoff.
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self.retried = 0
+        self.failed = 0
+
+    @staticmethod
+    def is_retryable(error):
+        return isinstance(error, OperationalError) and any(
+            message in str(error.orig).lower() for message in RETRYABLE_MESSAGES
+        )
+
+    def run(self, work):
+        attempt = 0
+        while True:
+            try:
+                return work()
+            except OperationalError as error:
+                if not self.is_retryable(error):
+                    raise
+                with self._lock:
+                    if attempt >= self.retries:
+                        self.failed += 1
+                        raise
+                    self.retried += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            attempt += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"retried": self.retried, "failed": self.failed}
+
+    def reset(self):
+        with self._lock:
+            self.retried = 0
+            self.failed = 0
+
+
+default_retry_policy = RetryPolicy()
+
+
+def _begin_immediate(engine, conn):
+    # База в памяти живет на одном соединении StaticPool, явный BEGIN там конфликтует
+    # с транзакциями других потоков на том же соединении.
+    if engine.url.database not in (None, "", ":memory:"):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def run_in_transaction(engine, work, policy=None, immediate=True):
+    # work(conn) выполняется внутри engine.begin(); при "database is locked" транзакция
+    # откатывается и выполняется заново. Возвращает результат work.
+    if policy is None:
+        policy = default_retry_policy
+
+    def attempt():
+        with engine.begin() as conn:
+            if immediate:
+                _begin_immediate(engine, conn)
+            return work(conn)
+
+    return policy.run(attempt)
+
+
+def run_in_session(engine, work, policy=None, immediate=True, **session_kwargs):
+    # То же для ORM: work(session) выполняется в новой Session, которая фиксируется в конце.
+    # sqlalchemy.orm импортируется здесь, чтобы импорт engine_factory оставался легким.
+    from sqlalchemy.orm import Session
+
+    if policy is None:
+        policy = default_retry_policy
+
+    def attempt():
+        with Session(engine, **session_kwargs) as session:
+            with session.begin():
+                if immediate:
+                    _begin_immediate(engine, session.connection())
+                return work(session)
+
+    return policy.run(attempt)
+
+
+def has_rows(bind, table_name):
+    # Есть ли таблица и хотя бы одна строка в ней. bind - Engine или Connection (в том числе
+    # синхронное соединение внутри AsyncConnection.run_sync). Функции seed_* проверяют так
+    # файловую базу, чтобы повторный запуск не дублировал строки.
+    if isinstance(bind, Engine):
+        with bind.connect() as conn:
+            return has_rows(conn, table_name)
+    if not inspect(bind).has_table(table_name):
+        return False
+    return bind.exec_driver_sql(f"SELECT 1 FROM {table_name} LIMIT 1").first() is not None
+
+
+_engine = None
+
+
+def get_engine():
+    # Общий для всего процесса engine, создается при первом обращении.
+    global _engine
+    if _engine is None:
+        stats = None
+        if DEFAULT_STATS:
+            from instrumentation import default_stats as stats
+        _engine = create_sqlite_engine(stats=stats)
+    return _engine
+
+
+# Асинхронный вариант для сервисов на asyncio: драйвер aiosqlite и AsyncEngine из sqlalchemy.ext.asyncio.
+# Настройки те же, PRAGMA подключаются к синхронному engine, который лежит в основе AsyncEngine.
+
+def create_async_sqlite_engine(
+        path=DEFAULT_DATABASE_PATH,
+        echo=DEFAULT_ECHO,
+        pragmas=None,
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=-1,
+        stats=None,
+        busy_timeout=DEFAULT_BUSY_TIMEOUT,
+        **kwargs
+):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    if pragmas is None:
+        pragmas = DEFAULT_PRAGMAS
+
+    # aiosqlite передает timeout в sqlite3.connect - тот же busy timeout, что и у синхронного engine.
+    connect_args = {"timeout": busy_timeout}
+    connect_args.update(kwargs.pop("connect_args", {}))
+
+    if path == ":memory:":
+        engine = create_async_engine(
+            "sqlite+aiosqlite:///:memory:",
+            echo=echo,
+            poolclass=StaticPool,
+            connect_args=connect_args,
+            **kwargs
+        )
+    else:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{path}",
+            echo=echo,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            connect_args=connect_args,
+            **kwargs
+        )
+
+    apply_pragmas(engine.sync_engine, pragmas)
+    if stats is not None:
+        stats.attach(engine.sync_engine)
+    return engine
+
+
+_async_engine = None
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        stats = None
+        if DEFAULT_STATS:
+            from instrumentation import default_stats as stats
+        _async_engine = create_async_sqlite_engine(stats=stats)
+    return _async_engine
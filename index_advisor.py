@@ -0,0 +1,172 @@
+from sqlalchemy import Column, select
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, TextClause
+
+from engine_factory import get_engine
+from str_patterns import underline_for_header
+
+# Советчик по индексам на основе EXPLAIN QUERY PLAN.
+#
+# Для каждого зарегистрированного запроса строится план выполнения SQLite. Строки плана вида
+# "SCAN user_account" означают полный просмотр таблицы. Для таких таблиц из самого запроса
+# собираются колонки фильтров и соединений (сравнения в WHERE/ON), сортировки (ORDER BY)
+# и выбираемые колонки. Из них предлагается покрывающий индекс: сначала колонки
+# фильтров, затем сортировки, затем остальные выбираемые колонки. Запрос text() не разбирается:
+# для него в отчете вместо индекса выводится заметка (note) переписать запрос через select().
+#
+# Запуск из корня проекта: python -m index_advisor
+
+COMPARISON_OPERATORS = {
+    operators.eq, operators.ne, operators.lt, operators.le, operators.gt, operators.ge,
+    operators.in_op, operators.like_op, operators.between_op,
+}
+
+QUERIES = {}
+
+
+def register_query(name, stmt):
+    QUERIES[name] = stmt
+    return stmt
+
+
+def explain(conn, stmt):
+    # Возвращает строки detail из EXPLAIN QUERY PLAN. Параметры подставляются как есть,
+    # для bindparam без значения передается NULL - на выбор плана это не влияет.
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.binds[name].effective_value for name in compiled.positiontup or [])
+    plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).fetchall()
+    return [row[-1] for row in plan]
+
+
+def full_scans(plan):
+    # "SCAN TABLE x" в SQLite < 3.36 и "SCAN x" в новых версиях.
+    # Просмотр через покрывающий индекс тоже остается просмотром, но таблицу он не читает.
+    scans = []
+    for detail in plan:
+        words = detail.split()
+        if not words or words[0] != "SCAN" or "COVERING INDEX" in detail:
+            continue
+        table = words[2] if len(words) > 2 and words[1] == "TABLE" else words[1]
+        scans.append(table)
+    return scans
+
+
+def _columns_of(table_name, elements):
+    columns = []
+    for element in elements:
+        for node in visitors.iterate(element):
+            if isinstance(node, Column) and node.table is not None and node.table.name == table_name:
+                if node.name not in columns:
+                    columns.append(node.name)
+    return columns
+
+
+def suggest_index(stmt, table_name):
+    if isinstance(stmt, TextClause):
+        return None
+
+    filters = []
+    for node in visitors.iterate(stmt):
+        if isinstance(node, BinaryExpression) and node.operator in COMPARISON_OPERATORS:
+            for column in _columns_of(table_name, [node.left, node.right]):
+                if column not in filters:
+                    filters.append(column)
+
+    ordering = _columns_of(table_name, getattr(stmt, "_order_by_clauses", ()))
+    selected = _columns_of(table_name, getattr(stmt, "selected_columns", ()))
+
+    columns = []
+    for column in filters + ordering + selected:
+        if column not in columns and column != "id":
+            columns.append(column)
+    if not columns or not (filters or ordering):
+        return None
+    return f"CREATE INDEX ix_{table_name}_{'_'.join(columns)} ON {table_name} ({', '.join(columns)})"
+
+
+def advise(engine=None, queries=None):
+    if engine is None:
+        engine = get_engine()
+    if queries is None:
+        queries = QUERIES
+
+    report = []
+    with engine.connect() as conn:
+        for name, stmt in queries.items():
+            plan = explain(conn, stmt)
+            scans = full_scans(plan)
+            suggestions = [suggest_index(stmt, table) for table in scans]
+            note = None
+            if scans and isinstance(stmt, TextClause):
+                note = "text() query is not analysed, express it with select() to get an index suggestion"
+            report.append({
+                "query": name,
+                "plan": plan,
+                "full_scans": scans,
+                "suggestions": [s for s in suggestions if s],
+                "note": note,
+            })
+    return report
+
+
+def register_project_queries():
+    # Запросы проекта: выборки из Select.py, подзапрос вставки адресов из Insert.py,
+    # соединение адресов с пользователями и упорядоченная выборка some_table.
+    from sqlalchemy import Integer, MetaData, Table, bindparam, insert
+
+    from SQL_Alchemy_metadata import User, Address, user_table, address_table
+
+    # some_table создается text() в SQLAlchemy_Connect_Session.py, и ее выборка там тоже text().
+    # Для разбора запроса таблица описывается здесь так же, как в ее CREATE TABLE.
+    some_table = Table("some_table", MetaData(), Column("x", Integer), Column("y", Integer))
+
+    register_query("select_user_by_name", select(user_table).where(user_table.c.name == "spongebob"))
+    register_query("select_orm_user_by_name", select(User).where(User.name == "spongebob"))
+    register_query(
+        "insert_address_scalar_subquery",
+        insert(address_table).values(
+            user_id=select(user_table.c.id).where(user_table.c.name == bindparam("username")).scalar_subquery(),
+            email_address=bindparam("email_address"),
+        )
+    )
+    register_query(
+        "select_addresses_of_user",
+        select(address_table.c.email_address).
+            join(user_table, address_table.c.user_id == user_table.c.id).
+            where(user_table.c.name == "sandy")
+    )
+    register_query("select_orm_addresses_of_user", select(Address.id).where(Address.user_id == 1))
+    register_query(
+        "select_some_table_ordered",
+        select(some_table).where(some_table.c.y > 6).order_by(some_table.c.x, some_table.c.y)
+    )
+    return QUERIES
+
+
+def print_report(report):
+    for entry in report:
+        status = "FULL SCAN " + ", ".join(entry["full_scans"]) if entry["full_scans"] else "ok"
+        print(f"{entry['query']:<36s} {status}")
+        for detail in entry["plan"]:
+            print(f"    {detail}")
+        for suggestion in entry["suggestions"]:
+            print(f"    suggest: {suggestion}")
+        if entry["note"]:
+            print(f"    note: {entry['note']}")
+
+
+def main(engine=None):
+    from SQL_Alchemy_metadata import create_schema
+    from SQLAlchemy_Connect_Session import seed_some_table
+
+    engine = create_schema(engine)
+    seed_some_table(engine)
+    register_project_queries()
+    print(underline_for_header.format("Index advisor"))
+    report = advise(engine)
+    print_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+
+# Легковесная статистика по запросам вместо echo=True.
+#
+# echo=True форматирует и пишет в лог каждый запрос со всеми параметрами, но не дает сводных цифр.
+# StatementStats подписывается на события выполнения запроса и для каждой формы запроса
+# (SQL строка с ? вместо значений) накапливает:
+#   - количество выполнений и сколько из них executemany
+#   - суммарное и максимальное время, гистограмму задержек
+#   - число затронутых строк (cursor.rowcount для INSERT/UPDATE/DELETE)
+#   - попадания в кэш скомпилированных запросов - то, что в логе echo выводится как
+#     "[generated in ...]" (CACHE_MISS) и "[cached since ...]" (CACHE_HIT)
+#
+# Вместо пары событий before_cursor_execute / after_cursor_execute используются события диалекта
+# do_execute / do_executemany / do_execute_no_params: слушатель сам вызывает cursor.execute() и
+# замеряет время вокруг него. Наличие before/after_cursor_execute переключает Connection на
+# медленный путь выполнения и на коротких запросах стоит ~6 мкс, а один do_execute - ~1 мкс.
+# На каждый запрос остается пара вызовов perf_counter, поиск в словаре и короткая блокировка,
+# поэтому статистику можно держать включенной постоянно.
+
+# Верхние границы корзин гистограммы в миллисекундах, последняя корзина - все, что больше.
+HISTOGRAM_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class StatementStats:
+
+    def __init__(self, max_statements=1000):
+        # max_statements ограничивает число отслеживаемых форм запросов: запросы, собранные
+        # с литералами вместо параметров, не должны бесконечно раздувать словарь.
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._cache = {}
+        self._overflow = 0
+
+    def attach(self, engine):
+        event.listen(engine, "do_execute", self._do_execute)
+        event.listen(engine, "do_executemany", self._do_executemany)
+        event.listen(engine, "do_execute_no_params", self._do_execute_no_params)
+        return engine
+
+    def detach(self, engine):
+        event.remove(engine, "do_execute", self._do_execute)
+        event.remove(engine, "do_executemany", self._do_executemany)
+        event.remove(engine, "do_execute_no_params", self._do_execute_no_params)
+        return engine
+
+    # Возврат True сообщает диалекту, что запрос уже выполнен слушателем.
+
+    def _do_execute(self, cursor, statement, parameters, context):
+        start = time.perf_counter()
+        cursor.execute(statement, parameters)
+        self.record(statement, time.perf_counter() - start, cursor, context, False)
+        return True
+
+    def _do_executemany(self, cursor, statement, parameters, context):
+        start = time.perf_counter()
+        cursor.executemany(statement, parameters)
+        self.record(statement, time.perf_counter() - start, cursor, context, True)
+        return True
+
+    def _do_execute_no_params(self, cursor, statement, context):
+        start = time.perf_counter()
+        cursor.execute(statement)
+        self.record(statement, time.perf_counter() - start, cursor, context, False)
+        return True
+
+    def record(self, statement, elapsed, cursor, context, executemany):
+        elapsed_ms = elapsed * 1000
+        rowcount = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        cache = context.cache_hit.name if context is not None else "NO_CACHE_KEY"
+
+        with self._lock:
+            self._cache[cache] = self._cache.get(cache, 0) + 1
+            entry = self._statements.get(statement)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    self._overflow += 1
+                    return
+                entry = self._statements[statement] = {
+                    "count": 0,
+                    "executemany": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": 0,
+                    "histogram": [0] * (len(HISTOGRAM_BOUNDS_MS) + 1),
+                    "cache": {},
+                }
+            entry["count"] += 1
+            entry["executemany"] += executemany
+            entry["total_ms"] += elapsed_ms
+            if elapsed_ms > entry["max_ms"]:
+                entry["max_ms"] = elapsed_ms
+            entry["rows"] += rowcount
+            entry["histogram"][bisect_left(HISTOGRAM_BOUNDS_MS, elapsed_ms)] += 1
+            entry["cache"][cache] = entry["cache"].get(cache, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            statements = []
+            for statement, entry in self._statements.items():
+                item = dict(entry, statement=statement)
+                item["histogram"] = list(entry["histogram"])
+                item["cache"] = dict(entry["cache"])
+                item["mean_ms"] = entry["total_ms"] / entry["count"]
+                statements.append(item)
+            statements.sort(key=lambda item: item["total_ms"], reverse=True)
+            return {
+                "histogram_bounds_ms": list(HISTOGRAM_BOUNDS_MS),
+                "compiled_cache": dict(self._cache),
+                "untracked_statements": self._overflow,
+                "statements": statements,
+            }
+
+    def top(self, limit=10):
+        return self.snapshot()["statements"][:limit]
+
+    def to_json(self, path=None):
+        data = json.dumps(self.snapshot(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(data)
+        return data
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._cache.clear()
+            self._overflow = 0
+
+
+# Общая статистика процесса, к ней подключается engine из engine_factory.get_engine(),
+# если задана переменная окружения TUTORIAL_DB_STATS=1.
+default_stats = StatementStats()
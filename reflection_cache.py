@@ -0,0 +1,96 @@
+import hashlib
+import os
+import pickle
+
+from sqlalchemy import Table, inspect, text
+
+# Кэш отраженных таблиц на диске.
+#
+# Table(..., autoload_with=engine) на каждую таблицу выполняет несколько PRAGMA запросов
+# (table_info, foreign_key_list, index_list, ...). На схеме из сотен таблиц это основная часть
+# времени запуска. Inspector складывает ответы диалекта (колонки, ключи, индексы) в свой словарь
+# info_cache. Здесь этот словарь сохраняется через pickle в файл рядом с базой, а при следующем
+# запуске подкладывается новому Inspector, и таблицы строятся без запросов к схеме.
+# Сохраняется именно info_cache, а не MetaData: он состоит из простых словарей и списков,
+# тогда как pickle связанных внешними ключами Table упирается в предел рекурсии.
+#
+# Ключ кэша - отпечаток схемы, который считается одним запросом к sqlite_master и PRAGMA
+# schema_version: SQLite увеличивает schema_version при любом изменении схемы, а тексты CREATE
+# из sqlite_master различают разные файлы с одинаковым номером версии. Если отпечаток не совпал,
+# схема отражается заново и кэш перезаписывается.
+#
+# Файл кэша - обычный pickle, поэтому он должен лежать там, куда пишет только само приложение.
+
+CACHE_SUFFIX = ".reflection.pickle"
+
+
+def schema_fingerprint(conn):
+    version = conn.exec_driver_sql("PRAGMA schema_version").scalar()
+    rows = conn.execute(text(
+        "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+    )).all()
+    digest = hashlib.sha256(repr(rows).encode()).hexdigest()
+    return f"{version}:{digest}"
+
+
+def default_cache_path(engine):
+    database = engine.url.database
+    if not database or database == ":memory:":
+        return None
+    return database + CACHE_SUFFIX
+
+
+def load_cache(path, fingerprint):
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if cached.get("fingerprint") != fingerprint:
+        return None
+    return cached["info_cache"]
+
+
+def save_cache(path, fingerprint, info_cache):
+    # Запись через временный файл, чтобы параллельный запуск не прочитал недописанный кэш.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"fingerprint": fingerprint, "info_cache": info_cache}, f)
+    os.replace(tmp_path, path)
+
+
+def reflect_cached(engine, metadata, only=None, cache_path=None):
+    # Отражает таблицы only (или всю схему) в metadata и возвращает словарь имя -> Table.
+    # Таблицы, уже объявленные в metadata, не перезаписываются. Если в кэше не хватило
+    # каких-то таблиц, они отражаются из базы и кэш дополняется.
+    if cache_path is None:
+        cache_path = default_cache_path(engine)
+
+    with engine.connect() as conn:
+        fingerprint = schema_fingerprint(conn)
+        inspector = inspect(conn)
+        cached = load_cache(cache_path, fingerprint)
+        if cached is not None:
+            inspector.info_cache.update(cached)
+        cached_keys = len(inspector.info_cache)
+
+        names = list(only if only is not None else inspector.get_table_names())
+        tables = {}
+        # resolve_fks=False: иначе SQLAlchemy отражает связанные таблицы через новый Inspector,
+        # мимо кэша. Вместо этого связанные таблицы добавляются в очередь и отражаются здесь же.
+        while names:
+            name = names.pop(0)
+            if name in metadata.tables:
+                tables.setdefault(name, metadata.tables[name])
+                continue
+            table = tables[name] = Table(name, metadata, autoload_with=inspector, resolve_fks=False)
+            for fk in table.foreign_keys:
+                referred = fk.target_fullname.split(".")[0]
+                if referred not in metadata.tables and referred not in names:
+                    names.append(referred)
+
+        if cache_path is not None and (cached is None or len(inspector.info_cache) != cached_keys):
+            save_cache(cache_path, fingerprint, inspector.info_cache)
+    return tables
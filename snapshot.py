@@ -0,0 +1,177 @@
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from engine_factory import DEFAULT_BUSY_TIMEOUT, DEFAULT_ECHO, DEFAULT_PRAGMAS, apply_pragmas, create_sqlite_engine
+
+# Снимок заполненной базы и быстрый старт из него.
+#
+# База в памяти при каждом запуске строится заново: create_all и все вставки из
+# SQLAlchemy_Connect_Session.py и DataOperations/Insert.py. Здесь заполненная база один раз
+# копируется в файл через backup API SQLite (sqlite3.Connection.backup - постраничное копирование
+# без SQL), а следующие запуски копируют файл обратно в новое соединение :memory: тем же
+# backup API. Ни DDL, ни INSERT при этом не выполняются.
+#
+# Вместо приватной базы одного соединения снимок можно загрузить в именованную общую базу
+# в памяти (file:<name>?mode=memory&cache=shared): к ней подключаются все соединения пула
+# одного процесса. Такая база существует, пока открыто хотя бы одно соединение, поэтому модуль
+# держит для нее отдельное "якорное" соединение до вызова close_shared().
+#
+# В PRAGMA user_version снимка записывается отпечаток схемы из кода (DDL таблиц и индексов),
+# и warm_start_engine() заполняет базу заново, если схема в коде изменилась.
+
+_anchors = {}
+
+
+def schema_version(tables=None):
+    # 31-битный отпечаток DDL, помещается в PRAGMA user_version. По умолчанию - таблицы,
+    # схема которых описана в SQL_Alchemy_metadata.py; some_table отражается из базы и в отпечаток
+    # не входит, иначе он зависел бы от того, была ли она уже отражена в metadata_obj.
+    if tables is None:
+        from SQL_Alchemy_metadata import address_table, user_table
+        tables = (user_table, address_table)
+    digest = hashlib.sha256()
+    dialect = sqlite_dialect.dialect()
+    for table in tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return int.from_bytes(digest.digest()[:4], "big") & 0x7FFFFFFF
+
+
+def _dbapi_connection(engine):
+    # Соединение DBAPI из пула engine; для :memory: это единственное соединение StaticPool.
+    raw = engine.raw_connection()
+    return raw, raw.connection
+
+
+def save_snapshot(engine, path, version=None):
+    # Копирует базу engine в файл path (через временный файл, чтобы не оставить половину снимка).
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    raw, source = _dbapi_connection(engine)
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target)
+            if version is not None:
+                target.execute(f"PRAGMA user_version={int(version)}")
+            # Снимок - один самодостаточный файл, без -wal.
+            target.execute("PRAGMA journal_mode=DELETE")
+            target.commit()
+        finally:
+            target.close()
+    finally:
+        raw.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def snapshot_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _load(path, target):
+    # Путь кодируется как URI: "?", "#" и "%" в имени файла иначе читались бы как часть URI.
+    source = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+
+
+def restore_snapshot(path, echo=DEFAULT_ECHO, **kwargs):
+    # Новый engine над приватной базой :memory: с содержимым снимка.
+    engine = create_sqlite_engine(":memory:", echo=echo, **kwargs)
+    raw, target = _dbapi_connection(engine)
+    try:
+        _load(path, target)
+    finally:
+        raw.close()
+    return engine
+
+
+def restore_shared(
+        path,
+        name="tutorial",
+        echo=DEFAULT_ECHO,
+        pragmas=None,
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=-1,
+        pool_pre_ping=False,
+        stats=None,
+        busy_timeout=DEFAULT_BUSY_TIMEOUT,
+        **kwargs
+):
+    # Engine над общей базой в памяти file:<name>?mode=memory&cache=shared: все соединения
+    # пула видят одни и те же данные. Повторный вызов с тем же name загружает снимок заново.
+    # Параметры engine те же, что у engine_factory.create_sqlite_engine.
+    if pragmas is None:
+        pragmas = DEFAULT_PRAGMAS
+    uri = f"file:{name}?mode=memory&cache=shared"
+    close_shared(name)
+    anchor = _anchors[name] = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    _load(path, anchor)
+
+    connect_args = {"check_same_thread": False, "timeout": busy_timeout}
+    connect_args.update(kwargs.pop("connect_args", {}))
+    engine = create_engine(
+        f"sqlite+pysqlite:///{uri}&uri=true",
+        echo=echo,
+        future=True,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+        connect_args=connect_args,
+        **kwargs
+    )
+    # journal_mode=WAL к базе в памяти неприменим, остальные PRAGMA действуют как обычно.
+    apply_pragmas(engine, {key: value for key, value in pragmas.items() if key != "journal_mode"})
+    if stats is not None:
+        stats.attach(engine)
+    return engine
+
+
+def close_shared(name="tutorial"):
+    anchor = _anchors.pop(name, None)
+    if anchor is not None:
+        anchor.close()
+
+
+def seed_tutorial(engine):
+    # Все учебные данные: some_table, user_account и address.
+    from DataOperations.Insert import seed_users_and_addresses
+    from SQLAlchemy_Connect_Session import seed_some_table
+    seed_some_table(engine)
+    seed_users_and_addresses(engine)
+    return engine
+
+
+def warm_start_engine(path, seed=seed_tutorial, shared=False, **kwargs):
+    # Engine над базой в памяти: из снимка path, если он есть и схема не менялась,
+    # иначе база заполняется функцией seed(engine) и снимок сохраняется для следующих запусков.
+    version = schema_version()
+    if os.path.exists(path) and snapshot_version(path) == version:
+        return restore_shared(path, **kwargs) if shared else restore_snapshot(path, **kwargs)
+
+    engine = create_sqlite_engine(":memory:", **({} if shared else kwargs))
+    seed(engine)
+    save_snapshot(engine, path, version)
+    if shared:
+        engine.dispose()
+        return restore_shared(path, **kwargs)
+    return engine